@@ -10,6 +10,7 @@ from flask import (
     Flask, render_template, redirect,
     request, url_for, abort, session, flash
 )
+from werkzeug.middleware.proxy_fix import ProxyFix
 from authlib.integrations.flask_client import OAuth
 
 from flask_login import (
@@ -27,6 +28,7 @@ from models import (
     TaskSolve, TaskLike, TaskSubmission, Activity, Blog
 )
 import ctf_battle_models  # Ensure models are registered
+from services import db_profile
 
 # ---------------- FLASK APP ----------------
 # ---------------- BASIC SETUP ----------------
@@ -42,15 +44,53 @@ app = Flask(
     static_folder=os.path.join(BASE_DIR, "static")
 )
 
+# Behind a reverse proxy (Render, Heroku, nginx) set TRUSTED_PROXY_COUNT=1 so
+# request.remote_addr is the client's address from X-Forwarded-For, not the proxy's
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT, x_proto=TRUSTED_PROXY_COUNT)
+
 # Use DATABASE_URL for production (e.g. Render/Heroku Postgres),
 # fall back to local SQLite for development.
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "cybertec8_secret")
-app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
+app.config["SQLALCHEMY_DATABASE_URI"] = db_profile.normalize_url(os.getenv(
     "DATABASE_URL",
     f"sqlite:///{os.path.join(BASE_DIR, 'ctf.db')}"
-)
+))
+# Pool sizing/pre-ping for Postgres, WAL + busy_timeout for SQLite (services/db_profile.py);
+# tune with DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, SQLITE_BUSY_TIMEOUT
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = db_profile.engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# GeoIP enrichment for battle logs: "ipapi" (default), "mmdb" (+ GEOIP_DB_PATH), "stub" or "off"
+app.config["GEOIP_RESOLVER"] = os.getenv("GEOIP_RESOLVER", "ipapi")
+app.config["GEOIP_DB_PATH"] = os.getenv("GEOIP_DB_PATH")
+
+# Per-request SQL tracing shown on /admin/perf; a statement repeated more than
+# PERF_NPLUSONE_THRESHOLD times in one request is reported as an N+1
+app.config["PERF_TRACING"] = os.getenv("PERF_TRACING", "1") == "1"
+app.config["PERF_NPLUSONE_THRESHOLD"] = int(os.getenv("PERF_NPLUSONE_THRESHOLD", "5"))
+
+# Solve/submission counters and XP are written back in batches every N seconds (0 = on commit)
+app.config["COUNTER_FLUSH_INTERVAL"] = float(os.getenv("COUNTER_FLUSH_INTERVAL", "2"))
+
+# Submission/activity audit rows are bulk-inserted in the background: "async" (default) or "sync"
+app.config["AUDIT_MODE"] = os.getenv("AUDIT_MODE", "async")
+app.config["AUDIT_FLUSH_MS"] = int(os.getenv("AUDIT_FLUSH_MS", "200"))
+
+# Token-bucket limits for flag submission (per user) and polling (per user and endpoint), services/ratelimit.py;
+# "memory" keeps buckets per worker, a redis:// URL shares them
+app.config["RATELIMIT_STORAGE"] = os.getenv("RATELIMIT_STORAGE", "memory")
+
+# Resized WebP copies of avatars and blog thumbnails are rendered by a small thread pool
+app.config["IMAGE_WORKERS"] = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Anonymous hits on the landing pages and /blog are served from memory for up to N seconds
+app.config["PAGE_CACHE_TTL"] = int(os.getenv("PAGE_CACHE_TTL", "300"))
+
+# The logged-in user's principal (username, admin flag, XP, avatar) is cached for up to N seconds
+app.config["USER_CACHE_TTL"] = int(os.getenv("USER_CACHE_TTL", "60"))
+
 # -------- IMAGE UPLOAD FOLDER --------
 UPLOAD_FOLDER = os.path.join(app.static_folder, "uploads/blogs")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -58,7 +98,8 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 from flask_migrate import Migrate
 
 db.init_app(app)
-migrate = Migrate(app, db)
+db_profile.init_app(app)
+migrate = Migrate(app, db, render_as_batch=True)
 
 from routes import admin_bp, ctf_admin_bp, participant_bp, ctf_battle_bp, battle_bp
 app.register_blueprint(admin_bp)
@@ -67,6 +108,20 @@ app.register_blueprint(participant_bp)
 app.register_blueprint(ctf_battle_bp)
 app.register_blueprint(battle_bp)
 
+from services import scoreboard, geoip, perf, counters, audit, ratelimit, images, assets, page_cache, dashboard_feed, user_cache, battle_arena
+ratelimit.init_app(app)
+counters.init_app(app)
+audit.init_app(app)
+scoreboard.init_app(app)
+geoip.init_app(app)
+perf.init_app(app)
+images.init_app(app)
+assets.init_app(app)
+page_cache.init_app(app)
+dashboard_feed.init_app(app)
+user_cache.init_app(app)
+battle_arena.init_app(app)
+
 # ---------------- OAUTH SETUP ----------------
 oauth = OAuth(app)
 
@@ -160,14 +215,14 @@ def require_login():
         return  # Skip if Google-only auth is disabled (maintenance mode)
 
     # Allowed routes without login
-    allowed_routes = ['home', 'about', 'features', 'blog', 'login', 'google_login', 'google_callback', 'static', 'resources']
+    allowed_routes = ['home', 'about', 'features', 'blog', 'login', 'google_login', 'google_callback', 'static', 'serve_asset', 'resources']
 
-    if not current_user.is_authenticated and request.endpoint not in allowed_routes:
+    if request.endpoint not in allowed_routes and not current_user.is_authenticated:
         return redirect(url_for('login'))
 
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    return user_cache.load_user(user_id)
 
 from utils import generate_invite_code
 
@@ -190,29 +245,35 @@ from decorators import (
     maintenance_mode_redirect, 
     optional_login_required
 )
+from services.page_cache import cache_page
 
 # ---------------- AUTH ----------------
 
 @app.route("/")
+@cache_page
 def home():
     return render_template("home.html", auth_enabled=AUTH_ENABLED)
 
 
 
 @app.route("/blog")
+@cache_page
 def blog():
     blogs = Blog.query.filter_by(is_published=True).order_by(Blog.published_at.desc()).all()
     return render_template("blog.html", blogs=blogs)
 
 @app.route("/resources")
+@cache_page
 def resources():
     return render_template("resources.html")
 
 @app.route("/about")
+@cache_page
 def about():
     return render_template("about.html")
 
 @app.route("/features")
+@cache_page
 def features():
     return render_template("features.html")
 
@@ -262,6 +323,7 @@ def google_callback():
         )
             db.session.add(user)
         db.session.commit()
+        scoreboard.scoreboard_index.upsert_user(user.id, user.username, user.xp)
 
     login_user(user)
 
@@ -289,9 +351,11 @@ def logout():
 def make_admin_now():
     if not app.debug:
         abort(403)
-    current_user.is_admin = True
+    user = current_user.row
+    user.is_admin = True
+    user_cache.invalidate_on_commit(user.id)
     db.session.commit()
-    return f"Success: {current_user.email} is now an admin. Logout and login again."
+    return f"Success: {user.email} is now an admin."
 
 
 
@@ -0,0 +1,261 @@
+"""
+Hot-path benchmark for Cybertec8 CTF Platform
+
+Seeds a synthetic dataset into a throwaway database, drives the submission and
+scoreboard endpoints through the Flask test client and prints p50/p99 latency,
+throughput and SQL query counts as JSON, so runs can be diffed between commits.
+
+Usage:
+    python bench_hotpaths.py                                  # defaults, temp SQLite
+    python bench_hotpaths.py --users 2000 --solves 20000 -n 300
+    python bench_hotpaths.py --database-url postgresql://... --output bench.json
+
+The target database is wiped and re-created (all tables dropped) before seeding.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--events", type=int, default=2)
+    parser.add_argument("--challenges", type=int, default=40, help="battle challenges per event")
+    parser.add_argument("--solves", type=int, default=5000, help="main-platform solves (battle solves get the same count)")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--seed", type=int, default=8)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    return parser.parse_args()
+
+
+args = parse_args()
+_tmpdir = None
+if not args.database_url:
+    _tmpdir = tempfile.mkdtemp(prefix="cybertec8-bench-")
+    args.database_url = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+# app.py reads these at import time
+os.environ["DATABASE_URL"] = args.database_url
+os.environ.setdefault("GEOIP_RESOLVER", "off")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event as sa_event
+from app import app
+from extensions import db
+from models import User, CTFTask, TaskSolve
+from ctf_battle_models import CTFEvent, CTFCategory, CTFChallenge, CTFEventSolve, UserSession
+from services import battle_scores
+
+app.config["TESTING"] = True
+app.config["RATELIMIT_ENABLED"] = False    # the bench replays far more submissions than a player could
+
+
+# ---------------- SEEDING ----------------
+
+def seed(rng):
+    db.drop_all()
+    db.create_all()
+    now = datetime.utcnow()
+
+    db.session.bulk_insert_mappings(User, [
+        {"id": i, "username": f"user{i}", "email": f"user{i}@bench.local", "xp": 0, "is_admin": i == 1}
+        for i in range(1, args.users + 1)
+    ])
+    db.session.bulk_insert_mappings(CTFTask, [
+        {"id": i, "title": f"Task {i}", "category": rng.choice(["Web", "Pwn", "Crypto", "Forensics"]),
+         "flag": f"FLAG{{{i}}}", "points": rng.choice([50, 100, 200, 300]), "level": "Easy",
+         "solved_count": 0, "submissions_count": 0}
+        for i in range(1, args.tasks + 1)
+    ])
+
+    pairs = set()
+    while len(pairs) < min(args.solves, args.users * args.tasks // 2):
+        pairs.add((rng.randint(2, args.users), rng.randint(1, args.tasks)))
+    db.session.bulk_insert_mappings(TaskSolve, [
+        {"user_id": u, "task_id": t, "solved_at": now - timedelta(minutes=rng.randint(1, 10000))} for u, t in pairs
+    ])
+    db.session.flush()
+    xp = dict(db.session.query(TaskSolve.user_id, db.func.sum(CTFTask.points))
+              .join(CTFTask, CTFTask.id == TaskSolve.task_id).group_by(TaskSolve.user_id).all())
+    db.session.bulk_update_mappings(User, [{"id": u, "xp": points} for u, points in xp.items()])
+
+    chal_id = 0
+    events = []
+    for e in range(1, args.events + 1):
+        event = CTFEvent(id=e, name=f"Battle {e}", start_time=now - timedelta(hours=2),
+                         end_time=now + timedelta(hours=2), status="Live")
+        db.session.add(event)
+        db.session.flush()
+        challenges = []
+        for c in range(args.challenges):
+            if c % 10 == 0:
+                cat = CTFCategory(event_id=e, name=f"Category {c // 10 + 1}")
+                db.session.add(cat)
+                db.session.flush()
+            chal_id += 1
+            challenges.append(chal_id)
+            db.session.add(CTFChallenge(id=chal_id, category_id=cat.id, title=f"Challenge {chal_id}",
+                                        description="bench", flag=f"BATTLE{{{chal_id}}}",
+                                        points=rng.choice([100, 200, 300, 500])))
+        events.append((e, challenges))
+    db.session.flush()
+
+    battle_pairs = set()
+    for e, challenges in events:
+        want = min(args.solves // max(1, args.events), (args.users - 1) * len(challenges) // 2)
+        event_pairs = set()
+        while len(event_pairs) < want:
+            event_pairs.add((e, rng.randint(2, args.users), rng.choice(challenges)))
+        battle_pairs |= event_pairs
+    db.session.bulk_insert_mappings(CTFEventSolve, [
+        {"event_id": e, "user_id": u, "challenge_id": c, "points": 100,
+         "solved_at": now - timedelta(seconds=rng.randint(600, 7000))}
+        for e, u, c in battle_pairs
+    ])
+    db.session.bulk_insert_mappings(UserSession, [
+        {"event_id": e, "user_id": u, "ip_address": f"10.0.{u // 250}.{u % 250}", "last_active": now}
+        for e, _ in events for u in range(2, args.users + 1, 3)
+    ])
+    db.session.commit()
+
+    for e, _ in events:
+        battle_scores.recompute(e)
+    db.session.commit()
+    return events
+
+
+# ---------------- MEASUREMENT ----------------
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        sa_event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+
+
+def run_scenario(name, counter, make_request, n):
+    latencies, queries, statuses = [], [], {}
+    started = time.perf_counter()
+    for i in range(n):
+        before = counter.count
+        t0 = time.perf_counter()
+        response = make_request(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        queries.append(counter.count - before)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return name, {
+        "requests": n,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / n, 3),
+        "throughput_rps": round(n / elapsed, 1),
+        "queries_per_request": {"mean": round(sum(queries) / n, 2), "max": max(queries)},
+        "status_codes": statuses,
+    }
+
+
+def scenarios(rng, events):
+    event_id, challenges = events[0]
+
+    # Clients are logged in up front so session setup isn't part of the timings
+    pool = []
+    for user_id in range(2, min(args.users, 51) + 1):
+        client = app.test_client()
+        login(client, user_id)
+        pool.append(client)
+
+    def participant(i):
+        return pool[i % len(pool)]
+
+    admin = app.test_client()
+    login(admin, 1)
+
+    yield "api_scoreboard", lambda i: participant(i).get(f"/api/scoreboard?page={1 + i % 5}&per_page=50")
+    yield "challenges", lambda i: participant(i).get("/challenges")
+    yield "api_submit_flag", lambda i: participant(i).post("/api/task/submit", json={
+        "task_id": rng.randint(1, args.tasks),
+        "flag": "wrong" if i % 4 else f"FLAG{{{1 + i % args.tasks}}}",
+    })
+    yield "battle.api_submit_flag", lambda i: participant(i).post("/ctf-battle/api/submit", json={
+        "challenge_id": (chal := rng.choice(challenges)),
+        "flag": "wrong" if i % 4 else f"BATTLE{{{chal}}}",
+    })
+    for tab in ["overview", "challenges", "participants", "submissions", "scoreboard", "security"]:
+        yield f"event_hub[{tab}]", lambda i, tab=tab: admin.get(f"/admin/ctf-battle/event/{event_id}?tab={tab}")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except Exception:
+        return None
+
+
+def main():
+    rng = random.Random(args.seed)
+    with app.app_context():
+        t0 = time.perf_counter()
+        events = seed(rng)
+        seed_seconds = time.perf_counter() - t0
+
+        from services.scoreboard import scoreboard_index
+        scoreboard_index.rebuild()
+
+        counter = QueryCounter(db.engine)
+        dialect = db.engine.dialect.name
+
+    # Outside the seeding context so each request gets its own app context,
+    # session and `g`, as it would behind a real server
+    results = dict(
+        run_scenario(name, counter, make_request, args.requests)
+        for name, make_request in scenarios(rng, events)
+    )
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "database": dialect,
+        "params": {k: getattr(args, k) for k in ("users", "tasks", "events", "challenges", "solves", "requests", "seed")},
+        "seed_seconds": round(seed_seconds, 2),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
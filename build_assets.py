@@ -0,0 +1,64 @@
+"""
+Static Asset Builder for Cybertec8 CTF Platform
+
+Writes content-hashed copies of the theme's CSS, JS and images, with gzip
+(and brotli, if installed) variants, into static/dist (services/assets.py).
+Run it on every deploy, after build_image_derivatives.py, then restart the app.
+
+Usage:
+    python build_assets.py build    # Build static/dist and its manifest
+    python build_assets.py clean    # Remove files left over from earlier builds
+    python build_assets.py list     # Show the current manifest
+"""
+
+import os
+import sys
+
+from services import assets
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def build():
+    manifest = assets.build(STATIC_FOLDER)
+    compressed = sum(1 for entry in manifest.values() if entry["encodings"])
+    print(f"✅ {len(manifest)} assets fingerprinted ({compressed} precompressed) into static/{assets.DIST_DIR}.")
+    print("ℹ️  Restart the app to serve the new manifest.")
+
+
+def clean():
+    try:
+        removed = assets.clean(STATIC_FOLDER)
+    except FileNotFoundError:
+        print("❌ No manifest found. Run 'build' first.")
+        return
+    print(f"✅ Removed {removed} stale files.")
+
+
+def list_assets():
+    assets.manifest.load(STATIC_FOLDER)
+    if not assets.manifest.entries:
+        print("❌ No manifest found. Run 'build' first.")
+        return
+    for logical, entry in sorted(assets.manifest.entries.items()):
+        encodings = ", ".join(entry["encodings"]) or "-"
+        print(f"  {logical:<45} {entry['path']:<60} {encodings}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1].lower()
+
+    if command == "build":
+        build()
+    elif command == "clean":
+        clean()
+    elif command == "list":
+        list_assets()
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
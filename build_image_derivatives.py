@@ -0,0 +1,86 @@
+"""
+Image Derivative Builder for Cybertec8 CTF Platform
+
+Renders the resized WebP copies that templates serve instead of the original
+images (services/images.py). New uploads get theirs automatically; run this
+once after deploying, and again whenever images in static/ change.
+
+Usage:
+    python build_image_derivatives.py bundled   # Preset avatars and static images shipped in static/
+    python build_image_derivatives.py users     # Custom avatars of existing users
+    python build_image_derivatives.py blogs     # Existing blog thumbnails
+    python build_image_derivatives.py all       # All of the above
+"""
+
+import glob
+import os
+import sys
+
+from app import app, db, User, Blog
+from services import images, storage
+
+# Images shipped with the app and served through bundled_image_url()
+BUNDLED = [
+    ("avatars/*.png", images.AVATAR_SIZES, True),
+    ("img/hacker.png", images.THUMBNAIL_SIZES, False),
+]
+
+
+def build_bundled():
+    """Write <folder>/derived/<name>_<size>.webp next to each bundled image."""
+    with app.app_context():
+        backend = storage.get_backend()
+        count = 0
+        for pattern, sizes, crop in BUNDLED:
+            for path in sorted(glob.glob(os.path.join(app.static_folder, pattern))):
+                key = os.path.relpath(path, app.static_folder).replace(os.sep, "/")
+                images.render(backend, key, sizes, crop, key_for=images.bundled_key)
+                count += 1
+        print(f"✅ {count} bundled images rendered.")
+        print("ℹ️  Restart the app so templates pick up the new files.")
+
+
+def queue_rows(kind_name, *criteria):
+    """Queue every matching row whose derivatives are missing, then wait for the workers."""
+    with app.app_context():
+        if not images.pipeline.enabled:
+            print("❌ Pillow is not installed; nothing to do.")
+            return
+        kind = images.KINDS[kind_name]
+        rows = kind.model.query.filter(*criteria, getattr(kind.model, kind.variants).is_(None)).all()
+        for row in rows:
+            images.queue_derivatives(row, kind_name)
+        db.session.commit()
+        images.pipeline.flush()
+        print(f"✅ {len(rows)} {kind_name}s processed.")
+
+
+def build_users():
+    queue_rows("avatar", User.avatar_type == "custom", User.profile_image.isnot(None))
+
+
+def build_blogs():
+    queue_rows("thumbnail", Blog.thumbnail.isnot(None), Blog.thumbnail != "")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1].lower()
+
+    if command == "bundled":
+        build_bundled()
+    elif command == "users":
+        build_users()
+    elif command == "blogs":
+        build_blogs()
+    elif command == "all":
+        build_bundled()
+        build_users()
+        build_blogs()
+    else:
+        print(f"❌ Unknown command: {command}")
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,106 @@
+"""
+Query Plan Check for Cybertec8 CTF Platform
+
+Runs EXPLAIN on the scoreboard, submissions, security and activity queries
+against the configured database and fails if any of them reads a whole table
+instead of going through an index. Run it after `flask db upgrade`.
+
+Usage:
+    python check_query_plans.py            # check every query, exit 1 on a full scan
+    python check_query_plans.py -v         # also print each plan
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from app import app, db
+from models import User, Activity, TaskSolve, TaskSubmission
+from ctf_battle_models import ActivityLog, CTFEventSolve, Submission, UserSession
+from services import battle_scores
+from services.pagination import keyset_query, encode_cursor
+
+
+def checked_queries():
+    """(name, query) pairs mirroring the hot paths; ids are placeholders, only the plan matters."""
+    event_id, user_id, task_id = 1, 1, 1
+    since = datetime.utcnow() - timedelta(minutes=5)
+    return [
+        ("battle scoreboard", battle_scores.scoreboard_query(event_id)),
+        ("battle submissions tab",
+         Submission.query.filter_by(event_id=event_id).order_by(Submission.created_at.desc()).limit(100)),
+        ("battle submissions tab, later page",
+         keyset_query(Submission.query.filter_by(event_id=event_id), [Submission.created_at, Submission.id],
+                      encode_cursor([since, 1])).limit(101)),
+        ("user listing, later page", keyset_query(User.query, [User.id], encode_cursor([user_id])).limit(51)),
+        ("battle participants tab",
+         UserSession.query.filter_by(event_id=event_id).order_by(UserSession.last_active.desc())),
+        ("security alerts",
+         ActivityLog.query.filter(ActivityLog.event_id == event_id, ActivityLog.action.like("SECURITY ALERT%"))
+         .order_by(ActivityLog.created_at.desc())),
+        ("security ip reuse",
+         db.session.query(ActivityLog.ip_address, db.func.count(db.distinct(ActivityLog.user_id)))
+         .filter(ActivityLog.event_id == event_id)
+         .group_by(ActivityLog.ip_address)
+         .having(db.func.count(db.distinct(ActivityLog.user_id)) > 1)),
+        ("anti-cheat recent solves",
+         db.session.query(CTFEventSolve.challenge_id, CTFEventSolve.solved_at)
+         .filter(CTFEventSolve.event_id == event_id, CTFEventSolve.solved_at > since)
+         .order_by(CTFEventSolve.solved_at)),
+        ("user activity feed",
+         Activity.query.filter_by(user_id=user_id).order_by(Activity.created_at.desc()).limit(15)),
+        ("task submissions",
+         TaskSubmission.query.filter_by(task_id=task_id).order_by(TaskSubmission.submitted_at.desc()).limit(50)),
+        ("solved tasks", db.session.query(TaskSolve.task_id).filter(TaskSolve.user_id == user_id)),
+    ]
+
+
+def explain(query):
+    """Return the plan as a list of text lines for this dialect."""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    with db.engine.connect() as conn:
+        if db.engine.dialect.name == "sqlite":
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params).fetchall()
+            return [row[-1] for row in rows]
+        if db.engine.dialect.name == "postgresql":
+            # Empty tables make a seq scan the cheapest plan; we want to know whether an index *can* be used
+            conn.exec_driver_sql("SET enable_seqscan = off")
+            rows = conn.exec_driver_sql("EXPLAIN " + compiled.string, params).fetchall()
+            return [row[0] for row in rows]
+    raise RuntimeError(f"Unsupported database: {db.engine.dialect.name}")
+
+
+def full_scans(plan):
+    """Plan lines that read a table without an index."""
+    bad = []
+    for line in plan:
+        text = line.strip()
+        if text.startswith("SCAN ") and "INDEX" not in text and "SUBQUERY" not in text:
+            bad.append(text)
+        elif "Seq Scan on" in text:
+            bad.append(text)
+    return bad
+
+
+def check(verbose=False):
+    with app.app_context():
+        failures = 0
+        for name, query in checked_queries():
+            plan = explain(query)
+            bad = full_scans(plan)
+            print(f"{'❌' if bad else '✅'} {name}")
+            for line in (plan if verbose else bad):
+                print(f"      {line}")
+            failures += bool(bad)
+
+        if failures:
+            print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} fall back to a full scan. "
+                  "Is the database at the latest migration (`flask db upgrade`)?")
+        return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check(verbose="-v" in sys.argv[1:]) else 1)
@@ -0,0 +1,64 @@
+"""
+pytest fixtures for the unit tests (test_pagination.py, test_ratelimit.py, ...).
+
+The app is imported against a throwaway SQLite database; every test gets
+fresh tables and empty per-user caches. test_scoreboard.py and
+test_maintenance_mode.py are manual scripts that talk to a running server,
+so pytest skips them.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+_tmpdir = tempfile.mkdtemp(prefix="cybertec8-test-")
+
+# app.py reads these at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+os.environ["GEOIP_RESOLVER"] = "off"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+collect_ignore = ["test_scoreboard.py", "test_maintenance_mode.py"]
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app
+    from extensions import db
+    from services.dashboard_feed import versions
+    from services.user_cache import user_cache
+
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        # ids restart with the tables, so nothing cached per user may survive a test
+        user_cache.invalidate(everywhere=False)
+        versions.bump()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def db(app):
+    from extensions import db as _db
+    return _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(db):
+    from models import User
+
+    def make(username="player", **fields):
+        user = User(username=username, email=f"{username}@test.local", xp=0, **fields)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
@@ -25,6 +25,8 @@ class CTFEvent(db.Model):
     logs = db.relationship("ActivityLog", backref="event", cascade="all, delete-orphan", lazy=True)
     submissions = db.relationship("Submission", backref="event_rel", cascade="all, delete-orphan", lazy=True)
     sessions = db.relationship("UserSession", backref="event_rel", cascade="all, delete-orphan", lazy=True)
+    scores = db.relationship("BattleScore", backref="event", cascade="all, delete-orphan", lazy=True)
+    snapshot = db.relationship("ScoreboardSnapshot", backref="event", cascade="all, delete-orphan", uselist=False, lazy=True)
 
     def to_dict(self):
         return {
@@ -93,6 +95,7 @@ class CTFEventSolve(db.Model):
     
     __table_args__ = (
         db.UniqueConstraint("user_id", "challenge_id", name="unique_user_battle_solve"),
+        db.Index("ix_battle_solve_event_solved", "event_id", "solved_at"),
     )
 
 class ActivityLog(db.Model):
@@ -117,6 +120,11 @@ class ActivityLog(db.Model):
 
     user = db.relationship("User", backref="battle_logs")
 
+    __table_args__ = (
+        db.Index("ix_battle_activity_event_ip", "event_id", "ip_address", "user_id"),
+        db.Index("ix_battle_activity_event_action", "event_id", "action"),
+    )
+
 class Submission(db.Model):
     __tablename__ = "ctf_battle_submission"
 
@@ -144,6 +152,10 @@ class Submission(db.Model):
     event = db.relationship("CTFEvent", backref="battle_submissions")
     challenge = db.relationship("CTFChallenge", backref="battle_submissions")
 
+    __table_args__ = (
+        db.Index("ix_battle_submission_event_created", "event_id", "created_at"),
+    )
+
 class UserSession(db.Model):
     __tablename__ = "ctf_battle_session"
 
@@ -157,3 +169,34 @@ class UserSession(db.Model):
     
     user = db.relationship("User", backref="battle_sessions")
     event = db.relationship("CTFEvent", backref="battle_sessions")
+
+    __table_args__ = (
+        db.Index("ix_battle_session_event_active", "event_id", "last_active"),
+    )
+
+class BattleScore(db.Model):
+    """Materialized per-event scoreboard, maintained in the same transaction as each CTFEventSolve."""
+    __tablename__ = "battle_score"
+
+    event_id = db.Column(db.Integer, db.ForeignKey("ctf_battle_event.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+
+    total_points = db.Column(db.Integer, nullable=False, default=0)
+    solve_count = db.Column(db.Integer, nullable=False, default=0)
+    last_solve_at = db.Column(db.DateTime)
+    rank = db.Column(db.Integer, nullable=False)
+
+    user = db.relationship("User")
+
+    __table_args__ = (
+        db.Index("ix_battle_score_event_rank", "event_id", "rank"),
+        db.Index("ix_battle_score_event_points", "event_id", "total_points", "last_solve_at"),
+    )
+
+class ScoreboardSnapshot(db.Model):
+    """Ranked scoreboard captured when an event is frozen (zlib-compressed JSON rows)."""
+    __tablename__ = "battle_scoreboard_snapshot"
+
+    event_id = db.Column(db.Integer, db.ForeignKey("ctf_battle_event.id", ondelete="CASCADE"), primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    payload = db.Column(db.LargeBinary, nullable=False)
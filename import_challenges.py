@@ -0,0 +1,56 @@
+"""
+Challenge Pack Import for Cybertec8 CTF Platform
+
+Imports a JSON challenge pack into a battle event with the same engine as the
+admin "Bulk Import" form (services/challenge_import.py), for packs too large
+to upload through the browser.
+
+Pack format:
+    [{"category": "Web", "challenges": [{"title": "...", "flag": "...",
+      "description": "...", "points": 100, "hint": "..."}]}, ...]
+
+Usage:
+    python import_challenges.py <event_id> <pack.json>            # Add new challenges
+    python import_challenges.py <event_id> <pack.json> --upsert   # Also update existing ones by title
+"""
+
+import sys
+from app import app, db
+from ctf_battle_models import CTFEvent
+from services import challenge_import
+from services.battle_arena import arena_cache
+
+
+def import_file(event_id, path, mode):
+    with app.app_context():
+        event = db.session.get(CTFEvent, event_id)
+        if not event:
+            print(f"❌ Event {event_id} not found.")
+            return False
+
+        with open(path, "rb") as stream:
+            report = challenge_import.import_pack(event.id, stream, mode=mode)
+
+        if not report.ok:
+            print(f"❌ '{path}' was rejected, nothing was imported:")
+            for error in report.errors:
+                print(f"  • {error}")
+            return False
+
+        arena_cache.invalidate(event.id)    # running app workers reload the arena on their next request
+        print(f"✅ Done: {report.summary()} in '{event.name}'.")
+        return True
+
+
+def print_usage():
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) != 2 or not args[0].isdigit():
+        print_usage()
+        sys.exit(1)
+
+    mode = "upsert" if "--upsert" in sys.argv else "insert"
+    sys.exit(0 if import_file(int(args[0]), args[1], mode) else 1)
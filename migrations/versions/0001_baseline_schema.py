@@ -0,0 +1,290 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 22:31:22.280800
+
+The schema as it stood when migrations were introduced. Databases that were
+built with create_all() and the patch_db*.py scripts already have these
+tables, so each one is only created if it is missing and `flask db upgrade`
+can be run on them directly.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def create_table_if_missing(name, *columns, **kw):
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns, **kw)
+
+
+def upgrade():
+    create_table_if_missing('blog',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('thumbnail', sa.String(length=255), nullable=True),
+    sa.Column('short_description', sa.Text(), nullable=True),
+    sa.Column('category', sa.String(length=100), nullable=True),
+    sa.Column('read_time', sa.String(length=50), nullable=True),
+    sa.Column('external_url', sa.String(length=500), nullable=True),
+    sa.Column('published_at', sa.DateTime(), nullable=True),
+    sa.Column('is_published', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('ctf_battle_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('end_time', sa.DateTime(), nullable=False),
+    sa.Column('visibility', sa.String(length=20), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('is_frozen', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('level', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('date', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('image', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('user',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=150), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('password', sa.String(length=150), nullable=True),
+    sa.Column('google_id', sa.String(length=100), nullable=True),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.Column('mobile', sa.String(length=15), nullable=True),
+    sa.Column('mobile_number', sa.String(length=15), nullable=True),
+    sa.Column('teams', sa.String(length=150), nullable=True),
+    sa.Column('events', sa.String(length=150), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('profile_image', sa.String(length=255), nullable=True),
+    sa.Column('avatar_type', sa.String(length=20), nullable=True),
+    sa.Column('avatar_filename', sa.String(length=255), nullable=True),
+    sa.Column('profile_completed', sa.Boolean(), nullable=True),
+    sa.Column('linkedin_url', sa.String(length=255), nullable=True),
+    sa.Column('github_url', sa.String(length=255), nullable=True),
+    sa.Column('discord_handle', sa.String(length=100), nullable=True),
+    sa.Column('xp', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('google_id'),
+    sa.UniqueConstraint('username')
+    )
+    create_table_if_missing('activity',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=255), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('ctf_battle_activity',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=255), nullable=False),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.Column('user_agent', sa.String(length=255), nullable=True),
+    sa.Column('city', sa.String(length=100), nullable=True),
+    sa.Column('region', sa.String(length=100), nullable=True),
+    sa.Column('country', sa.String(length=100), nullable=True),
+    sa.Column('lat', sa.Float(), nullable=True),
+    sa.Column('lon', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['ctf_battle_event.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('ctf_battle_category',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['ctf_battle_event.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('ctf_battle_session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.Column('user_agent', sa.String(length=255), nullable=True),
+    sa.Column('last_active', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['ctf_battle_event.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('ctf_task',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(length=150), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('flag', sa.String(length=150), nullable=True),
+    sa.Column('points', sa.Integer(), nullable=True),
+    sa.Column('level', sa.String(length=50), nullable=False),
+    sa.Column('challenge_file', sa.String(length=500), nullable=True),
+    sa.Column('preview_image', sa.String(length=500), nullable=True),
+    sa.Column('hint', sa.Text(), nullable=True),
+    sa.Column('solved_count', sa.Integer(), nullable=True),
+    sa.Column('submissions_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('event_registration',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('registered_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'event_id', name='unique_user_event_reg')
+    )
+    create_table_if_missing('team',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('invite_code', sa.String(length=20), nullable=True),
+    sa.Column('captain_id', sa.Integer(), nullable=True),
+    sa.Column('max_members', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['captain_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('invite_code')
+    )
+    create_table_if_missing('ctf_battle_challenge',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=150), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('flag', sa.String(length=255), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=True),
+    sa.Column('is_enabled', sa.Boolean(), nullable=True),
+    sa.Column('hint', sa.Text(), nullable=True),
+    sa.Column('files', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['category_id'], ['ctf_battle_category.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('task_like',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('task_id', sa.Integer(), nullable=True),
+    sa.Column('is_like', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['ctf_task.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'task_id', name='unique_user_task_like')
+    )
+    create_table_if_missing('task_solve',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('task_id', sa.Integer(), nullable=True),
+    sa.Column('solved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['ctf_task.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'task_id', name='unique_user_task_solve')
+    )
+    create_table_if_missing('task_submission',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('task_id', sa.Integer(), nullable=True),
+    sa.Column('submitted_flag', sa.String(length=255), nullable=True),
+    sa.Column('is_correct', sa.Boolean(), nullable=True),
+    sa.Column('submitted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['ctf_task.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('team_member',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('role', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['team.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('team_request',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['team.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_table_if_missing('ctf_battle_solve',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('challenge_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.Column('solved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['challenge_id'], ['ctf_battle_challenge.id'], ),
+    sa.ForeignKeyConstraint(['event_id'], ['ctf_battle_event.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'challenge_id', name='unique_user_battle_solve')
+    )
+    create_table_if_missing('ctf_battle_submission',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('challenge_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('flag', sa.String(length=255), nullable=False),
+    sa.Column('is_correct', sa.Boolean(), nullable=True),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.Column('user_agent', sa.String(length=255), nullable=True),
+    sa.Column('city', sa.String(length=100), nullable=True),
+    sa.Column('region', sa.String(length=100), nullable=True),
+    sa.Column('country', sa.String(length=100), nullable=True),
+    sa.Column('lat', sa.Float(), nullable=True),
+    sa.Column('lon', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['challenge_id'], ['ctf_battle_challenge.id'], ),
+    sa.ForeignKeyConstraint(['event_id'], ['ctf_battle_event.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('ctf_battle_submission')
+    op.drop_table('ctf_battle_solve')
+    op.drop_table('team_request')
+    op.drop_table('team_member')
+    op.drop_table('task_submission')
+    op.drop_table('task_solve')
+    op.drop_table('task_like')
+    op.drop_table('ctf_battle_challenge')
+    op.drop_table('team')
+    op.drop_table('event_registration')
+    op.drop_table('ctf_task')
+    op.drop_table('ctf_battle_session')
+    op.drop_table('ctf_battle_category')
+    op.drop_table('ctf_battle_activity')
+    op.drop_table('activity')
+    op.drop_table('user')
+    op.drop_table('event')
+    op.drop_table('ctf_battle_event')
+    op.drop_table('blog')
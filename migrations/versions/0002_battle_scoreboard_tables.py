@@ -0,0 +1,60 @@
+"""battle scoreboard tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 22:40:00.000000
+
+battle_score (materialized per-event ranking) and battle_scoreboard_snapshot
+(frozen scoreboard). Databases where recompute_scores.py already created them
+are left as they are.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def create_table_if_missing(name, *columns, **kw):
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns, **kw)
+
+
+def create_index_if_missing(name, table, columns):
+    existing = {ix['name'] for ix in sa.inspect(op.get_bind()).get_indexes(table)}
+    if name not in existing:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade():
+    create_table_if_missing('battle_score',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_points', sa.Integer(), nullable=False),
+    sa.Column('solve_count', sa.Integer(), nullable=False),
+    sa.Column('last_solve_at', sa.DateTime(), nullable=True),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['ctf_battle_event.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('event_id', 'user_id')
+    )
+    create_index_if_missing('ix_battle_score_event_points', 'battle_score', ['event_id', 'total_points', 'last_solve_at'])
+    create_index_if_missing('ix_battle_score_event_rank', 'battle_score', ['event_id', 'rank'])
+    create_table_if_missing('battle_scoreboard_snapshot',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['ctf_battle_event.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id')
+    )
+
+
+def downgrade():
+    op.drop_table('battle_scoreboard_snapshot')
+    op.drop_index('ix_battle_score_event_rank', table_name='battle_score')
+    op.drop_index('ix_battle_score_event_points', table_name='battle_score')
+    op.drop_table('battle_score')
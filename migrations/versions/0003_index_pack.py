@@ -0,0 +1,44 @@
+"""index pack for hot lookup columns
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 22:45:00.000000
+
+Secondary indexes for the per-event battle views (participants, submissions,
+security), the anti-cheat replay and the per-user activity feeds. Every one
+leads with the equality column and ends with the column the query sorts or
+ranges on. task_solve(user_id) is already covered by unique_user_task_solve.
+Checked by check_query_plans.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_activity_user_created', 'activity', ['user_id', 'created_at']),
+    ('ix_task_submission_task_submitted', 'task_submission', ['task_id', 'submitted_at']),
+    ('ix_battle_activity_event_ip', 'ctf_battle_activity', ['event_id', 'ip_address', 'user_id']),
+    ('ix_battle_activity_event_action', 'ctf_battle_activity', ['event_id', 'action']),
+    ('ix_battle_submission_event_created', 'ctf_battle_submission', ['event_id', 'created_at']),
+    ('ix_battle_solve_event_solved', 'ctf_battle_solve', ['event_id', 'solved_at']),
+    ('ix_battle_session_event_active', 'ctf_battle_session', ['event_id', 'last_active']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {ix['name'] for ix in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,38 @@
+"""stored_file table for content-addressed uploads
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 23:10:00.000000
+
+Metadata (SHA-256, size, MIME type, storage path) for every distinct
+uploaded file; services/storage.py deduplicates on the hash.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('stored_file'):
+        return
+    op.create_table('stored_file',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('mime_type', sa.String(length=100), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('original_name', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+
+
+def downgrade():
+    op.drop_table('stored_file')
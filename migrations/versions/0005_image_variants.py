@@ -0,0 +1,38 @@
+"""derivative paths for avatars and blog thumbnails
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 23:40:00.000000
+
+JSON maps of size -> resized WebP path, written by the image pipeline in
+services/images.py. Existing rows are filled by build_image_derivatives.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    ('user', 'avatar_variants'),
+    ('blog', 'thumbnail_variants'),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column in COLUMNS:
+        if column not in {c['name'] for c in inspector.get_columns(table)}:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.add_column(sa.Column(column, sa.JSON(), nullable=True))
+
+
+def downgrade():
+    for table, column in reversed(COLUMNS):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(column)
@@ -0,0 +1,36 @@
+"""backfill battle_score for events that predate it
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 09:00:00.000000
+
+battle_score is maintained by the submit path from 0002 on. Events whose
+solves were recorded before that have no rows, so their scoreboards would be
+empty. This fills them from ctf_battle_solve with the ordering used by
+services/battle_scores.recompute(). Events that already have rows are left
+alone.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        INSERT INTO battle_score (event_id, user_id, total_points, solve_count, last_solve_at, "rank")
+        SELECT event_id, user_id, SUM(points), COUNT(id), MAX(solved_at),
+               ROW_NUMBER() OVER (PARTITION BY event_id
+                                  ORDER BY SUM(points) DESC, MAX(solved_at), user_id)
+        FROM ctf_battle_solve
+        WHERE event_id NOT IN (SELECT DISTINCT event_id FROM battle_score)
+        GROUP BY event_id, user_id
+    """)
+
+
+def downgrade():
+    pass    # the rows are derived data; 0002's downgrade drops the table
@@ -0,0 +1,48 @@
+"""stored_file rows per (sha256, kind)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 10:00:00.000000
+
+An image and a challenge file with the same bytes get separate rows, so
+storing one can't repoint the other's path. Existing rows become
+kind='challenge'; an image re-uploaded later gets its own row.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+# SQLite's unique(sha256) from 0004 has no name; batch mode needs one to drop it
+NAMING = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'kind' in {c['name'] for c in inspector.get_columns('stored_file')}:
+        return
+    old = [uc['name'] or 'uq_stored_file_sha256' for uc in inspector.get_unique_constraints('stored_file')
+           if uc['column_names'] == ['sha256']]
+    with op.batch_alter_table('stored_file', naming_convention=NAMING) as batch_op:
+        batch_op.add_column(sa.Column('kind', sa.String(length=20), nullable=False, server_default='challenge'))
+        for name in old:
+            batch_op.drop_constraint(name, type_='unique')
+        batch_op.create_unique_constraint('uq_stored_file_sha256_kind', ['sha256', 'kind'])
+
+
+def downgrade():
+    # keep one row per hash again: drop image rows whose bytes also have a challenge row
+    op.execute(
+        "DELETE FROM stored_file WHERE kind = 'image' AND sha256 IN "
+        "(SELECT sha256 FROM stored_file WHERE kind = 'challenge')"
+    )
+    with op.batch_alter_table('stored_file', naming_convention=NAMING) as batch_op:
+        batch_op.drop_constraint('uq_stored_file_sha256_kind', type_='unique')
+        batch_op.drop_column('kind')
+        batch_op.create_unique_constraint('uq_stored_file_sha256', ['sha256'])
@@ -28,6 +28,7 @@ class User(db.Model, UserMixin):
     # AVATAR SYSTEM
     avatar_type = db.Column(db.String(20), default="default") # "default" or "custom"
     avatar_filename = db.Column(db.String(255), default="avatar1.png")
+    avatar_variants = db.Column(db.JSON, nullable=True) # {"sm": path, ...}, filled by services/images.py
     profile_completed = db.Column(db.Boolean, default=False)
 
       # SOCIAL LINKS
@@ -53,6 +54,10 @@ class Activity(db.Model):
 
     user = db.relationship("User", backref=db.backref("activities", lazy=True))
 
+    __table_args__ = (
+        db.Index("ix_activity_user_created", "user_id", "created_at"),
+    )
+
 
 # ---------------- TEAM MODEL ----------------
 
@@ -206,6 +211,10 @@ class TaskSubmission(db.Model):
     is_correct = db.Column(db.Boolean, default=False)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_task_submission_task_submitted", "task_id", "submitted_at"),
+    )
+
 
 # ---------------- BLOG MODEL ----------------
 
@@ -215,6 +224,7 @@ class Blog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     thumbnail = db.Column(db.String(255)) # Path to image
+    thumbnail_variants = db.Column(db.JSON, nullable=True) # resized WebP copies, see services/images.py
     short_description = db.Column(db.Text)
     category = db.Column(db.String(100))
     read_time = db.Column(db.String(50)) # e.g. "5 min read"
@@ -222,5 +232,35 @@ class Blog(db.Model):
     published_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_published = db.Column(db.Boolean, default=True)
 
+    @property
+    def thumbnail_path(self):
+        """Static path of the thumbnail; older rows store a bare filename under uploads/blogs."""
+        if self.thumbnail and "/" not in self.thumbnail:
+            return f"uploads/blogs/{self.thumbnail}"
+        return self.thumbnail
+
     def __repr__(self):
         return f"<Blog {self.title}>"
+
+
+# ---------------- STORED FILE MODEL ----------------
+
+class StoredFile(db.Model):
+    """One row per distinct uploaded content and kind (services/storage.py)."""
+    __tablename__ = "stored_file"
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False)
+    kind = db.Column(db.String(20), nullable=False, default="challenge", server_default="challenge")
+    size = db.Column(db.BigInteger, nullable=False)
+    mime_type = db.Column(db.String(100), nullable=False)
+    path = db.Column(db.String(255), nullable=False)  # storage key, relative to static/ for the local backend
+    original_name = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("sha256", "kind", name="uq_stored_file_sha256_kind"),
+    )
+
+    def __repr__(self):
+        return f"<StoredFile {self.kind} {self.sha256[:12]} {self.size}B>"
@@ -11,6 +11,7 @@ Usage:
 
 import sys
 from app import app, db, User
+from services.user_cache import user_cache
 
 
 def promote_user(email, force=False):
@@ -36,8 +37,8 @@ def promote_user(email, force=False):
 
         user.is_admin = True
         db.session.commit()
+        user_cache.invalidate(user.id)    # running app workers reload the user on their next request
         print(f"\n✅ Done: '{user.username}' ({email}) is now an admin.")
-        print("ℹ️  User must log out and log back in for changes to take effect.")
         return True
 
 
@@ -62,6 +63,7 @@ def revoke_admin(email, force=False):
 
         user.is_admin = False
         db.session.commit()
+        user_cache.invalidate(user.id)
         print(f"\n✅ Done: Admin access revoked from '{user.username}' ({email}).")
         return True
 
@@ -0,0 +1,72 @@
+"""
+Battle Scoreboard Maintenance for Cybertec8 CTF Platform
+
+Rebuilds the materialized `battle_score` table from `ctf_battle_solve`.
+
+Usage:
+    python recompute_scores.py recompute <event_id>   # Rebuild one event
+    python recompute_scores.py all                    # Rebuild every event
+"""
+
+import sys
+from app import app, db
+from ctf_battle_models import CTFEvent, BattleScore, ScoreboardSnapshot
+from services import battle_scores
+
+
+def ensure_table():
+    """Create battle_score (and the freeze snapshot table) if this database predates them."""
+    BattleScore.__table__.create(db.engine, checkfirst=True)
+    ScoreboardSnapshot.__table__.create(db.engine, checkfirst=True)
+
+
+def recompute_event(event_id):
+    """Rebuild the scoreboard rows for a single event."""
+    with app.app_context():
+        ensure_table()
+        event = db.session.get(CTFEvent, event_id)
+        if not event:
+            print(f"❌ Event {event_id} not found.")
+            return False
+        count = battle_scores.recompute(event.id)
+        db.session.commit()
+        print(f"✅ '{event.name}' [{event.id}]: {count} ranked players.")
+        return True
+
+
+def recompute_all():
+    """Rebuild the scoreboard rows for every event."""
+    with app.app_context():
+        ensure_table()
+        events = CTFEvent.query.order_by(CTFEvent.id).all()
+        for event in events:
+            count = battle_scores.recompute(event.id)
+            print(f"  • '{event.name}' [{event.id}]: {count} ranked players")
+        db.session.commit()
+        print(f"\n✅ Done: {len(events)} events recomputed.")
+
+
+def print_usage():
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print_usage()
+        sys.exit(1)
+
+    command = sys.argv[1].lower()
+
+    if command == "recompute":
+        if len(sys.argv) < 3 or not sys.argv[2].isdigit():
+            print("❌ Event id required.  Usage: python recompute_scores.py recompute <event_id>")
+            sys.exit(1)
+        recompute_event(int(sys.argv[2]))
+
+    elif command == "all":
+        recompute_all()
+
+    else:
+        print(f"❌ Unknown command '{command}'")
+        print_usage()
+        sys.exit(1)
@@ -0,0 +1,106 @@
+"""
+Counter Maintenance for Cybertec8 CTF Platform
+
+Rebuilds the denormalized counters that services/counters.py maintains
+write-behind: ctf_task.solved_count / submissions_count (from task_solve and
+task_submission) and user.xp (sum of points of solved tasks).
+
+Usage:
+    python recount_counters.py check    # Show rows whose counters disagree with the source rows
+    python recount_counters.py tasks    # Rebuild solved_count and submissions_count
+    python recount_counters.py xp       # Rebuild user.xp from solved tasks
+"""
+
+import sys
+from app import app, db
+from models import User, CTFTask, TaskSolve, TaskSubmission
+from services.counters import counter_buffer
+
+
+def _solves_for_task():
+    return db.session.query(db.func.count(TaskSolve.id))\
+        .filter(TaskSolve.task_id == CTFTask.id).scalar_subquery()
+
+
+def _submissions_for_task():
+    return db.session.query(db.func.count(TaskSubmission.id))\
+        .filter(TaskSubmission.task_id == CTFTask.id).scalar_subquery()
+
+
+def _xp_for_user():
+    return db.session.query(db.func.coalesce(db.func.sum(CTFTask.points), 0))\
+        .join(TaskSolve, TaskSolve.task_id == CTFTask.id)\
+        .filter(TaskSolve.user_id == User.id).scalar_subquery()
+
+
+def check():
+    """List counters that drifted from the underlying rows."""
+    with app.app_context():
+        counter_buffer.flush()
+        tasks = db.session.query(CTFTask.id, CTFTask.title, CTFTask.solved_count, _solves_for_task(),
+                                 CTFTask.submissions_count, _submissions_for_task()).all()
+        users = db.session.query(User.id, User.username, User.xp, _xp_for_user()).all()
+
+        drift = 0
+        for task_id, title, solved, real_solved, subs, real_subs in tasks:
+            if (solved or 0) != real_solved or (subs or 0) != real_subs:
+                drift += 1
+                print(f"  • task {task_id} '{title}': solved {solved} → {real_solved}, submissions {subs} → {real_subs}")
+        for user_id, username, xp, real_xp in users:
+            if (xp or 0) != real_xp:
+                drift += 1
+                print(f"  • user {user_id} '{username}': xp {xp} → {real_xp}")
+
+        if drift:
+            print(f"\n⚠️  {drift} rows differ. Run 'tasks' and/or 'xp' to rebuild.")
+        else:
+            print("✅ All counters match.")
+        return drift == 0
+
+
+def recount_tasks():
+    """Rebuild ctf_task.solved_count and submissions_count."""
+    with app.app_context():
+        counter_buffer.flush()
+        updated = CTFTask.query.update({
+            CTFTask.solved_count: _solves_for_task(),
+            CTFTask.submissions_count: _submissions_for_task(),
+        }, synchronize_session=False)
+        db.session.commit()
+        print(f"✅ Done: {updated} tasks recounted.")
+
+
+def recount_xp():
+    """Rebuild user.xp from the points of every solved task."""
+    with app.app_context():
+        counter_buffer.flush()
+        updated = User.query.update({User.xp: _xp_for_user()}, synchronize_session=False)
+        db.session.commit()
+        print(f"✅ Done: {updated} users recounted.")
+        print("ℹ️  Restart the app (or wait for the scoreboard rebuild) to refresh cached rankings.")
+
+
+def print_usage():
+    print(__doc__)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print_usage()
+        sys.exit(1)
+
+    command = sys.argv[1].lower()
+
+    if command == "check":
+        sys.exit(0 if check() else 1)
+
+    elif command == "tasks":
+        recount_tasks()
+
+    elif command == "xp":
+        recount_xp()
+
+    else:
+        print(f"❌ Unknown command '{command}'")
+        print_usage()
+        sys.exit(1)
@@ -1,11 +1,17 @@
-import os
-import uuid
-from flask import render_template, redirect, url_for, request, flash, current_app
-from werkzeug.utils import secure_filename
+from datetime import datetime
+from flask import render_template, redirect, url_for, request, flash, current_app, abort
 from flask_login import current_user, login_required
 from extensions import db
 from models import User, Team, TeamMember, Event, CTFTask, TaskSubmission, Activity, Blog
 from decorators import admin_required
+from services import solved_tasks, storage, images, dashboard_feed, user_cache
+from services.page_cache import invalidate_on_commit as invalidate_pages
+from services.storage import UploadRejected
+from services.scoreboard import scoreboard_index
+from services.perf import perf_stats, query_budget
+from services.db_profile import pool_stats
+from services.pagination import keyset_page, page_args, InvalidCursor
+from services.exports import PLATFORM_EXPORTS, FORMATS as EXPORT_FORMATS, export_response
 from . import admin_bp
 
 @admin_bp.route("/")
@@ -30,9 +36,37 @@ def dashboard():
     )
 
 @admin_bp.route("/users")
+@login_required
+@admin_required
 def manage_users():
-    users = User.query.all()
-    return render_template("admin/manage_users.html", users=users)
+    cursor, per_page = page_args(request)
+    try:
+        users = keyset_page(User.query, [User.id], cursor, per_page)
+    except InvalidCursor:
+        abort(400)
+    return render_template("admin/manage_users.html", users=users.items, next_cursor=users.next_cursor,
+                           first_page=cursor is None)
+
+@admin_bp.route("/api/users")
+@login_required
+@admin_required
+def api_users():
+    cursor, per_page = page_args(request)
+    try:
+        users = keyset_page(User.query, [User.id], cursor, per_page)
+    except InvalidCursor as e:
+        return {"success": False, "message": str(e)}, 400
+    return {
+        "users": [{
+            "id": u.id,
+            "username": u.username,
+            "email": u.email,
+            "is_admin": bool(u.is_admin),
+            "xp": u.xp or 0,
+            "created_at": u.created_at.isoformat() if u.created_at else None,
+        } for u in users.items],
+        "next_cursor": users.next_cursor,
+    }
 
 @admin_bp.route("/user/delete/<int:user_id>", methods=["POST"])
 def delete_user(user_id):
@@ -41,7 +75,9 @@ def delete_user(user_id):
         flash("You cannot delete yourself!", "danger")
         return redirect(url_for("admin.manage_users"))
     db.session.delete(user)
+    user_cache.invalidate_on_commit(user_id)
     db.session.commit()
+    scoreboard_index.remove_user(user_id)
     flash("User deleted successfully.", "success")
     return redirect(url_for("admin.manage_users"))
 
@@ -54,7 +90,6 @@ def admin_blogs():
 
 @admin_bp.route("/add-blog", methods=["GET", "POST"])
 def admin_add_blog():
-    upload_folder = os.path.join(current_app.static_folder, "uploads/blogs")
     if request.method == "POST":
         title = request.form.get("title")
         short_description = request.form.get("short_description")
@@ -63,12 +98,13 @@ def admin_add_blog():
         external_url = request.form.get("external_url")
 
         thumbnail_filename = None
-        if 'thumbnail' in request.files:
-            file = request.files['thumbnail']
-            if file and file.filename != "":
-                filename = secure_filename(file.filename)
-                file.save(os.path.join(upload_folder, filename))
-                thumbnail_filename = filename
+        file = request.files.get('thumbnail')
+        if file and file.filename != "":
+            try:
+                thumbnail_filename = images.save_image(file).path
+            except UploadRejected as e:
+                flash(str(e), "danger")
+                return render_template("admin/add_blog.html")
 
         new_blog = Blog(
             title=title,
@@ -79,6 +115,9 @@ def admin_add_blog():
             thumbnail=thumbnail_filename
         )
         db.session.add(new_blog)
+        if thumbnail_filename:
+            images.queue_derivatives(new_blog, "thumbnail")
+        invalidate_pages()
         db.session.commit()
         return redirect(url_for("admin.admin_blogs"))
 
@@ -87,7 +126,6 @@ def admin_add_blog():
 @admin_bp.route("/edit-blog/<int:blog_id>", methods=["GET", "POST"])
 def admin_edit_blog(blog_id):
     blog_item = Blog.query.get_or_404(blog_id)
-    upload_folder = os.path.join(current_app.static_folder, "uploads/blogs")
 
     if request.method == "POST":
         blog_item.title = request.form.get("title")
@@ -96,13 +134,17 @@ def admin_edit_blog(blog_id):
         blog_item.read_time = request.form.get("read_time")
         blog_item.external_url = request.form.get("external_url")
 
-        if 'thumbnail' in request.files:
-            file = request.files['thumbnail']
-            if file and file.filename != "":
-                filename = secure_filename(file.filename)
-                file.save(os.path.join(upload_folder, filename))
-                blog_item.thumbnail = filename
-
+        file = request.files.get('thumbnail')
+        if file and file.filename != "":
+            try:
+                blog_item.thumbnail = images.save_image(file).path
+            except UploadRejected as e:
+                db.session.rollback()
+                flash(str(e), "danger")
+                return render_template("admin/add_blog.html", blog=blog_item)
+            images.queue_derivatives(blog_item, "thumbnail")
+
+        invalidate_pages()
         db.session.commit()
         return redirect(url_for("admin.admin_blogs"))
 
@@ -112,6 +154,7 @@ def admin_edit_blog(blog_id):
 def admin_delete_blog(blog_id):
     blog_item = Blog.query.get_or_404(blog_id)
     db.session.delete(blog_item)
+    invalidate_pages()
     db.session.commit()
     return redirect(url_for("admin.admin_blogs"))
 
@@ -157,29 +200,21 @@ def admin_add_task():
 
         challenge_file_path = None
         preview_image_path = None
-        
-        upload_dir = os.path.join(current_app.static_folder, 'uploads', 'ctf')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        if 'challenge_file' in request.files:
-            files = request.files.getlist('challenge_file')
-            uploaded_files = []
-            for file in files:
-                if file and file.filename:
-                    ext = os.path.splitext(file.filename)[1]
-                    unique_filename = f"{uuid.uuid4().hex}{ext}"
-                    file.save(os.path.join(upload_dir, unique_filename))
-                    uploaded_files.append(f"uploads/ctf/{unique_filename}")
+
+        # Content-addressed: identical files are stored once (services/storage.py)
+        try:
+            uploaded_files = [storage.save_upload(file).path
+                              for file in request.files.getlist('challenge_file') if file and file.filename]
             if uploaded_files:
                 challenge_file_path = ','.join(uploaded_files)
-        
-        if 'preview_image' in request.files:
-            file = request.files['preview_image']
+
+            file = request.files.get('preview_image')
             if file and file.filename:
-                ext = os.path.splitext(file.filename)[1]
-                unique_filename = f"{uuid.uuid4().hex}{ext}"
-                file.save(os.path.join(upload_dir, unique_filename))
-                preview_image_path = f"uploads/ctf/{unique_filename}"
+                preview_image_path = images.save_image(file).path
+        except UploadRejected as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return render_template("admin/add_task.html", events=events)
 
         form_level = request.form.get("level")
         task = CTFTask(
@@ -207,21 +242,23 @@ def admin_manage_tasks():
     return render_template("admin/manage_tasks.html", tasks=tasks)
 
 @admin_bp.route("/manage-teams")
+@query_budget(4)
 def admin_manage_teams():
-    teams = Team.query.all()
-    team_data = []
-
-    for team in teams:
-        captain = User.query.get(team.captain_id)
-        used_count = TeamMember.query.filter_by(team_id=team.id).count()
-
-        team_data.append({
-            "id": team.id,
-            "name": team.name,
-            "captain_username": captain.username if captain else "N/A",
-            "invite_code": team.invite_code,
-            "used_count": used_count
-        })
+    member_counts = db.session.query(TeamMember.team_id, db.func.count(TeamMember.id).label("used_count"))\
+        .group_by(TeamMember.team_id).subquery()
+    rows = db.session.query(Team, User.username, member_counts.c.used_count)\
+        .outerjoin(User, User.id == Team.captain_id)\
+        .outerjoin(member_counts, member_counts.c.team_id == Team.id)\
+        .order_by(Team.id)\
+        .all()
+
+    team_data = [{
+        "id": team.id,
+        "name": team.name,
+        "captain_username": captain_username or "N/A",
+        "invite_code": team.invite_code,
+        "used_count": used_count or 0
+    } for team, captain_username, used_count in rows]
 
     return render_template("admin/manage_teams.html", team_data=team_data)
 
@@ -232,6 +269,7 @@ def admin_delete_team(team_id):
     from models import TeamRequest
     TeamRequest.query.filter_by(team_id=team_id).delete()
     Team.query.filter_by(id=team_id).delete()
+    dashboard_feed.bump_on_commit()
     db.session.commit()
     flash("Team decommissioned successfully.", "success")
     return redirect(url_for("admin.admin_manage_teams"))
@@ -256,6 +294,44 @@ def admin_delete_task(task_id):
     TaskSubmission.query.filter_by(task_id=task.id).delete()
     TaskLike.query.filter_by(task_id=task.id).delete()
     db.session.delete(task)
+    dashboard_feed.bump_on_commit()
     db.session.commit()
+    solved_tasks.invalidate()
     flash("Task deleted successfully.", "success")
     return redirect(url_for("admin.admin_manage_tasks"))
+
+# ---------------- EXPORTS ----------------
+
+@admin_bp.route("/export/<dataset>")
+@login_required
+@admin_required
+def admin_export(dataset):
+    """Stream task solves or task submissions as ?format=csv|jsonl."""
+    fmt = request.args.get("format", "csv")
+    if dataset not in PLATFORM_EXPORTS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    return export_response(PLATFORM_EXPORTS[dataset], fmt)
+
+# ---------------- PERFORMANCE ----------------
+
+@admin_bp.route("/perf")
+@login_required
+@admin_required
+def perf():
+    endpoints, recent = perf_stats.report()
+    return render_template("admin/perf.html",
+        endpoints=endpoints,
+        recent=recent,
+        since=datetime.fromtimestamp(perf_stats.since),
+        threshold=current_app.config.get("PERF_NPLUSONE_THRESHOLD", 5),
+        tracing=current_app.config.get("PERF_TRACING", True),
+        pool=pool_stats(db.engine)
+    )
+
+@admin_bp.route("/perf/reset", methods=["POST"])
+@login_required
+@admin_required
+def perf_reset():
+    perf_stats.reset()
+    flash("Performance counters reset.", "success")
+    return redirect(url_for("admin.perf"))
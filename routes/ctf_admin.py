@@ -1,10 +1,11 @@
-import os
-import uuid
-from flask import render_template, redirect, url_for, request, flash, current_app
+from flask import render_template, redirect, url_for, request, flash
 from flask_login import current_user
 from extensions import db
 from models import Event, CTFTask, Team, User, TeamMember
 from decorators import ctf_admin_required
+from services import storage, images
+from services.perf import query_budget
+from services.storage import UploadRejected
 from . import ctf_admin_bp
 
 @ctf_admin_bp.route("/dashboard")
@@ -27,29 +28,21 @@ def add_task():
         
         challenge_file_path = None
         preview_image_path = None
-        
-        upload_dir = os.path.join(current_app.static_folder, 'uploads', 'ctf')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        if 'challenge_file' in request.files:
-            files = request.files.getlist('challenge_file')
-            uploaded_files = []
-            for file in files:
-                if file and file.filename:
-                    ext = os.path.splitext(file.filename)[1]
-                    unique_filename = f"{uuid.uuid4().hex}{ext}"
-                    file.save(os.path.join(upload_dir, unique_filename))
-                    uploaded_files.append(f"uploads/ctf/{unique_filename}")
+
+        # Content-addressed: identical files are stored once (services/storage.py)
+        try:
+            uploaded_files = [storage.save_upload(file).path
+                              for file in request.files.getlist('challenge_file') if file and file.filename]
             if uploaded_files:
                 challenge_file_path = ','.join(uploaded_files)
-        
-        if 'preview_image' in request.files:
-            file = request.files['preview_image']
+
+            file = request.files.get('preview_image')
             if file and file.filename:
-                ext = os.path.splitext(file.filename)[1]
-                unique_filename = f"{uuid.uuid4().hex}{ext}"
-                file.save(os.path.join(upload_dir, unique_filename))
-                preview_image_path = f"uploads/ctf/{unique_filename}"
+                preview_image_path = images.save_image(file).path
+        except UploadRejected as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return render_template("ctf_admin/add_task.html", events=events)
 
         task = CTFTask(
             title=request.form.get("title"),
@@ -71,19 +64,22 @@ def add_task():
 
 @ctf_admin_bp.route("/teams")
 @ctf_admin_required
+@query_budget(4)
 def manage_teams():
-    teams = Team.query.all()
-    team_data = []
-    for team in teams:
-        captain = User.query.get(team.captain_id)
-        member_count = TeamMember.query.filter_by(team_id=team.id).count()
-        team_data.append({
-            "id": team.id,
-            "name": team.name,
-            "captain_username": captain.username if captain else "N/A",
-            "invite_code": team.invite_code,
-            "member_count": member_count
-        })
+    member_counts = db.session.query(TeamMember.team_id, db.func.count(TeamMember.id).label("member_count"))\
+        .group_by(TeamMember.team_id).subquery()
+    rows = db.session.query(Team, User.username, member_counts.c.member_count)\
+        .outerjoin(User, User.id == Team.captain_id)\
+        .outerjoin(member_counts, member_counts.c.team_id == Team.id)\
+        .order_by(Team.id)\
+        .all()
+    team_data = [{
+        "id": team.id,
+        "name": team.name,
+        "captain_username": captain_username or "N/A",
+        "invite_code": team.invite_code,
+        "member_count": member_count or 0
+    } for team, captain_username, member_count in rows]
     return render_template("ctf_admin/manage_teams.html", team_data=team_data)
 
 @ctf_admin_bp.route("/scoreboard")
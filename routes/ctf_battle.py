@@ -1,105 +1,38 @@
+import time
 from functools import wraps
-import json
-import requests
 from datetime import datetime, timedelta
-from flask import render_template, redirect, url_for, request, flash, current_app, Blueprint, abort
+from flask import render_template, redirect, url_for, request, flash, current_app, Blueprint, abort, Response
 from flask_login import current_user, login_required
 from extensions import db
 from models import User
 from ctf_battle_models import CTFEvent, CTFCategory, CTFChallenge, CTFEventSolve, ActivityLog, Submission, UserSession
 
 from decorators import admin_required
+from services import battle_submission, battle_scores, battle_freeze, challenge_import
+from services.anticheat import detector
+from services.battle_arena import arena_cache
+from services.pubsub import get_bus, battle_channel, format_sse
+from services.ratelimit import rate_limit
+from services.pagination import keyset_page, page_args, InvalidCursor
+from services.exports import BATTLE_EXPORTS, LEGACY_SCOREBOARD_CSV, FORMATS as EXPORT_FORMATS, export_response
 from . import ctf_battle_bp, battle_bp
 
 # ---------------- UTILS ----------------
 
 def log_battle_activity(user_id, action, event_id=None):
-    ip = request.remote_addr
-    # In production with proxy, use request.headers.get('X-Forwarded-For', request.remote_addr)
-    
-    geo_data = {}
-    try:
-        # Using ip-api.com (free demo, limited to 45 req/min)
-        # For production use a paid service or local MaxMind database
-        response = requests.get(f"http://ip-api.com/json/{ip}", timeout=2)
-        if response.status_code == 200:
-            geo_data = response.json()
-    except Exception as e:
-        print(f"GeoIP error: {e}")
-
-    log = ActivityLog(
-        user_id=user_id,
-        action=action,
-        event_id=event_id,
-        ip_address=ip,
-        user_agent=request.headers.get('User-Agent'),
-        city=geo_data.get('city'),
-        region=geo_data.get('regionName'),
-        country=geo_data.get('country'),
-        lat=geo_data.get('lat'),
-        lon=geo_data.get('lon')
-    )
-    db.session.add(log)
-    
-    # Update or create session
-    if event_id:
-        sess = UserSession.query.filter_by(user_id=user_id, event_id=event_id).first()
-        if not sess:
-            sess = UserSession(user_id=user_id, event_id=event_id)
-            db.session.add(sess)
-        sess.ip_address = ip
-        sess.user_agent = request.headers.get('User-Agent')
-        sess.last_active = datetime.utcnow()
-
+    # Behind a proxy, remote_addr is the client's address once TRUSTED_PROXY_COUNT is set (app.py)
+    battle_submission.add_activity(user_id, action, event_id, request.remote_addr, request.headers.get('User-Agent'))
     db.session.commit()
 
 def record_submission(user_id, event_id, challenge_id, flag, is_correct):
-    ip = request.remote_addr
-    geo_data = {}
-    try:
-        response = requests.get(f"http://ip-api.com/json/{ip}", timeout=2)
-        if response.status_code == 200:
-            geo_data = response.json()
-    except:
-        pass
-
-    sub = Submission(
-        user_id=user_id,
-        event_id=event_id,
-        challenge_id=challenge_id,
-        flag=flag,
-        is_correct=is_correct,
-        ip_address=ip,
-        user_agent=request.headers.get('User-Agent'),
-        city=geo_data.get('city'),
-        region=geo_data.get('regionName'),
-        country=geo_data.get('country'),
-        lat=geo_data.get('lat'),
-        lon=geo_data.get('lon')
-    )
-    db.session.add(sub)
+    sub = battle_submission.add_submission(user_id, event_id, challenge_id, flag, is_correct,
+                                           request.remote_addr, request.headers.get('User-Agent'))
     db.session.commit()
     return sub
 
 def check_anti_cheat(user_id, event_id, challenge_id, ip_address, flag):
-    # 1. Same IP Check: Multiple users from same IP
-    same_ip_count = User.query.join(ActivityLog).filter(
-        ActivityLog.ip_address == ip_address,
-        ActivityLog.event_id == event_id,
-        User.id != user_id
-    ).distinct().count()
-    
-    if same_ip_count > 0:
-        log_battle_activity(user_id, f"SECURITY ALERT: IP reuse detected ({ip_address})", event_id=event_id)
-
-    # 2. Flag Sharing Check: Rapid solves of the same flag
-    recent_solves = CTFEventSolve.query.filter(
-        CTFEventSolve.challenge_id == challenge_id,
-        CTFEventSolve.solved_at > datetime.utcnow() - timedelta(minutes=5)
-    ).count()
-    
-    if recent_solves > 3: # threshold for "rapid" solves
-        log_battle_activity(user_id, f"SECURITY ALERT: Rapid solve pattern for challenge {challenge_id}", event_id=event_id)
+    battle_submission.run_anti_cheat_checks(user_id, event_id, challenge_id, ip_address, request.headers.get('User-Agent'))
+    db.session.commit()
 
 # ---------------- ADMIN ROUTES ----------------
 
@@ -155,6 +88,7 @@ def admin_add_category(event_id):
     cat = CTFCategory(event_id=event_id, name=request.form.get("cat_name"))
     db.session.add(cat)
     db.session.commit()
+    arena_cache.invalidate(event_id)
     flash(f"Category '{cat.name}' added.", "success")
     return redirect(url_for("ctf_battle.event_hub", event_id=event_id, tab='challenges'))
 
@@ -171,6 +105,7 @@ def admin_add_challenge(event_id):
     )
     db.session.add(chal)
     db.session.commit()
+    arena_cache.invalidate(event_id)
     flash(f"Challenge '{chal.title}' deployed.", "success")
     return redirect(url_for("ctf_battle.event_hub", event_id=event_id, tab='challenges'))
 
@@ -180,27 +115,21 @@ def admin_bulk_upload(event_id):
     event = CTFEvent.query.get_or_404(event_id)
     file = request.files.get("json_file")
     if file:
-        data = json.load(file)
         # Expected format: [{"category": "Web", "challenges": [...]}, ...]
-        for item in data:
-            cat = CTFCategory.query.filter_by(event_id=event.id, name=item['category']).first()
-            if not cat:
-                cat = CTFCategory(event_id=event.id, name=item['category'])
-                db.session.add(cat)
-                db.session.commit()
-            
-            for chal_data in item.get('challenges', []):
-                chal = CTFChallenge(
-                    category_id=cat.id,
-                    title=chal_data['title'],
-                    description=chal_data['description'],
-                    flag=chal_data['flag'],
-                    points=chal_data.get('points', 100),
-                    hint=chal_data.get('hint', "")
-                )
-                db.session.add(chal)
-        db.session.commit()
-        flash("Bulk upload successful.", "success")
+        report = challenge_import.import_pack(event.id, file.stream, mode=request.form.get("mode", "insert"))
+        if report.ok:
+            arena_cache.invalidate(event.id)
+            log_battle_activity(current_user.id, f"Bulk import ({report.mode}): {report.summary()}", event_id=event.id)
+        if request.accept_mimetypes.best == "application/json":
+            return report.to_dict(), 200 if report.ok else 400
+
+        if report.ok:
+            flash(f"Bulk upload successful: {report.summary()}.", "success")
+        else:
+            shown = report.errors[:10]
+            more = len(report.errors) - len(shown)
+            flash("Bulk upload rejected, nothing was imported. " + "; ".join(shown)
+                  + (f" (+{more} more)" if more > 0 else ""), "danger")
     return redirect(url_for("ctf_battle.event_hub", event_id=event.id, tab='challenges'))
 
 @ctf_battle_bp.route("/event/<int:event_id>")
@@ -220,17 +149,19 @@ def event_hub(event_id):
     elif tab == 'participants':
         data['participants'] = UserSession.query.filter_by(event_id=event.id).order_by(UserSession.last_active.desc()).all()
     elif tab == 'submissions':
-        data['submissions'] = Submission.query.filter_by(event_id=event.id).order_by(Submission.created_at.desc()).limit(100).all()
+        cursor, per_page = page_args(request, default=100)
+        try:
+            page = _submissions_page(event.id, cursor, per_page)
+        except InvalidCursor:
+            abort(400)
+        data['submissions'] = page.items
+        data['next_cursor'] = page.next_cursor
+        data['first_page'] = cursor is None
     elif tab == 'scoreboard':
-        data['scores'] = db.session.query(
-            User.username, 
-            db.func.sum(CTFEventSolve.points).label('total_points'),
-            db.func.max(CTFEventSolve.solved_at).label('last_solve')
-        ).join(CTFEventSolve, User.id == CTFEventSolve.user_id)\
-         .filter(CTFEventSolve.event_id == event.id)\
-         .group_by(User.id)\
-         .order_by(db.desc('total_points'), 'last_solve')\
-         .all()
+        data['scores'] = battle_scores.scoreboard_query(event.id).all()
+        if event.is_frozen:
+            snapshot = battle_freeze.get_snapshot(event.id)
+            data['frozen_at'] = snapshot[0] if snapshot else None
     elif tab == 'security':
         # Detective queries
         data['alerts'] = ActivityLog.query.filter(
@@ -254,12 +185,45 @@ def event_hub(event_id):
                            total_solves=total_solves,
                            **data)
 
+def _submissions_page(event_id, cursor, per_page):
+    """Newest-first page of an event's submissions, walked by (created_at, id) cursor."""
+    query = Submission.query.filter_by(event_id=event_id)\
+        .options(db.joinedload(Submission.user), db.joinedload(Submission.challenge))
+    return keyset_page(query, [Submission.created_at, Submission.id], cursor, per_page)
+
+@ctf_battle_bp.route("/event/<int:event_id>/api/submissions")
+@admin_required
+def admin_api_submissions(event_id):
+    event = CTFEvent.query.get_or_404(event_id)
+    cursor, per_page = page_args(request, default=100)
+    try:
+        page = _submissions_page(event.id, cursor, per_page)
+    except InvalidCursor as e:
+        return {"success": False, "message": str(e)}, 400
+    return {
+        "submissions": [{
+            "id": sub.id,
+            "created_at": sub.created_at.isoformat() if sub.created_at else None,
+            "user_id": sub.user_id,
+            "username": sub.user.username,
+            "challenge_id": sub.challenge_id,
+            "challenge": sub.challenge.title,
+            "flag": sub.flag,
+            "is_correct": bool(sub.is_correct),
+            "ip_address": sub.ip_address,
+            "city": sub.city,
+            "country": sub.country,
+        } for sub in page.items],
+        "next_cursor": page.next_cursor,
+    }
+
 @ctf_battle_bp.route("/event/<int:event_id>/challenge/toggle/<int:chal_id>", methods=["POST"])
 @admin_required
 def admin_toggle_challenge(event_id, chal_id):
     chal = CTFChallenge.query.get_or_404(chal_id)
     chal.is_enabled = not chal.is_enabled
     db.session.commit()
+    arena_cache.invalidate(event_id)
     flash(f"Challenge '{chal.title}' {'enabled' if chal.is_enabled else 'disabled'}.", "success")
     return redirect(url_for("ctf_battle.event_hub", event_id=event_id, tab='challenges'))
 
@@ -267,8 +231,13 @@ def admin_toggle_challenge(event_id, chal_id):
 @admin_required
 def admin_freeze_scoreboard(event_id):
     event = CTFEvent.query.get_or_404(event_id)
-    event.is_frozen = not event.is_frozen
-    db.session.commit()
+    if event.is_frozen:
+        frozen_at = battle_freeze.unfreeze(event)
+        db.session.commit()
+        battle_freeze.replay_since(event.id, frozen_at)
+    else:
+        battle_freeze.freeze(event)
+        db.session.commit()
     status = "FROZEN" if event.is_frozen else "UNFROZEN"
     flash(f"Scoreboard is now {status}.", "success")
     return redirect(url_for("ctf_battle.event_hub", event_id=event.id, tab='scoreboard'))
@@ -276,28 +245,18 @@ def admin_freeze_scoreboard(event_id):
 @ctf_battle_bp.route("/event/<int:event_id>/export-csv")
 @admin_required
 def admin_export_scoreboard_csv(event_id):
-    import io, csv
-    from flask import Response
-    
     event = CTFEvent.query.get_or_404(event_id)
-    scores = db.session.query(
-        User.username, 
-        User.email,
-        db.func.sum(CTFEventSolve.points).label('total_points')
-    ).join(CTFEventSolve, User.id == CTFEventSolve.user_id)\
-     .filter(CTFEventSolve.event_id == event.id)\
-     .group_by(User.id)\
-     .order_by(db.desc('total_points'))\
-     .all()
-    
-    si = io.StringIO()
-    cw = csv.writer(si)
-    cw.writerow(['Rank', 'Username', 'Email', 'Total Points'])
-    for i, s in enumerate(scores):
-        cw.writerow([i+1, s.username, s.email, s.total_points])
-    
-    output.headers["Content-Disposition"] = f"attachment; filename=scoreboard_event_{event_id}.csv"
-    return output
+    return export_response(LEGACY_SCOREBOARD_CSV, "csv", event_id=event.id)
+
+@ctf_battle_bp.route("/event/<int:event_id>/export/<dataset>")
+@admin_required
+def admin_export(event_id, dataset):
+    """Stream the scoreboard, submissions or activity log as ?format=csv|jsonl."""
+    event = CTFEvent.query.get_or_404(event_id)
+    fmt = request.args.get("format", "csv")
+    if dataset not in BATTLE_EXPORTS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    return export_response(BATTLE_EXPORTS[dataset], fmt, event_id=event.id)
 
 @ctf_battle_bp.route("/event/<int:event_id>/toggle-status", methods=["POST"])
 @admin_required
@@ -330,6 +289,8 @@ def admin_delete_event(event_id):
     name = event.name
     db.session.delete(event)
     db.session.commit()
+    detector.forget(event_id)
+    arena_cache.invalidate(event_id)
     flash(f"Operation '{name}' has been terminated and all data purged.", "danger")
     return redirect(url_for("ctf_battle.admin_dashboard"))
 
@@ -385,66 +346,135 @@ def event_arena(event_id):
     
     if now > event.end_time:
         # Scoreboard final view
-        scores = db.session.query(
-            User.username, 
-            db.func.sum(CTFEventSolve.points).label('total_points'),
-            db.func.max(CTFEventSolve.solved_at).label('last_solve')
-        ).join(CTFEventSolve, User.id == CTFEventSolve.user_id)\
-         .filter(CTFEventSolve.event_id == event.id)\
-         .group_by(User.id)\
-         .order_by(db.desc('total_points'), 'last_solve')\
-         .all()
+        scores = battle_freeze.scoreboard(event, live=current_user.is_admin)
         return render_template("ctf_battle/event_ended.html", event=event, scores=scores)
     
     # Live event view
     log_battle_activity(current_user.id, "Entered Arena", event_id=event.id)
-    user_solves = [s.challenge_id for s in CTFEventSolve.query.filter_by(user_id=current_user.id, event_id=event.id).all()]
-    return render_template("ctf_battle/event_live.html", event=event, user_solves=user_solves)
+    user_solves = {cid for (cid,) in db.session.query(CTFEventSolve.challenge_id)
+                   .filter_by(user_id=current_user.id, event_id=event.id)}
+    return render_template("ctf_battle/event_live.html", event=event, user_solves=user_solves,
+                           categories=arena_cache.tree(event.id),
+                           solve_counts=battle_freeze.solve_counts(event, live=current_user.is_admin))
 
 @battle_bp.route("/submit", methods=["POST"])
+@rate_limit("flag_submit")
 @login_required
 def submit_flag():
-    challenge_id = request.form.get("challenge_id")
-    submitted_flag = request.form.get("flag").strip()
-    
-    challenge = CTFChallenge.query.get_or_404(challenge_id)
-    event = challenge.category_rel.event
-    now = datetime.utcnow()
-    
-    if now < event.start_time or now > event.end_time:
-        flash("Event is not live.", "danger")
-        return redirect(url_for("battle.event_arena", event_id=event.id))
-    
-    if event.status == "Paused":
-        flash("Event is currently paused by administrator.", "warning")
-        return redirect(url_for("battle.event_arena", event_id=event.id))
-    
-    existing_solve = CTFEventSolve.query.filter_by(user_id=current_user.id, challenge_id=challenge.id).first()
-    if existing_solve:
-        flash("Already solved.", "warning")
-        return redirect(url_for("battle.event_arena", event_id=event.id))
-    
-    is_correct = (submitted_flag == challenge.flag)
-    
-    # Record everything for monitoring
-    record_submission(current_user.id, event.id, challenge.id, submitted_flag, is_correct)
-    
-    # Perform Anti-cheat check
-    check_anti_cheat(current_user.id, event.id, challenge.id, request.remote_addr, submitted_flag)
-
-    if is_correct:
-        solve = CTFEventSolve(
-            event_id=event.id,
-            challenge_id=challenge.id,
-            user_id=current_user.id,
-            points=challenge.points
-        )
-        db.session.add(solve)
-        log_battle_activity(current_user.id, f"Solved challenge: {challenge.title}", event_id=event.id)
-        db.session.commit()
-        flash("Correct flag!", "success")
-    else:
-        log_battle_activity(current_user.id, f"Incorrect flag submission for: {challenge.title}", event_id=event.id)
-        flash("Wrong flag.", "danger")
-        
-    return redirect(url_for("battle.event_arena", event_id=event.id))
+    result = battle_submission.submit_flag(
+        current_user.id,
+        request.form.get("challenge_id", type=int),
+        (request.form.get("flag") or "").strip(),
+        ip=request.remote_addr,
+        user_agent=request.headers.get('User-Agent')
+    )
+    if result.status == "not_found":
+        abort(404)
+
+    flash(result.message, result.category)
+    return redirect(url_for("battle.event_arena", event_id=result.event_id))
+
+@battle_bp.route("/api/submit", methods=["POST"])
+@rate_limit("flag_submit")
+@login_required
+def api_submit_flag():
+    data = request.get_json(silent=True) or {}
+    result = battle_submission.submit_flag(
+        current_user.id,
+        data.get("challenge_id"),
+        (data.get("flag") or "").strip(),
+        ip=request.remote_addr,
+        user_agent=request.headers.get('User-Agent')
+    )
+    return result.to_dict(), 404 if result.status == "not_found" else 200
+
+@battle_bp.route("/event/<int:event_id>/scoreboard")
+@login_required
+def event_scoreboard(event_id):
+    event = CTFEvent.query.get_or_404(event_id)
+    rows = battle_freeze.scoreboard(event, live=current_user.is_admin)
+    return {
+        "event_id": event.id,
+        "frozen": bool(event.is_frozen),
+        "scores": [
+            {
+                "rank": r.rank,
+                "username": r.username,
+                "total_points": r.total_points,
+                "solve_count": r.solve_count,
+                "last_solve": r.last_solve.isoformat() if r.last_solve else None,
+                "is_current_user": r.user_id == current_user.id,
+            }
+            for r in rows
+        ],
+    }
+
+@battle_bp.route("/event/<int:event_id>/stream")
+@login_required
+def event_stream(event_id):
+    event = CTFEvent.query.get_or_404(event_id)
+    is_admin = current_user.is_admin
+    app = current_app._get_current_object()
+    keepalive = current_app.config.get("SSE_KEEPALIVE_SECONDS", 15)
+    resync_every = current_app.config.get("SSE_RESYNC_SECONDS", 10)
+
+    # Initial per-challenge solve counts (as of the freeze for participants of a frozen event);
+    # everything after this is pushed by the submit path
+    snapshot = {"solve_counts": dict(battle_freeze.solve_counts(event, live=is_admin)), "frozen": bool(event.is_frozen)}
+    db.session.remove()  # don't hold a pooled connection for the lifetime of the stream
+
+    sub = get_bus().subscribe(battle_channel(event_id))
+    sent = dict(snapshot["solve_counts"])
+    state = {"frozen": snapshot["frozen"]}
+
+    def hidden():
+        """Participants get no solve/score progress while the board is frozen."""
+        return state["frozen"] and not is_admin
+
+    def resync():
+        """Counts that changed without a message on this worker's bus (solves handled by other workers)."""
+        with app.app_context():
+            try:
+                state["frozen"] = battle_freeze.is_frozen(event_id)
+                if hidden():
+                    return {}
+                counts = arena_cache.solve_counts(event_id)    # shared per worker, re-read every ARENA_COUNTS_TTL
+                changed = {cid: n for cid, n in counts.items() if n > sent.get(cid, 0)}
+            finally:
+                db.session.remove()
+        sent.update(changed)
+        return changed
+
+    def generate():
+        try:
+            yield format_sse("snapshot", snapshot)
+            synced_at = time.monotonic()
+            while True:
+                message = sub.get(timeout=min(keepalive, resync_every))
+                if message is not None:
+                    if "frozen" in message:
+                        state["frozen"] = message["frozen"]
+                    if message["type"] == "unfrozen":
+                        state["frozen"] = False
+                        synced_at = 0    # catch the counts up right away
+                    if not (message["type"] in ("solve", "score") and hidden()):
+                        if message["type"] == "solve":
+                            sent[message["challenge_id"]] = max(sent.get(message["challenge_id"], 0), message["solve_count"])
+                        yield format_sse(message["type"], message)
+                if time.monotonic() - synced_at >= resync_every:
+                    synced_at = time.monotonic()
+                    changed = resync()
+                    if changed:
+                        yield format_sse("snapshot", {"solve_counts": changed})
+                        if is_admin or not state["frozen"]:
+                            yield format_sse("score", {"type": "score", "resync": True})
+                        continue
+                if message is None:
+                    yield ": keepalive\n\n"
+        finally:
+            sub.close()
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
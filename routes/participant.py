@@ -1,8 +1,6 @@
 import os
-from datetime import datetime
-from flask import render_template, redirect, url_for, request, flash, current_app, abort
+from flask import render_template, redirect, url_for, request, flash, abort
 from flask_login import current_user, login_required
-from werkzeug.utils import secure_filename
 from extensions import db
 from models import (
     User, Team, TeamMember, TeamRequest, 
@@ -10,6 +8,12 @@ from models import (
     TaskSolve, TaskLike, TaskSubmission, Activity
 )
 from utils import generate_invite_code
+from services import solved_tasks, counters, audit, images, dashboard_feed, user_cache
+from services.scoreboard import scoreboard_index
+from services.perf import query_budget
+from services.pagination import page_args, encode_cursor, decode_cursor, InvalidCursor
+from services.ratelimit import rate_limit
+from services.storage import UploadRejected
 from . import participant_bp
 
 
@@ -35,6 +39,7 @@ def scoreboard():
 @login_required
 def profile():
     if request.method == "POST":
+        user = current_user.row
         new_username = request.form.get("username")
         new_mobile = request.form.get("mobile")
         new_bio = request.form.get("bio")
@@ -44,27 +49,28 @@ def profile():
         selected_avatar = request.form.get("avatar")
 
         # Username validation
-        if new_username and new_username != current_user.username:
+        if new_username and new_username != user.username:
             existing_user = User.query.filter_by(username=new_username).first()
             if existing_user:
                 flash("Username already taken!", "danger")
                 return render_template("auth/test_profile.html")
-            current_user.username = new_username
+            user.username = new_username
 
         # Avatar selection
         if selected_avatar:
-            current_user.avatar_filename = selected_avatar
-            current_user.avatar_type = "default"
+            user.avatar_filename = selected_avatar
+            user.avatar_type = "default"
 
         # Update fields
-        current_user.mobile = new_mobile
-        current_user.mobile_number = new_mobile  # Sync both mobile fields
-        current_user.bio = new_bio
-        current_user.linkedin_url = new_linkedin
-        current_user.github_url = new_github
-        current_user.discord_handle = new_discord
-        current_user.profile_completed = True
-
+        user.mobile = new_mobile
+        user.mobile_number = new_mobile  # Sync both mobile fields
+        user.bio = new_bio
+        user.linkedin_url = new_linkedin
+        user.github_url = new_github
+        user.discord_handle = new_discord
+        user.profile_completed = True
+
+        user_cache.invalidate_on_commit(user.id)
         try:
             db.session.commit()
         except Exception as e:
@@ -72,22 +78,17 @@ def profile():
             flash("An error occurred while saving your profile.", "danger")
             return render_template("auth/test_profile.html")
 
+        scoreboard_index.upsert_user(user.id, user.username, counters.value(user, "xp"))
         flash("Profile saved successfully!", "success")
         return redirect(url_for("home"))
 
     return render_template("auth/test_profile.html")
 
-# ---------------- PROFILE UPLOAD CONFIG ----------------
-def get_upload_folder_profile():
-    folder = os.path.join(current_app.static_folder, 'uploads/profile')
-    if not os.path.exists(folder):
-        os.makedirs(folder, exist_ok=True)
-    return folder
-
 @participant_bp.route("/edit-profile", methods=["GET", "POST"])
 @login_required
 def edit_profile():
     if request.method == "POST":
+        user = current_user.row
         new_username = request.form.get("username")
         new_mobile = request.form.get("mobile")
         new_bio = request.form.get("bio")
@@ -96,33 +97,38 @@ def edit_profile():
         new_discord = request.form.get("discord_handle")
         
         # 1. Validate Username Uniqueness (if changed)
-        if new_username and new_username != current_user.username:
+        if new_username and new_username != user.username:
             existing_user = User.query.filter_by(username=new_username).first()
             if existing_user:
                 flash("Username already taken!", "danger")
                 return render_template("auth/edit_profile.html")
-            current_user.username = new_username
+            user.username = new_username
 
         # 2. Handle Profile Image Upload
-        if 'profile_image' in request.files:
-            file = request.files['profile_image']
-            if file and file.filename != "":
-                filename = secure_filename(f"user_{current_user.id}_{file.filename}")
-                upload_folder = get_upload_folder_profile()
-                file.save(os.path.join(upload_folder, filename))
-                current_user.profile_image = f"uploads/profile/{filename}"
-                current_user.avatar_type = "custom"
-                current_user.avatar_filename = filename
+        file = request.files.get('profile_image')
+        if file and file.filename != "":
+            try:
+                stored = images.save_image(file)
+            except UploadRejected as e:
+                db.session.rollback()
+                flash(str(e), "danger")
+                return redirect(url_for("participant.profile"))
+            user.profile_image = stored.path
+            user.avatar_type = "custom"
+            user.avatar_filename = os.path.basename(stored.path)
+            images.queue_derivatives(user, "avatar")
 
         # 3. Update Other Fields
-        current_user.mobile_number = new_mobile # Assuming we want to update mobile_number field
-        current_user.mobile = new_mobile
-        current_user.bio = new_bio
-        current_user.linkedin_url = new_linkedin
-        current_user.github_url = new_github
-        current_user.discord_handle = new_discord
+        user.mobile_number = new_mobile # Assuming we want to update mobile_number field
+        user.mobile = new_mobile
+        user.bio = new_bio
+        user.linkedin_url = new_linkedin
+        user.github_url = new_github
+        user.discord_handle = new_discord
         
+        user_cache.invalidate_on_commit(user.id)
         db.session.commit()
+        scoreboard_index.upsert_user(user.id, user.username, counters.value(user, "xp"))
         flash("Profile updated successfully!", "success")
         return redirect(url_for("participant.profile"))
 
@@ -141,10 +147,12 @@ def complete_profile():
 @participant_bp.route("/skip-profile", methods=["POST", "GET"])
 @login_required
 def skip_profile():
-    if not current_user.avatar_filename:
-        current_user.avatar_filename = "avatar1.png"
-    current_user.avatar_type = "default"
-    current_user.profile_completed = True
+    user = current_user.row
+    if not user.avatar_filename:
+        user.avatar_filename = "avatar1.png"
+    user.avatar_type = "default"
+    user.profile_completed = True
+    user_cache.invalidate_on_commit(user.id)
     db.session.commit()
     
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.is_json
@@ -179,11 +187,13 @@ def register_event(event_id):
 
 @participant_bp.route("/challenges")
 @login_required
+@query_budget(3)
 def challenges():
     tasks = CTFTask.query.all()
+    solved_ids = solved_tasks.solved_task_ids(current_user.id)
     for task in tasks:
-        is_solved = TaskSolve.query.filter_by(user_id=current_user.id, task_id=task.id).first()
-        task.is_completed = bool(is_solved)
+        task.is_completed = task.id in solved_ids
+        task.solves = counters.value(task, "solved_count")
     return render_template("console/challenges.html", tasks=tasks)
 
 @participant_bp.route("/event/<int:event_id>")
@@ -196,46 +206,53 @@ def event_tasks(event_id):
 # ---------------- TASK DETAIL & SUBMISSION ----------------
 
 @participant_bp.route("/task/<int:task_id>", methods=["GET", "POST"])
+@rate_limit("flag_submit", methods=("POST",))
 @login_required
 def task_detail(task_id):
     task = CTFTask.query.get_or_404(task_id)
     message = None
-    already_solved = TaskSolve.query.filter_by(user_id=current_user.id, task_id=task.id).first()
+    already_solved = solved_tasks.is_solved(current_user.id, task.id)
 
     if request.method == "POST":
         submitted_flag = request.form.get("flag", "").strip()
-        task.submissions_count += 1
-        submission = TaskSubmission(user_id=current_user.id, task_id=task.id, submitted_flag=submitted_flag)
+        counters.incr(task, "submissions_count")
+        is_correct = submitted_flag == task.flag
+        audit.record(TaskSubmission, user_id=current_user.id, task_id=task.id,
+                     submitted_flag=submitted_flag, is_correct=is_correct)
 
-        if submitted_flag == task.flag:
-            submission.is_correct = True
+        if is_correct:
+            already_solved = solved_tasks.is_solved(current_user.id, task.id, verify=True)
             if not already_solved:
                 solve = TaskSolve(user_id=current_user.id, task_id=task.id)
                 db.session.add(solve)
-                task.solved_count += 1
+                counters.incr(task, "solved_count")
                 
                 # Update XP
-                current_user.xp += task.points
+                counters.incr_row(User.__table__, current_user.id, "xp", task.points or 0)
+                dashboard_feed.bump_on_commit(current_user.id)
                 
                 # Activity Log
-                activity = Activity(user_id=current_user.id, action=f"Solved challenge \"{task.title}\"", type="solve")
-                db.session.add(activity)
+                audit.record(Activity, user_id=current_user.id, action=f"Solved challenge \"{task.title}\"", type="solve")
                 
                 message = "✅ Correct Flag! Task Solved."
             else:
                 message = "⚠️ You already solved this task."
         else:
-            submission.is_correct = False
             message = "❌ Wrong Flag, try again."
 
-        db.session.add(submission)
         db.session.commit()
 
+        if is_correct and not already_solved:
+            solved_tasks.invalidate(current_user.id)
+            scoreboard_index.record_solve(current_user.id, current_user.username, task.points)
+            already_solved = True
+
     likes = TaskLike.query.filter_by(task_id=task.id, is_like=True).count()
     dislikes = TaskLike.query.filter_by(task_id=task.id, is_like=False).count()
 
     return render_template("console/task_detail.html", task=task, message=message, already_solved=already_solved, 
-                           likes=likes, dislikes=dislikes, solved_count=task.solved_count, submissions_count=task.submissions_count)
+                           likes=likes, dislikes=dislikes, solved_count=counters.value(task, "solved_count"),
+                           submissions_count=counters.value(task, "submissions_count"))
 
 # ---------------- TEAMS ----------------
 
@@ -259,6 +276,7 @@ def create_team():
         
         activity = Activity(user_id=current_user.id, action=f"Created team \"{team.name}\"", type="team_join")
         db.session.add(activity)
+        dashboard_feed.bump_on_commit(current_user.id)
         db.session.commit()
         return redirect(url_for("participant.teams"))
     return render_template("console/create_team.html")
@@ -296,6 +314,7 @@ def approve_request(req_id):
     db.session.delete(req)
     activity = Activity(user_id=req.user_id, action=f"Joined team \"{team.name}\"", type="team_join")
     db.session.add(activity)
+    dashboard_feed.bump_on_commit(req.user_id)
     db.session.commit()
     return redirect(url_for("participant.teams"))
 
@@ -320,62 +339,37 @@ def organizations():
 # ---------------- API DATA ----------------
 
 @participant_bp.route("/api/dashboard/stats")
+@rate_limit("poll")
 @login_required
 def api_dashboard_stats():
-    user = current_user
-    solved_count = TaskSolve.query.filter_by(user_id=user.id).count()
-    teams_count = TeamMember.query.filter_by(user_id=user.id).count()
-    
-    # Simple rank logic
-    if user.xp < 1000:
-        rank, next_xp = "Beginner", 1000
-    elif user.xp < 3000:
-        rank, next_xp = "Intermediate", 3000
-    else:
-        rank, next_xp = "Advanced", 10000
-        
-    return {
-        "username": user.username,
-        "player_id": user.id,
-        "active_challenges": solved_count,
-        "teams_count": teams_count,
-        "rank": rank,
-        "xp": user.xp,
-        "next_xp_threshold": next_xp,
-        "progress_percent": min(100, (user.xp / next_xp) * 100) if next_xp > 0 else 100
-    }
+    # Counts are memoised per user until a solve/team change (services/dashboard_feed.py)
+    return dashboard_feed.conditional_json(dashboard_feed.stats_payload(current_user))
 
 @participant_bp.route("/api/dashboard/activity")
+@rate_limit("poll")
 @login_required
 def api_dashboard_activity():
-    activities = Activity.query.filter_by(user_id=current_user.id).order_by(Activity.created_at.desc()).limit(15).all()
-    output = []
-    for act in activities:
-        delta = datetime.utcnow() - act.created_at
-        if delta.days > 0:
-            time_str = f"{delta.days} day{'s' if delta.days > 1 else ''} ago"
-        elif delta.seconds // 3600 > 0:
-            time_str = f"{delta.seconds // 3600} hours ago"
-        elif delta.seconds // 60 > 0:
-            time_str = f"{delta.seconds // 60} mins ago"
-        else:
-            time_str = "just now"
-        output.append({"action": act.action, "type": act.type, "time_ago": time_str})
-    return {"activities": output}
+    try:
+        payload, etag = dashboard_feed.activity_payload(current_user.id, since=request.args.get("since"))
+    except InvalidCursor as e:
+        return {"success": False, "message": str(e)}, 400
+    return dashboard_feed.conditional_json(payload, etag)
 
 @participant_bp.route("/api/task/<int:task_id>")
 @login_required
 def api_task_detail(task_id):
     task = CTFTask.query.get_or_404(task_id)
-    solved = TaskSolve.query.filter_by(user_id=current_user.id, task_id=task.id).first()
+    solved = solved_tasks.is_solved(current_user.id, task.id)
     return {
         "id": task.id, "title": task.title, "description": task.description, "category": task.category,
-        "points": task.points, "level": task.level, "hint": task.hint, "solved_count": task.solved_count,
-        "submissions_count": task.submissions_count, "already_solved": bool(solved),
+        "points": task.points, "level": task.level, "hint": task.hint,
+        "solved_count": counters.value(task, "solved_count"),
+        "submissions_count": counters.value(task, "submissions_count"), "already_solved": bool(solved),
         "challenge_file": task.challenge_file, "preview_image": task.preview_image
     }
 
 @participant_bp.route("/api/task/submit", methods=["POST"])
+@rate_limit("flag_submit")
 @login_required
 def api_submit_flag():
     data = request.get_json()
@@ -383,61 +377,69 @@ def api_submit_flag():
     submitted_flag = data.get("flag", "").strip()
     task = CTFTask.query.get_or_404(task_id)
     
-    already_solved = TaskSolve.query.filter_by(user_id=current_user.id, task_id=task.id).first()
-    task.submissions_count += 1
-    submission = TaskSubmission(user_id=current_user.id, task_id=task.id, submitted_flag=submitted_flag)
+    already_solved = solved_tasks.is_solved(current_user.id, task.id)
+    counters.incr(task, "submissions_count")
+    is_correct = submitted_flag == task.flag
+    audit.record(TaskSubmission, user_id=current_user.id, task_id=task.id,
+                 submitted_flag=submitted_flag, is_correct=is_correct)
 
     success = False
-    if submitted_flag == task.flag:
-        submission.is_correct = True
+    if is_correct:
+        already_solved = solved_tasks.is_solved(current_user.id, task.id, verify=True)
         if not already_solved:
             solve = TaskSolve(user_id=current_user.id, task_id=task.id)
             db.session.add(solve)
-            task.solved_count += 1
-            current_user.xp += task.points
-            activity = Activity(user_id=current_user.id, action=f"Solved challenge \"{task.title}\"", type="solve")
-            db.session.add(activity)
+            counters.incr(task, "solved_count")
+            counters.incr_row(User.__table__, current_user.id, "xp", task.points or 0)
+            dashboard_feed.bump_on_commit(current_user.id)
+            audit.record(Activity, user_id=current_user.id, action=f"Solved challenge \"{task.title}\"", type="solve")
             message = "✅ Correct Flag! Task Solved."
             success = True
         else:
             message = "⚠️ You already solved this task."
             success = True
     else:
-        submission.is_correct = False
         message = "❌ Wrong Flag, try again."
 
-    db.session.add(submission)
     db.session.commit()
+
+    if is_correct and not already_solved:
+        solved_tasks.invalidate(current_user.id)
+        scoreboard_index.record_solve(current_user.id, current_user.username, task.points)
     return {"success": success, "message": message, "already_solved": bool(already_solved)}
 
 # ---------------- SCOREBOARD API ----------------
 
 @participant_bp.route("/api/scoreboard")
+@rate_limit("poll")
 @login_required
+@query_budget(2)
 def api_scoreboard():
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 50, type=int)
+    cursor, per_page = page_args(request)
 
-    total_users = User.query.count()
+    # Served entirely from the in-process rank index (services/scoreboard.py).
+    # ?cursor= continues after the last row of the previous page; ?page= is still accepted.
+    if cursor:
+        try:
+            after = decode_cursor(cursor, (int, int, int))
+        except InvalidCursor as e:
+            return {"success": False, "message": str(e)}, 400
+        total_users, rows = scoreboard_index.page_after(after, per_page)
+        page = (rows[0]["rank"] - 1) // per_page + 1 if rows else 1
+    else:
+        page = max(1, request.args.get("page", 1, type=int))
+        total_users, rows = scoreboard_index.page(page, per_page)
     total_pages = max(1, -(-total_users // per_page))  # ceiling division
-
-    users = (
-        User.query
-        .order_by(User.xp.desc())
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
+    next_cursor = encode_cursor(rows[-1]["key"]) if rows and rows[-1]["rank"] < total_users else None
 
     output = []
-    for idx, user in enumerate(users, start=(page - 1) * per_page + 1):
-        solved_count = TaskSolve.query.filter_by(user_id=user.id).count()
+    for row in rows:
         output.append({
-            "rank": idx,
-            "username": user.username,
-            "xp": user.xp or 0,
-            "challenges_solved": solved_count,
-            "is_current_user": user.id == current_user.id,
+            "rank": row["rank"],
+            "username": row["username"],
+            "xp": row["xp"],
+            "challenges_solved": row["solves"],
+            "is_current_user": row["user_id"] == current_user.id,
         })
 
     return {
@@ -446,4 +448,6 @@ def api_scoreboard():
         "per_page": per_page,
         "total_pages": total_pages,
         "total_users": total_users,
+        "next_cursor": next_cursor,
+        "my_rank": scoreboard_index.rank_of(current_user.id),
     }
@@ -0,0 +1 @@
+# In-process engines shared by the route blueprints (caches, indexes, workers).
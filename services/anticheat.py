@@ -0,0 +1,232 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from ctf_battle_models import CTFEventSolve, ActivityLog
+
+# ---------------- ANTI-CHEAT DETECTOR ----------------
+# Streaming replacement for the per-submission SQL scans. Each event keeps:
+#   ips     ip -> set of user ids seen on that address (from every ActivityLog row)
+#   solves  challenge id -> deque of solve timestamps inside the rapid-solve window
+# plus the alerts already raised, so an alert row is only written the first time
+# a threshold is crossed. State is per process and rebuilt lazily from the DB the
+# first time an event is touched after a restart.
+#
+# Observations and alert marks are applied only once the request's transaction
+# commits (like counters and audit), so a rolled-back submission leaves nothing
+# behind.
+#
+# Other gunicorn workers see other submissions, so the in-memory view of one
+# worker is incomplete. When it shows nothing suspicious, the DB is consulted,
+# at most once per ANTICHEAT_RESYNC seconds per IP / challenge, using the
+# (event_id, ip_address, user_id) and (event_id, solved_at) indexes:
+#   - an IP with no other user in memory is probed in ActivityLog
+#   - a challenge's rapid-solve window is recounted from CTFEventSolve
+# ActivityLog rows are bulk-inserted a moment after commit (services/audit.py),
+# so an IP shared across workers within that moment is caught on a later
+# submission rather than the first one.
+
+IP_REUSE_PREFIX = "SECURITY ALERT: IP reuse detected ("
+RAPID_SOLVE_PREFIX = "SECURITY ALERT: Rapid solve pattern for challenge "
+
+
+class EventState:
+    def __init__(self):
+        self.ips = {}
+        self.solves = {}
+        self.ip_alerts = set()       # (ip, user_id) pairs already reported
+        self.burst_alerts = set()    # challenge ids currently inside a reported burst
+        self.ip_synced = {}          # ip -> monotonic time of the last DB probe
+        self.solves_synced = {}      # challenge id -> monotonic time of the last DB recount
+
+
+class AntiCheatDetector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}
+
+    def _config(self):
+        window = current_app.config.get("ANTICHEAT_RAPID_WINDOW", 300)
+        threshold = current_app.config.get("ANTICHEAT_RAPID_THRESHOLD", 3)
+        return window, threshold
+
+    def _due(self, synced, key):
+        resync = current_app.config.get("ANTICHEAT_RESYNC", 30)
+        last = synced.get(key)
+        return last is None or time.monotonic() - last > resync
+
+    def _state(self, event_id):
+        state = self._events.get(event_id)
+        if state is None:
+            loaded = self._load(event_id)
+            with self._lock:
+                state = self._events.setdefault(event_id, loaded)
+        return state
+
+    # ---- rebuild ----
+
+    def _load(self, event_id):
+        window, threshold = self._config()
+        state = EventState()
+
+        rows = db.session.query(ActivityLog.ip_address, ActivityLog.user_id)\
+            .filter(ActivityLog.event_id == event_id, ActivityLog.ip_address.isnot(None))\
+            .distinct().all()
+        for ip, user_id in rows:
+            state.ips.setdefault(ip, set()).add(user_id)
+
+        alerts = db.session.query(ActivityLog.action, ActivityLog.user_id)\
+            .filter(ActivityLog.event_id == event_id, ActivityLog.action.like(IP_REUSE_PREFIX + "%"))\
+            .all()
+        for action, user_id in alerts:
+            state.ip_alerts.add((action[len(IP_REUSE_PREFIX):-1], user_id))
+
+        since = datetime.utcnow() - timedelta(seconds=window)
+        recent = db.session.query(CTFEventSolve.challenge_id, CTFEventSolve.solved_at)\
+            .filter(CTFEventSolve.event_id == event_id, CTFEventSolve.solved_at > since)\
+            .order_by(CTFEventSolve.solved_at).all()
+        now_mono, now_wall = time.monotonic(), datetime.utcnow()
+        for challenge_id, solved_at in recent:
+            ts = now_mono - (now_wall - solved_at).total_seconds()
+            state.solves.setdefault(challenge_id, deque()).append(ts)
+        for challenge_id, window_solves in state.solves.items():
+            if len(window_solves) > threshold:
+                state.burst_alerts.add(challenge_id)
+        return state
+
+    def rebuild(self, event_id):
+        """Drop and reload an event's state from the DB (e.g. after a restart or purge)."""
+        state = self._load(event_id)
+        with self._lock:
+            self._events[event_id] = state
+
+    def forget(self, event_id):
+        with self._lock:
+            self._events.pop(event_id, None)
+
+    def _probe_ip(self, event_id, ip):
+        """User ids seen on `ip` during the event according to the DB."""
+        rows = db.session.query(ActivityLog.user_id)\
+            .filter(ActivityLog.event_id == event_id, ActivityLog.ip_address == ip)\
+            .distinct().all()
+        return {user_id for (user_id,) in rows}
+
+    def _recount_solves(self, event_id, challenge_id, window):
+        since = datetime.utcnow() - timedelta(seconds=window)
+        solved = db.session.query(CTFEventSolve.solved_at)\
+            .filter(CTFEventSolve.event_id == event_id, CTFEventSolve.solved_at > since,
+                    CTFEventSolve.challenge_id == challenge_id)\
+            .order_by(CTFEventSolve.solved_at).all()
+        now_mono, now_wall = time.monotonic(), datetime.utcnow()
+        return deque(now_mono - (now_wall - solved_at).total_seconds() for (solved_at,) in solved)
+
+    # ---- streaming updates (applied after commit) ----
+
+    def observe_ip(self, event_id, user_id, ip):
+        """Record that a user was seen on an address during an event."""
+        if not event_id or not ip:
+            return
+        _defer(self._apply_ip, event_id, user_id, ip)
+
+    def observe_solve(self, event_id, challenge_id):
+        _defer(self._apply_solve, event_id, challenge_id, time.monotonic())
+
+    def _apply_ip(self, event_id, user_id, ip):
+        with self._lock:
+            state = self._events.get(event_id)
+            if state is not None:    # otherwise the next _load() reads it from the DB
+                state.ips.setdefault(ip, set()).add(user_id)
+
+    def _apply_solve(self, event_id, challenge_id, ts):
+        with self._lock:
+            state = self._events.get(event_id)
+            if state is not None:
+                state.solves.setdefault(challenge_id, deque()).append(ts)
+
+    def _apply_alert(self, event_id, ip_alert=None, burst=None, calm=None):
+        with self._lock:
+            state = self._events.get(event_id)
+            if state is None:
+                return
+            if ip_alert is not None:
+                state.ip_alerts.add(ip_alert)
+            if burst is not None:
+                state.burst_alerts.add(burst)
+            if calm is not None:
+                state.burst_alerts.discard(calm)
+
+    def _window_count(self, state, challenge_id, window):
+        window_solves = state.solves.get(challenge_id)
+        if not window_solves:
+            return 0
+        cutoff = time.monotonic() - window
+        while window_solves and window_solves[0] <= cutoff:
+            window_solves.popleft()
+        return len(window_solves)
+
+    def _shared(self, state, user_id, ip):
+        users = state.ips.get(ip, ())
+        return len(users) > 1 or (len(users) == 1 and user_id not in users)
+
+    def check_submission(self, event_id, user_id, challenge_id, ip):
+        """Return alert messages newly triggered by this submission."""
+        window, threshold = self._config()
+        state = self._state(event_id)
+
+        # Fill in what other workers may have seen (queries run outside the lock)
+        with self._lock:
+            probe_ip = ip and not self._shared(state, user_id, ip) and self._due(state.ip_synced, ip)
+            recount = self._window_count(state, challenge_id, window) <= threshold \
+                and self._due(state.solves_synced, challenge_id)
+        seen = self._probe_ip(event_id, ip) if probe_ip else None
+        recent = self._recount_solves(event_id, challenge_id, window) if recount else None
+
+        alerts = []
+        with self._lock:
+            now = time.monotonic()
+            if seen is not None:
+                if seen:
+                    state.ips.setdefault(ip, set()).update(seen)
+                state.ip_synced[ip] = now
+            if recent is not None and len(recent) > len(state.solves.get(challenge_id, ())):
+                state.solves[challenge_id] = recent
+            if recent is not None:
+                state.solves_synced[challenge_id] = now
+
+            # 1. Same IP: other users already seen on this address
+            if ip and self._shared(state, user_id, ip) and (ip, user_id) not in state.ip_alerts:
+                _defer(self._apply_alert, event_id, ip_alert=(ip, user_id))
+                alerts.append(f"{IP_REUSE_PREFIX}{ip})")
+
+            # 2. Flag sharing: burst of solves on one challenge within the window
+            if self._window_count(state, challenge_id, window) > threshold:
+                if challenge_id not in state.burst_alerts:
+                    _defer(self._apply_alert, event_id, burst=challenge_id)
+                    alerts.append(f"{RAPID_SOLVE_PREFIX}{challenge_id}")
+            elif challenge_id in state.burst_alerts:
+                _defer(self._apply_alert, event_id, calm=challenge_id)
+        return alerts
+
+
+detector = AntiCheatDetector()
+
+
+def _defer(fn, *args, **kwargs):
+    db.session.info.setdefault("anticheat_updates", []).append((fn, args, kwargs))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_updates(db_session):
+    for fn, args, kwargs in db_session.info.pop("anticheat_updates", ()):
+        fn(*args, **kwargs)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_updates(db_session):
+    db_session.info.pop("anticheat_updates", None)
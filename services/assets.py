@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import abort, request, send_file, url_for
+
+# ---------------- FINGERPRINTED STATIC ASSETS ----------------
+# build() (run by build_assets.py at deploy time) copies the theme's CSS, JS
+# and images into static/dist under content-hashed names, like
+# css/style.css -> css/style.3fa9c2d1e0b4.css. It also writes .gz and, when
+# the `brotli` package is installed, .br next to every text asset, plus a
+# manifest.json that maps each logical path to its hashed copy.
+#
+# Templates call asset_url('css/style.css'), which takes the same argument as
+# url_for('static', filename=...). With a manifest, the returned URL points
+# at /assets/<hashed name>. That route serves the smallest encoding the
+# browser accepts, with an ETag and `Cache-Control: immutable`, so a returning
+# browser never asks again until the content (and therefore the URL) changes.
+# Without a manifest (development), asset_url falls back to plain /static.
+
+ASSET_DIRS = ("css", "js", "img", "images", "avatars")
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".map")
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+MAX_AGE = 365 * 24 * 3600
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _hashed_name(path, digest):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+# ---- build ----
+
+def _write(path, data):
+    if os.path.exists(path):
+        return    # content-addressed: an existing file already holds these bytes
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as out:
+        out.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def build(static_folder, dirs=ASSET_DIRS):
+    """Write hashed copies, .gz/.br variants and manifest.json into static/dist. Returns the manifest.
+
+    Files from earlier builds are left in place, so pages rendered by a
+    server that hasn't restarted yet keep working; clean() removes them.
+    """
+    brotli = _brotli()
+    if brotli is None:
+        print("⚠️ 'brotli' is not installed; only gzip variants will be written")
+
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for top in dirs:
+        for folder, _, files in os.walk(os.path.join(static_folder, top)):
+            for name in sorted(files):
+                source = os.path.join(folder, name)
+                logical = os.path.relpath(source, static_folder).replace(os.sep, "/")
+                with open(source, "rb") as fh:
+                    data = fh.read()
+                digest = hashlib.sha256(data).hexdigest()[:12]
+                hashed = _hashed_name(logical, digest)
+                target = os.path.join(dist, *hashed.split("/"))
+                _write(target, data)
+
+                encodings = []
+                if logical.endswith(COMPRESSIBLE):
+                    variants = [("gzip", ".gz", lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+                    if brotli is not None:
+                        variants.insert(0, ("br", ".br", lambda: brotli.compress(data, quality=11)))
+                    for encoding, suffix, compress in variants:
+                        if not os.path.exists(target + suffix):
+                            body = compress()
+                            if len(body) >= len(data):
+                                continue
+                            _write(target + suffix, body)
+                        encodings.append(encoding)
+                manifest[logical] = {"path": hashed, "etag": digest, "encodings": encodings}
+
+    path = os.path.join(dist, MANIFEST)
+    with open(path + ".tmp", "w") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def clean(static_folder):
+    """Delete files in static/dist that the current manifest doesn't reference. Returns the count."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    with open(os.path.join(dist, MANIFEST)) as fh:
+        current = json.load(fh)
+    keep = {MANIFEST}
+    for entry in current.values():
+        keep.add(entry["path"])
+        keep.update(entry["path"] + suffix for suffix in (".gz", ".br"))
+    removed = 0
+    for folder, _, files in os.walk(dist):
+        for name in files:
+            path = os.path.join(folder, name)
+            if os.path.relpath(path, dist).replace(os.sep, "/") not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+# ---- serving ----
+
+class AssetManifest:
+    def __init__(self):
+        self.dist = None
+        self.entries = {}     # logical path -> entry
+        self.by_hashed = {}   # hashed path -> (logical path, entry)
+
+    def load(self, static_folder):
+        self.dist = os.path.join(static_folder, DIST_DIR)
+        try:
+            with open(os.path.join(self.dist, MANIFEST)) as fh:
+                self.entries = json.load(fh)
+        except FileNotFoundError:
+            self.entries = {}
+        self.by_hashed = {entry["path"]: (logical, entry) for logical, entry in self.entries.items()}
+
+
+manifest = AssetManifest()
+
+
+def asset_url(filename):
+    """url_for('static', filename=...) for theme assets, fingerprinted once build_assets.py has run."""
+    entry = manifest.entries.get(filename)
+    if entry is None:
+        return url_for("static", filename=filename)
+    return url_for("serve_asset", filename=entry["path"])
+
+
+def has_asset(filename):
+    return filename in manifest.entries
+
+
+def serve_asset(filename):
+    found = manifest.by_hashed.get(filename)
+    if found is None:
+        abort(404)
+    logical, entry = found
+
+    encoding, suffix = None, ""
+    for candidate, candidate_suffix in (("br", ".br"), ("gzip", ".gz")):
+        if candidate in entry["encodings"] and request.accept_encodings[candidate]:
+            encoding, suffix = candidate, candidate_suffix
+            break
+
+    path = os.path.join(manifest.dist, *filename.split("/")) + suffix
+    etag = entry["etag"] + (f"-{encoding}" if encoding else "")
+    response = send_file(path, mimetype=mimetypes.guess_type(logical)[0], etag=etag,
+                         max_age=MAX_AGE, conditional=True)
+    if encoding and response.status_code != 304:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    manifest.load(app.static_folder)
+    app.add_url_rule("/assets/<path:filename>", "serve_asset", serve_asset)
+    app.add_template_global(asset_url)
@@ -0,0 +1,213 @@
+import atexit
+import queue
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from services import geoip
+
+# ---------------- AUDIT ROW WRITER ----------------
+# Flag attempts leave append-only rows behind (TaskSubmission, Activity and
+# the battle Submission/ActivityLog), and nothing on the submit path reads
+# them back. record() builds the row as a plain dict with its defaults
+# (timestamps included) filled in at call time. Once the request's
+# transaction commits, the dicts go onto a bounded queue. A background thread
+# bulk-inserts them every AUDIT_FLUSH_MS milliseconds or AUDIT_BATCH_SIZE
+# rows, whichever comes first, one executemany INSERT per table.
+#
+# Durability: when the queue is full the caller writes its rows itself,
+# rather than dropping them. Whatever is still queued at shutdown is written
+# by an atexit hook. AUDIT_MODE = "sync" skips the queue and writes on commit.
+# Rows whose IP needs a GeoIP lookup are inserted with RETURNING ids and then
+# handed to the GeoIP worker.
+
+
+def _column_defaults(table):
+    defaults = []
+    for column in table.columns:
+        default = column.default
+        if default is not None and not default.is_sequence and not column.primary_key:
+            defaults.append((column.name, default))
+    return defaults
+
+
+class AuditWriter:
+    def __init__(self):
+        self.app = None
+        self.mode = "async"
+        self.flush_seconds = 0.2
+        self.batch_size = 500
+        self._queue = None
+        self._thread = None
+        self._write_lock = threading.Lock()
+        self._defaults = {}
+        self._listeners = []
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get("AUDIT_MODE", "async")
+        self.flush_seconds = app.config.get("AUDIT_FLUSH_MS", 200) / 1000.0
+        self.batch_size = app.config.get("AUDIT_BATCH_SIZE", 500)
+        self._queue = queue.Queue(maxsize=app.config.get("AUDIT_QUEUE_SIZE", 10000))
+        atexit.register(self._flush_at_exit)
+
+    # ---- building rows ----
+
+    def build(self, model, values):
+        table = model.__table__
+        defaults = self._defaults.get(table.name)
+        if defaults is None:
+            defaults = self._defaults[table.name] = _column_defaults(table)
+        for name, default in defaults:
+            if name not in values:
+                values[name] = default.arg(None) if default.is_callable else default.arg
+        needs_geo = "ip_address" in table.c and geoip.enrich_values(values)
+        return (model, values, needs_geo)
+
+    # ---- queueing ----
+
+    def submit(self, rows):
+        if self.mode == "sync" or self._queue is None:
+            self.write(rows)
+            return
+        self._ensure_started()
+        for i, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                # Back-pressure: write the overflow in the calling thread instead of dropping it
+                self.write(rows[i:])
+                return
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    self.write(batch)
+            except Exception as e:
+                print(f"Audit writer error: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued row has been written (used by tests/scripts)."""
+        if self._queue is not None and self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def _flush_at_exit(self):
+        rows = []
+        while self._queue is not None:
+            try:
+                rows.append(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        # Let a batch the thread is already writing finish first
+        if self._write_lock.acquire(timeout=5):
+            self._write_lock.release()
+        if rows and self.app is not None:
+            try:
+                with self.app.app_context():
+                    self.write(rows)
+            except Exception as e:
+                print(f"Audit flush at exit failed: {e}")
+
+    # ---- writing ----
+
+    def add_listener(self, listener):
+        """Call listener(model, rows) after rows of `model` have been inserted (e.g. to drop caches)."""
+        self._listeners.append(listener)
+
+    def _notify(self, model, values):
+        for listener in self._listeners:
+            try:
+                listener(model, values)
+            except Exception as e:
+                print(f"Audit listener error: {e}")
+
+    def write(self, rows):
+        """Insert (model, values, needs_geo) rows: one executemany per table and geo need."""
+        grouped = {}
+        for model, values, needs_geo in rows:
+            grouped.setdefault((model, needs_geo), []).append(values)
+        for values in grouped.values():
+            # executemany needs the same keys in every row (geo fields are only set on cache hits)
+            keys = set().union(*values)
+            for row in values:
+                for key in keys.difference(row):
+                    row[key] = None
+
+        jobs = []
+        with self._write_lock:
+            for (model, needs_geo), values in grouped.items():
+                try:
+                    jobs.extend(self._insert(model, values, needs_geo))
+                    self._notify(model, values)
+                except Exception as e:
+                    # One bad row (e.g. a challenge deleted meanwhile) must not sink the batch
+                    print(f"Audit batch insert into {model.__tablename__} failed ({e}); retrying row by row")
+                    for row in values:
+                        try:
+                            jobs.extend(self._insert(model, [row], needs_geo))
+                            self._notify(model, [row])
+                        except Exception as row_error:
+                            print(f"Dropped audit row {row}: {row_error}")
+        if jobs:
+            geoip.geoip_worker.submit(jobs)
+
+    def _insert(self, model, values, needs_geo):
+        table = model.__table__
+        with db.engine.begin() as conn:
+            if needs_geo and db.engine.dialect.insert_executemany_returning:
+                stmt = table.insert().returning(table.c.id, sort_by_parameter_order=True)
+                ids = conn.execute(stmt, values).scalars().all()
+                return [(model, row_id, row["ip_address"]) for row_id, row in zip(ids, values)]
+            conn.execute(table.insert(), values)
+        return []
+
+
+audit_writer = AuditWriter()
+
+
+def record(model, **values):
+    """Add an audit row to the current transaction; it is written once the transaction commits."""
+    row = audit_writer.build(model, values)
+    db.session.info.setdefault("audit_rows", []).append(row)
+    return values
+
+
+# ---- session hooks ----
+
+@event.listens_for(Session, "after_commit")
+def _submit_audit_rows(session):
+    rows = session.info.pop("audit_rows", None)
+    if rows:
+        audit_writer.submit(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_audit_rows(session):
+    session.info.pop("audit_rows", None)
+
+
+def init_app(app):
+    audit_writer.init_app(app)
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from extensions import db
+from ctf_battle_models import CTFCategory, CTFEventSolve
+from services.cache import StampFile
+
+# ---------------- ARENA VIEW MODEL ----------------
+# The live arena renders the category -> challenge tree with a solve count per
+# challenge. The tree is loaded with two queries (categories + selectinload of
+# challenges) and the counts with one grouped query. Both are cached per event.
+# The tree is dropped when an admin adds, toggles, imports or deletes
+# challenges. invalidate() also touches instance/arena.stamp, so every other
+# worker (and import_challenges.py, a separate process) drops its trees on its
+# next read; ARENA_TREE_TTL bounds anything else. The counts are bumped in
+# place by the submit path and re-read after ARENA_COUNTS_TTL seconds so other
+# workers' solves show up.
+
+ArenaCategory = namedtuple("ArenaCategory", "id name challenges")
+ArenaChallenge = namedtuple("ArenaChallenge", "id title description points hint")
+
+
+class ArenaCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trees = {}    # event_id -> (loaded_at, tuple of ArenaCategory)
+        self._counts = {}   # event_id -> (loaded_at, {challenge_id: solves})
+        self._stamp = None
+
+    def init_app(self, app):
+        self._stamp = StampFile(os.path.join(app.instance_path, "arena.stamp"))
+
+    def _load_tree(self, event_id):
+        categories = CTFCategory.query\
+            .options(selectinload(CTFCategory.challenges))\
+            .filter(CTFCategory.event_id == event_id)\
+            .order_by(CTFCategory.id)\
+            .all()
+        return tuple(
+            ArenaCategory(cat.id, cat.name, tuple(
+                ArenaChallenge(chal.id, chal.title, chal.description, chal.points, chal.hint)
+                for chal in sorted(cat.challenges, key=lambda c: c.id)
+                if chal.is_enabled
+            ))
+            for cat in categories
+        )
+
+    def _load_counts(self, event_id):
+        return dict(
+            db.session.query(CTFEventSolve.challenge_id, db.func.count(CTFEventSolve.id))
+            .filter(CTFEventSolve.event_id == event_id)
+            .group_by(CTFEventSolve.challenge_id)
+            .all()
+        )
+
+    def tree(self, event_id):
+        if self._stamp is not None and self._stamp.changed():
+            with self._lock:
+                self._trees.clear()
+        ttl = current_app.config.get("ARENA_TREE_TTL", 300)
+        item = self._trees.get(event_id)
+        if item is None or item[0] < time.monotonic() - ttl:
+            item = (time.monotonic(), self._load_tree(event_id))
+            with self._lock:
+                self._trees[event_id] = item
+        return item[1]
+
+    def solve_counts(self, event_id):
+        ttl = current_app.config.get("ARENA_COUNTS_TTL", 10)
+        item = self._counts.get(event_id)
+        if item is None or item[0] < time.monotonic() - ttl:
+            item = (time.monotonic(), self._load_counts(event_id))
+            with self._lock:
+                self._counts[event_id] = item
+        return item[1]
+
+    def record_solve(self, event_id, challenge_id):
+        with self._lock:
+            item = self._counts.get(event_id)
+            if item is not None:
+                item[1][challenge_id] = item[1].get(challenge_id, 0) + 1
+
+    def invalidate(self, event_id):
+        """Drop an event's cached tree and counts here, and every event's tree in the other workers."""
+        with self._lock:
+            self._trees.pop(event_id, None)
+            self._counts.pop(event_id, None)
+        if self._stamp is not None:
+            self._stamp.touch()
+
+
+arena_cache = ArenaCache()
+
+
+def init_app(app):
+    arena_cache.init_app(app)
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app
+
+from extensions import db
+from ctf_battle_models import CTFEvent, CTFEventSolve, BattleScore, ScoreboardSnapshot
+from services import battle_scores
+from services.battle_arena import arena_cache
+from services.cache import TTLCache
+from services.pubsub import get_bus, battle_channel
+
+# ---------------- SCOREBOARD FREEZE ----------------
+# Freezing an event captures the ranked scoreboard once, stores it compactly in
+# battle_scoreboard_snapshot and keeps the decoded rows in memory. Participant
+# reads are served from that snapshot while admins keep reading battle_score,
+# which stays live throughout. Unfreezing drops the snapshot and replays the
+# score changes accumulated since the freeze to live stream subscribers.
+#
+# Per-challenge solve counts give progress away too, so participants see the
+# counts as of the freeze (solve_counts()) and their live stream carries no
+# solve or score messages until the event is unfrozen.
+
+ScoreRow = namedtuple("ScoreRow", "rank user_id username total_points solve_count last_solve")
+
+
+def encode_rows(rows):
+    packed = [
+        [r.rank, r.user_id, r.username, r.total_points, r.solve_count,
+         r.last_solve.isoformat() if r.last_solve else None]
+        for r in rows
+    ]
+    return zlib.compress(json.dumps(packed, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_rows(payload):
+    rows = json.loads(zlib.decompress(payload).decode("utf-8"))
+    return tuple(
+        ScoreRow(rank, user_id, username, total_points, solve_count,
+                 datetime.fromisoformat(last_solve) if last_solve else None)
+        for rank, user_id, username, total_points, solve_count, last_solve in rows
+    )
+
+
+def live_rows(event_id):
+    return [
+        ScoreRow(r.rank, r.user_id, r.username, r.total_points, r.solve_count, r.last_solve)
+        for r in battle_scores.scoreboard_query(event_id).all()
+    ]
+
+
+class SnapshotCache:
+    """event_id -> (taken_at, rows). Entries expire so other workers' re-freezes are picked up."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, event_id):
+        ttl = current_app.config.get("SNAPSHOT_CACHE_TTL", 60)
+        with self._lock:
+            item = self._data.get(event_id)
+        if item is None or item[0] < time.monotonic() - ttl:
+            return None
+        return item[1]
+
+    def set(self, event_id, snapshot):
+        with self._lock:
+            self._data[event_id] = (time.monotonic(), snapshot)
+
+    def pop(self, event_id):
+        with self._lock:
+            self._data.pop(event_id, None)
+
+
+snapshot_cache = SnapshotCache()
+_frozen_counts = TTLCache(maxsize=1000, ttl=60)   # (event_id, taken_at) -> {challenge_id: solves}
+_frozen_flags = TTLCache(maxsize=1000, ttl=5)     # event_id -> is_frozen, for long-lived streams
+
+
+def get_snapshot(event_id):
+    """(taken_at, rows) for a frozen event, or None if no snapshot was stored."""
+    snapshot = snapshot_cache.get(event_id)
+    if snapshot is None:
+        stored = db.session.get(ScoreboardSnapshot, event_id)
+        if stored is None:
+            return None
+        snapshot = (stored.taken_at, decode_rows(stored.payload))
+        snapshot_cache.set(event_id, snapshot)
+    return snapshot
+
+
+def freeze(event):
+    """Capture the current ranking and mark the event frozen. Does not commit."""
+    rows = tuple(live_rows(event.id))
+    taken_at = datetime.utcnow()
+    db.session.merge(ScoreboardSnapshot(event_id=event.id, taken_at=taken_at, payload=encode_rows(rows)))
+    event.is_frozen = True
+    snapshot_cache.set(event.id, (taken_at, rows))
+    _frozen_flags.pop(event.id)
+    return taken_at
+
+
+def unfreeze(event):
+    """Drop the snapshot and unfreeze. Returns the freeze time (or None). Does not commit."""
+    stored = db.session.get(ScoreboardSnapshot, event.id)
+    taken_at = stored.taken_at if stored else None
+    if stored is not None:
+        db.session.delete(stored)
+    event.is_frozen = False
+    snapshot_cache.pop(event.id)
+    _frozen_flags.pop(event.id)
+    return taken_at
+
+
+def is_frozen(event_id):
+    """Current freeze flag, re-read at most every few seconds (for SSE streams that outlive requests)."""
+    frozen = _frozen_flags.get(event_id)
+    if frozen is None:
+        frozen = bool(db.session.query(CTFEvent.is_frozen).filter(CTFEvent.id == event_id).scalar())
+        _frozen_flags.set(event_id, frozen)
+    return frozen
+
+
+def solve_counts(event, live=False):
+    """Per-challenge solve counts for display: as of the freeze for participants, live otherwise."""
+    if event.is_frozen and not live:
+        snapshot = get_snapshot(event.id)
+        if snapshot is not None:
+            key = (event.id, snapshot[0])
+            counts = _frozen_counts.get(key)
+            if counts is None:
+                counts = dict(
+                    db.session.query(CTFEventSolve.challenge_id, db.func.count(CTFEventSolve.id))
+                    .filter(CTFEventSolve.event_id == event.id, CTFEventSolve.solved_at <= snapshot[0])
+                    .group_by(CTFEventSolve.challenge_id)
+                    .all()
+                )
+                _frozen_counts.set(key, counts)
+            return counts
+    return arena_cache.solve_counts(event.id)
+
+
+def replay_since(event_id, since):
+    """Publish the score of every player who solved something while the board was frozen."""
+    bus = get_bus()
+    channel = battle_channel(event_id)
+    if not bus.subscriber_count(channel):
+        return 0
+
+    query = battle_scores.scoreboard_query(event_id)
+    if since is not None:
+        solvers = db.session.query(CTFEventSolve.user_id)\
+            .filter(CTFEventSolve.event_id == event_id, CTFEventSolve.solved_at >= since)
+        query = query.filter(BattleScore.user_id.in_(solvers))
+    rows = query.all()
+
+    for r in rows:
+        bus.publish(channel, {
+            "type": "score",
+            "frozen": False,
+            "user_id": r.user_id,
+            "username": r.username,
+            "total_points": r.total_points,
+            "solve_count": r.solve_count,
+            "rank": r.rank,
+            "last_solve": r.last_solve.isoformat() if r.last_solve else None,
+        })
+    bus.publish(channel, {"type": "unfrozen", "replayed": len(rows)})
+    return len(rows)
+
+
+def scoreboard(event, live=False):
+    """Rows for display: the frozen snapshot for participants, battle_score otherwise."""
+    if event.is_frozen and not live:
+        snapshot = get_snapshot(event.id)
+        if snapshot is not None:
+            return snapshot[1]
+    return live_rows(event.id)
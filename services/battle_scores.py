@@ -0,0 +1,106 @@
+from extensions import db
+from models import User
+from ctf_battle_models import CTFEvent, CTFEventSolve, BattleScore
+
+# ---------------- MATERIALIZED BATTLE SCOREBOARD ----------------
+# `battle_score` holds one row per (event, user) with running totals and a
+# position rank ordered by total_points desc, last_solve_at asc, user_id asc.
+# The tie-breakers make every rank in an event distinct (1, 2, 3, ...).
+# apply_solve() runs inside the submission transaction and first locks the
+# event row, so concurrent solves in one event update the ranks one after
+# another. recompute() rebuilds an event from ctf_battle_solve; migration 0006
+# uses the same ordering to backfill events that predate the table.
+
+
+def _beats(event_id, user_id, total_points, last_solve_at):
+    """Filter for rows ranked strictly above the given score."""
+    return db.and_(
+        BattleScore.event_id == event_id,
+        BattleScore.user_id != user_id,
+        db.or_(
+            BattleScore.total_points > total_points,
+            db.and_(BattleScore.total_points == total_points, BattleScore.last_solve_at < last_solve_at),
+            db.and_(BattleScore.total_points == total_points, BattleScore.last_solve_at == last_solve_at,
+                    BattleScore.user_id < user_id),
+        ),
+    )
+
+
+def apply_solve(event_id, user_id, points, solved_at):
+    """Add a solve to the user's row and move it to its new rank. Does not commit."""
+    # Serialize score writers per event: the rank shift below reads and rewrites other users' rows
+    db.session.query(CTFEvent.id).filter(CTFEvent.id == event_id).with_for_update().scalar()
+    score = BattleScore.query.filter_by(event_id=event_id, user_id=user_id).with_for_update().first()
+    if score is None:
+        bottom = BattleScore.query.filter_by(event_id=event_id).count() + 1
+        score = BattleScore(event_id=event_id, user_id=user_id, total_points=0, solve_count=0, rank=bottom)
+        db.session.add(score)
+
+    old_rank = score.rank
+    score.total_points += points
+    score.solve_count += 1
+    score.last_solve_at = solved_at
+
+    with db.session.no_autoflush:
+        new_rank = db.session.query(db.func.count()).select_from(BattleScore)\
+            .filter(_beats(event_id, user_id, score.total_points, solved_at)).scalar() + 1
+
+    if new_rank < old_rank:
+        BattleScore.query.filter(
+            BattleScore.event_id == event_id,
+            BattleScore.user_id != user_id,
+            BattleScore.rank >= new_rank,
+            BattleScore.rank < old_rank,
+        ).update({BattleScore.rank: BattleScore.rank + 1}, synchronize_session=False)
+    elif new_rank > old_rank:
+        # a 0-point solve keeps the total but moves last_solve_at later, so ties now go against it
+        BattleScore.query.filter(
+            BattleScore.event_id == event_id,
+            BattleScore.user_id != user_id,
+            BattleScore.rank > old_rank,
+            BattleScore.rank <= new_rank,
+        ).update({BattleScore.rank: BattleScore.rank - 1}, synchronize_session=False)
+    score.rank = new_rank
+    return score
+
+
+def recompute(event_id):
+    """Rebuild an event's rows from ctf_battle_solve. Does not commit."""
+    rows = db.session.query(
+        CTFEventSolve.user_id,
+        db.func.sum(CTFEventSolve.points).label('total_points'),
+        db.func.count(CTFEventSolve.id).label('solve_count'),
+        db.func.max(CTFEventSolve.solved_at).label('last_solve')
+    ).filter(CTFEventSolve.event_id == event_id)\
+     .group_by(CTFEventSolve.user_id)\
+     .order_by(db.desc('total_points'), 'last_solve', CTFEventSolve.user_id)\
+     .all()
+
+    BattleScore.query.filter_by(event_id=event_id).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(BattleScore, [
+        {
+            "event_id": event_id,
+            "user_id": row.user_id,
+            "total_points": row.total_points or 0,
+            "solve_count": row.solve_count,
+            "last_solve_at": row.last_solve,
+            "rank": rank,
+        }
+        for rank, row in enumerate(rows, start=1)
+    ])
+    return len(rows)
+
+
+def scoreboard_query(event_id):
+    """Ranked scoreboard rows: username, email, total_points, solve_count, last_solve, rank."""
+    return db.session.query(
+        User.username,
+        User.email,
+        BattleScore.user_id,
+        BattleScore.total_points,
+        BattleScore.solve_count,
+        BattleScore.last_solve_at.label('last_solve'),
+        BattleScore.rank
+    ).join(User, User.id == BattleScore.user_id)\
+     .filter(BattleScore.event_id == event_id)\
+     .order_by(BattleScore.rank)
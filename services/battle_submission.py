@@ -0,0 +1,208 @@
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import User
+from ctf_battle_models import CTFEvent, CTFCategory, CTFChallenge, CTFEventSolve, ActivityLog, Submission, UserSession
+from services import audit, battle_scores
+from services.anticheat import detector
+from services.battle_arena import arena_cache
+from services.pubsub import get_bus, battle_channel
+
+# ---------------- BATTLE SUBMISSION SERVICE ----------------
+# One flag attempt = one transaction: the solve and its battle_score update
+# and the UserSession heartbeat are committed together. The Submission,
+# activity and anti-cheat ActivityLog rows are audit rows; they are queued
+# when that transaction commits and bulk-inserted by services/audit.py.
+# Nothing here touches `request`, so the form route and the JSON API share the
+# same code path.
+
+
+class SubmissionResult:
+    """Outcome of a flag attempt, usable for a flash() or a JSON response."""
+
+    MESSAGES = {
+        "not_found": ("Challenge not found.", "danger"),
+        "disabled": ("Challenge is disabled.", "warning"),
+        "not_live": ("Event is not live.", "danger"),
+        "paused": ("Event is currently paused by administrator.", "warning"),
+        "already_solved": ("Already solved.", "warning"),
+        "correct": ("Correct flag!", "success"),
+        "incorrect": ("Wrong flag.", "danger"),
+    }
+
+    def __init__(self, status, event_id=None, challenge_id=None, points=0):
+        self.status = status
+        self.event_id = event_id
+        self.challenge_id = challenge_id
+        self.points = points
+        self.message, self.category = self.MESSAGES[status]
+
+    @property
+    def is_correct(self):
+        return self.status == "correct"
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "success": self.status in ("correct", "already_solved"),
+            "is_correct": self.is_correct,
+            "message": self.message,
+            "event_id": self.event_id,
+            "challenge_id": self.challenge_id,
+            "points": self.points,
+        }
+
+
+# ---- row builders (add to the session / audit queue, never commit) ----
+
+def add_activity(user_id, action, event_id=None, ip=None, user_agent=None, touch_session=True):
+    log = audit.record(
+        ActivityLog,
+        user_id=user_id,
+        action=action,
+        event_id=event_id,
+        ip_address=ip,
+        user_agent=user_agent
+    )
+    detector.observe_ip(event_id, user_id, ip)
+
+    if event_id and touch_session:
+        touch_user_session(user_id, event_id, ip, user_agent)
+    return log
+
+
+def touch_user_session(user_id, event_id, ip=None, user_agent=None):
+    sess = UserSession.query.filter_by(user_id=user_id, event_id=event_id).first()
+    if not sess:
+        sess = UserSession(user_id=user_id, event_id=event_id)
+        db.session.add(sess)
+    sess.ip_address = ip
+    sess.user_agent = user_agent
+    sess.last_active = datetime.utcnow()
+    return sess
+
+
+def add_submission(user_id, event_id, challenge_id, flag, is_correct, ip=None, user_agent=None):
+    return audit.record(
+        Submission,
+        user_id=user_id,
+        event_id=event_id,
+        challenge_id=challenge_id,
+        flag=flag,
+        is_correct=is_correct,
+        ip_address=ip,
+        user_agent=user_agent
+    )
+
+
+def run_anti_cheat_checks(user_id, event_id, challenge_id, ip, user_agent=None):
+    # IP reuse and rapid-solve bursts are tracked incrementally by the detector;
+    # an alert row is only written the first time a threshold is crossed.
+    for alert in detector.check_submission(event_id, user_id, challenge_id, ip):
+        add_activity(user_id, alert, event_id, ip, user_agent, touch_session=False)
+
+
+def publish_solve(event_id, challenge_id, user_id, score, is_frozen=False, first_blood=False):
+    """Push the committed solve to live subscribers of the event stream."""
+    bus = get_bus()
+    channel = battle_channel(event_id)
+    if not bus.subscriber_count(channel):
+        return
+
+    solve_count = arena_cache.solve_counts(event_id).get(challenge_id, 0)
+    username = db.session.query(User.username).filter(User.id == user_id).scalar()
+
+    bus.publish(channel, {
+        "type": "solve",
+        "challenge_id": challenge_id,
+        "solve_count": solve_count,
+        "first_blood": first_blood,    # decided in the solve's transaction, not from this worker's counts
+        "username": username,
+        "frozen": is_frozen,
+    })
+    bus.publish(channel, {
+        "type": "score",
+        "frozen": is_frozen,
+        "user_id": user_id,
+        "username": username,
+        **score,
+    })
+
+
+# ---- service entry point ----
+
+def submit_flag(user_id, challenge_id, submitted_flag, ip=None, user_agent=None):
+    row = db.session.query(CTFChallenge, CTFEvent)\
+        .join(CTFCategory, CTFChallenge.category_id == CTFCategory.id)\
+        .join(CTFEvent, CTFCategory.event_id == CTFEvent.id)\
+        .filter(CTFChallenge.id == challenge_id)\
+        .first()
+    if row is None:
+        return SubmissionResult("not_found")
+    challenge, event = row
+    event_id, challenge_id, points = event.id, challenge.id, challenge.points
+
+    def result(status):
+        return SubmissionResult(status, event_id, challenge_id, points if status == "correct" else 0)
+
+    now = datetime.utcnow()
+    if now < event.start_time or now > event.end_time:
+        return result("not_live")
+    if event.status == "Paused":
+        return result("paused")
+    if not challenge.is_enabled:
+        return result("disabled")
+
+    existing_solve = db.session.query(CTFEventSolve.id).filter_by(user_id=user_id, challenge_id=challenge.id).first()
+    if existing_solve:
+        return result("already_solved")
+
+    is_correct = (submitted_flag == challenge.flag)
+    is_frozen = bool(event.is_frozen)
+
+    # Record everything for monitoring
+    add_submission(user_id, event.id, challenge.id, submitted_flag, is_correct, ip, user_agent)
+
+    # Perform Anti-cheat check
+    run_anti_cheat_checks(user_id, event.id, challenge.id, ip, user_agent)
+
+    score = None
+    first_blood = False
+    if is_correct:
+        solved_at = datetime.utcnow()
+        db.session.add(CTFEventSolve(
+            event_id=event.id,
+            challenge_id=challenge.id,
+            user_id=user_id,
+            points=challenge.points,
+            solved_at=solved_at
+        ))
+        row = battle_scores.apply_solve(event.id, user_id, challenge.points, solved_at)
+        # apply_solve holds the event's row lock, so concurrent solves of this event are serialized here
+        first_blood = not db.session.query(CTFEventSolve.id).filter(
+            CTFEventSolve.challenge_id == challenge.id, CTFEventSolve.user_id != user_id
+        ).first()
+        score = {
+            "total_points": row.total_points,
+            "solve_count": row.solve_count,
+            "rank": row.rank,
+            "last_solve": solved_at.isoformat(),
+        }
+        detector.observe_solve(event.id, challenge.id)
+        add_activity(user_id, f"Solved challenge: {challenge.title}", event.id, ip, user_agent)
+    else:
+        add_activity(user_id, f"Incorrect flag submission for: {challenge.title}", event.id, ip, user_agent)
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request from the same user won the unique (user, challenge) race
+        db.session.rollback()
+        return result("already_solved")
+
+    if is_correct:
+        arena_cache.record_solve(event_id, challenge_id)
+        publish_solve(event_id, challenge_id, user_id, score, is_frozen, first_blood)
+    return result("correct" if is_correct else "incorrect")
@@ -0,0 +1,279 @@
+import codecs
+import json
+import time
+
+from sqlalchemy import insert, update
+
+from extensions import db
+from ctf_battle_models import CTFCategory, CTFChallenge
+
+# ---------------- BULK CHALLENGE IMPORT ----------------
+# Imports a challenge pack into a battle event:
+#
+#   [{"category": "Web", "challenges": [{"title", "flag", "description",
+#     "points", "hint", "files"}, ...]}, ...]
+#
+# The pack is parsed one category object at a time straight from the upload
+# (iter_items), so a large pack never exists twice in memory, as raw text and
+# as a parsed tree. Every item is validated before anything is written, and
+# all the errors come back together. The event's existing categories and
+# challenge titles are read with one query each. New categories, new
+# challenges and updated challenges are then written as three bulk statements
+# in a single transaction.
+#
+# mode="insert" rejects titles that already exist in the category.
+# mode="upsert" updates them instead, which makes re-importing an edited pack
+# safe. An update only sets the fields the record contains, so a partial
+# record (say, just title and flag) leaves points, hint and files alone.
+
+MODES = ("insert", "upsert")
+CHUNK_SIZE = 64 * 1024
+MAX_ERRORS = 200
+
+FIELD_LIMITS = {"title": 150, "flag": 255, "files": 500}
+
+
+class PackError(ValueError):
+    """The upload isn't a parseable challenge pack."""
+
+
+def iter_items(stream, chunk_size=CHUNK_SIZE):
+    """Yield the top-level items of a JSON array (or JSON Lines) from a binary/text stream, incrementally."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    buf, pos, offset = "", 0, 0
+    opened = closed = eof = False
+
+    def more(size):
+        nonlocal buf, pos, offset, eof
+        chunk = stream.read(size)
+        if not chunk:
+            eof = True
+        if isinstance(chunk, bytes):
+            # may decode to "" (a BOM, half a character) without being the end
+            chunk = utf8.decode(chunk, final=eof)
+        offset += pos
+        buf, pos = buf[pos:] + chunk, 0
+
+    more(chunk_size)
+    while True:
+        # skip whitespace, and the commas between array items
+        while pos < len(buf) and (buf[pos].isspace() or (opened and buf[pos] == ",")):
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                break
+            more(chunk_size)
+            continue
+        if not opened and buf[pos] == "[":
+            opened = True
+            pos += 1
+            continue
+        if opened and buf[pos] == "]":
+            closed = True
+            pos += 1
+            continue
+        if closed:
+            raise PackError(f"Unexpected data after the closing ']' at character {offset + pos}")
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise PackError(f"Invalid JSON at character {offset + e.pos}: {e.msg}")
+            # Incomplete item: read at least as much again, so a huge item is re-scanned only O(log n) times
+            more(max(chunk_size, len(buf) - pos))
+            continue
+        if end == len(buf) and not eof:
+            # a bare number or literal could continue in the next chunk
+            more(chunk_size)
+            continue
+        pos = end
+        yield item
+    if opened and not closed:
+        raise PackError("Unexpected end of file: the top-level array is not closed")
+
+
+class ImportReport:
+    def __init__(self, mode):
+        self.mode = mode
+        self.errors = []
+        self.categories_created = 0
+        self.challenges_created = 0
+        self.challenges_updated = 0
+        self.timings = {}    # phase -> ms
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def error(self, where, message):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"{where}: {message}")
+
+    def summary(self):
+        parts = [f"{self.categories_created} categories created",
+                 f"{self.challenges_created} challenges created"]
+        if self.mode == "upsert":
+            parts.append(f"{self.challenges_updated} updated")
+        timing = ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.timings.items())
+        return f"{'; '.join(parts)} ({timing})"
+
+    def to_dict(self):
+        return {
+            "ok": self.ok,
+            "mode": self.mode,
+            "categories_created": self.categories_created,
+            "challenges_created": self.challenges_created,
+            "challenges_updated": self.challenges_updated,
+            "timings_ms": {phase: round(ms, 1) for phase, ms in self.timings.items()},
+            "errors": self.errors,
+        }
+
+
+def _clean_challenge(data, where, report):
+    """Validated column values for one challenge, or None if it has errors."""
+    if not isinstance(data, dict):
+        report.error(where, "must be an object")
+        return None
+    row = {}
+    valid = True
+    for field in ("title", "flag"):
+        value = data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            report.error(where, f"'{field}' is required")
+            valid = False
+        else:
+            row[field] = value.strip()
+
+    for field in ("description", "hint"):
+        value = data.get(field, "")
+        if value is None:
+            value = ""
+        if not isinstance(value, str):
+            report.error(where, f"'{field}' must be a string")
+            valid = False
+        row[field] = value
+
+    points = data.get("points", 100)
+    if isinstance(points, bool) or not isinstance(points, int) or points < 0:
+        report.error(where, "'points' must be a non-negative integer")
+        valid = False
+    row["points"] = points
+
+    files = data.get("files")
+    if isinstance(files, list):
+        files = ",".join(str(f) for f in files)
+    if files is not None and not isinstance(files, str):
+        report.error(where, "'files' must be a string or a list of paths")
+        valid = False
+    row["files"] = files
+
+    for field, limit in FIELD_LIMITS.items():
+        if isinstance(row.get(field), str) and len(row[field]) > limit:
+            report.error(where, f"'{field}' is longer than {limit} characters")
+            valid = False
+    return row if valid else None
+
+
+def import_pack(event_id, stream, mode="insert"):
+    """Validate and import a challenge pack. Nothing is written unless the whole pack is valid."""
+    report = ImportReport(mode)
+    if mode not in MODES:
+        report.error("mode", f"must be one of {', '.join(MODES)}")
+        return report
+
+    started = time.perf_counter()
+    categories = dict(
+        db.session.query(CTFCategory.name, CTFCategory.id).filter(CTFCategory.event_id == event_id).all()
+    )
+    existing = {
+        (category_id, title): challenge_id
+        for challenge_id, category_id, title in db.session.query(
+            CTFChallenge.id, CTFChallenge.category_id, CTFChallenge.title
+        ).join(CTFCategory, CTFCategory.id == CTFChallenge.category_id)
+         .filter(CTFCategory.event_id == event_id)
+    }
+    report.timings["lookup"] = (time.perf_counter() - started) * 1000
+
+    # ---- parse + validate everything first ----
+    started = time.perf_counter()
+    new_categories = []      # names, in pack order
+    to_insert = []           # (category name, row)
+    to_update = []           # rows with "id"
+    seen = set()             # (category name, title) within this pack
+    try:
+        for index, item in enumerate(iter_items(stream)):
+            where = f"item {index + 1}"
+            if not isinstance(item, dict):
+                report.error(where, "must be an object with 'category' and 'challenges'")
+                continue
+            name = item.get("category")
+            if not isinstance(name, str) or not name.strip():
+                report.error(where, "'category' is required")
+                continue
+            name = name.strip()
+            if len(name) > 100:
+                report.error(where, "'category' is longer than 100 characters")
+                continue
+            challenges = item.get("challenges", [])
+            if not isinstance(challenges, list):
+                report.error(where, "'challenges' must be a list")
+                continue
+            if name not in categories and name not in new_categories:
+                new_categories.append(name)
+
+            for chal_index, data in enumerate(challenges):
+                chal_where = f"{where} ({name}) challenge {chal_index + 1}"
+                row = _clean_challenge(data, chal_where, report)
+                if row is None:
+                    continue
+                key = (name, row["title"])
+                if key in seen:
+                    report.error(chal_where, f"duplicate title '{row['title']}' in this pack")
+                    continue
+                seen.add(key)
+
+                challenge_id = existing.get((categories.get(name), row["title"]))
+                if challenge_id is None:
+                    to_insert.append((name, row))
+                elif mode == "upsert":
+                    # only the fields the record names; an omitted one (e.g. files) keeps its value
+                    row = {field: value for field, value in row.items() if field in data}
+                    row["id"] = challenge_id
+                    to_update.append(row)
+                else:
+                    report.error(chal_where, f"'{row['title']}' already exists in {name} (use upsert to update it)")
+    except PackError as e:
+        report.error("file", str(e))
+    report.timings["parse"] = (time.perf_counter() - started) * 1000
+
+    if not report.ok:
+        return report
+
+    # ---- write in one transaction ----
+    started = time.perf_counter()
+    try:
+        if new_categories:
+            ids = db.session.scalars(
+                insert(CTFCategory).returning(CTFCategory.id, sort_by_parameter_order=True),
+                [{"event_id": event_id, "name": name} for name in new_categories],
+            ).all()
+            categories.update(zip(new_categories, ids))
+        if to_insert:
+            rows = []
+            for name, row in to_insert:
+                row["category_id"] = categories[name]
+                rows.append(row)
+            db.session.execute(insert(CTFChallenge), rows)
+        if to_update:
+            db.session.execute(update(CTFChallenge), to_update)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    report.timings["write"] = (time.perf_counter() - started) * 1000
+
+    report.categories_created = len(new_categories)
+    report.challenges_created = len(to_insert)
+    report.challenges_updated = len(to_update)
+    return report
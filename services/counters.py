@@ -0,0 +1,188 @@
+import atexit
+import threading
+
+from sqlalchemy import bindparam, event
+from sqlalchemy.orm import Session
+
+from extensions import db
+
+# ---------------- WRITE-BEHIND COUNTERS ----------------
+# ctf_task.submissions_count / solved_count and user.xp are bumped on every
+# submission. Doing that as an ORM read-modify-write loses increments under
+# concurrency and makes every writer queue on the same hot row. Instead the
+# request records a delta with incr(). Once its transaction commits, the delta
+# is merged into a per-process buffer. A background thread applies the buffer
+# every COUNTER_FLUSH_INTERVAL seconds as batched
+# `UPDATE ... SET col = COALESCE(col, 0) + :delta` statements.
+#
+# value() is the exact read: the loaded column plus this worker's pending
+# delta. Deltas buffered in other workers show up within one flush interval.
+# An unclean exit loses at most one interval of increments;
+# recount_counters.py rebuilds the columns from the solve/submission rows.
+
+
+class CounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()    # one batch in flight at a time
+        self._pending = {}    # (table, column, row_id) -> delta
+        self._inflight = {}   # the batch currently being written
+        self.app = None
+        self.interval = 2
+        self.max_pending = 5000
+        self._thread = None
+        self._wake = threading.Event()
+        self._listeners = []
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get("COUNTER_FLUSH_INTERVAL", 2)
+        self.max_pending = app.config.get("COUNTER_MAX_PENDING", 5000)
+        atexit.register(self._flush_at_exit)
+
+    # ---- write path ----
+
+    def add(self, deltas):
+        """Merge committed (table, column, row_id, delta) tuples into the buffer."""
+        with self._lock:
+            for table, column, row_id, delta in deltas:
+                key = (table, column, row_id)
+                self._pending[key] = self._pending.get(key, 0) + delta
+            backlog = len(self._pending)
+
+        if not self.interval:
+            self.flush()
+            return
+        self._ensure_started()
+        if backlog >= self.max_pending:
+            self._wake.set()
+
+    def pending(self, table, column, row_id):
+        key = (table, column, row_id)
+        return self._pending.get(key, 0) + self._inflight.get(key, 0)
+
+    def pending_for(self, table, column):
+        """row_id -> delta for one column (used when rebuilding caches from the DB)."""
+        deltas = {}
+        with self._lock:
+            for source in (self._pending, self._inflight):
+                for (t, c, row_id), delta in source.items():
+                    if t == table and c == column:
+                        deltas[row_id] = deltas.get(row_id, 0) + delta
+        return deltas
+
+    # ---- flushing ----
+
+    def add_listener(self, listener):
+        """Call listener(keys) with the (table, column, row_id) keys of every batch once it is written."""
+        self._listeners.append(listener)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Counter flush error: {e}")
+
+    def flush(self):
+        """Apply every pending delta in one transaction. Deltas are put back if it fails.
+
+        Waits for a flush already running in another thread, then writes
+        whatever is pending by then, so nothing is left behind when there is
+        no background thread (COUNTER_FLUSH_INTERVAL=0).
+        """
+        with self._flush_lock:
+            return self._flush_batch()
+
+    def _flush_batch(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._inflight = batch
+        if not batch:
+            return 0
+
+        grouped = {}
+        for (table, column, row_id), delta in batch.items():
+            if delta:
+                grouped.setdefault((table, column), []).append({"row_id": row_id, "delta": delta})
+
+        try:
+            with db.engine.begin() as conn:
+                for (table_name, column), rows in grouped.items():
+                    table = db.metadata.tables[table_name]
+                    col = table.c[column]
+                    stmt = table.update()\
+                        .where(table.c.id == bindparam("row_id"))\
+                        .values({column: db.func.coalesce(col, 0) + bindparam("delta")})
+                    conn.execute(stmt, rows)
+        except Exception:
+            with self._lock:
+                for key, delta in batch.items():
+                    self._pending[key] = self._pending.get(key, 0) + delta
+                self._inflight = {}
+            raise
+        with self._lock:
+            self._inflight = {}
+        for listener in self._listeners:
+            try:
+                listener(list(batch))
+            except Exception as e:
+                print(f"Counter listener error: {e}")
+        return len(batch)
+
+    def _flush_at_exit(self):
+        if self._pending and self.app is not None:
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Counter flush at exit failed: {e}")
+
+
+counter_buffer = CounterBuffer()
+
+
+def incr(instance, column, delta=1):
+    """Record `column += delta` on a persistent row; applied after the current transaction commits."""
+    incr_row(instance.__table__, instance.id, column, delta)
+
+
+def incr_row(table, row_id, column, delta=1):
+    """incr() for a row addressed by table and primary key, e.g. the current user."""
+    db.session.info.setdefault("counter_deltas", []).append((table.name, column, row_id, delta))
+
+
+def value(instance, column):
+    """Column value including increments not yet flushed by this worker."""
+    return value_of(instance.__table__, instance.id, column, getattr(instance, column))
+
+
+def value_of(table, row_id, column, stored):
+    """value() for a row addressed by table and primary key; `stored` is the column as last read."""
+    return (stored or 0) + counter_buffer.pending(table.name, column, row_id)
+
+
+# ---- session hooks ----
+
+@event.listens_for(Session, "after_commit")
+def _buffer_counter_deltas(session):
+    deltas = session.info.pop("counter_deltas", None)
+    if deltas:
+        counter_buffer.add(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_counter_deltas(session):
+    session.info.pop("counter_deltas", None)
+
+
+def init_app(app):
+    counter_buffer.init_app(app)
@@ -0,0 +1,195 @@
+import hashlib
+import itertools
+import json
+import threading
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User, Activity, TaskSolve, TeamMember
+from services import counters
+from services.audit import audit_writer
+from services.cache import TTLCache
+from services.pagination import encode_cursor, decode_cursor
+
+# ---------------- DASHBOARD POLLING ----------------
+# console/dashboard.html polls its stats and activity feed every few seconds
+# per open tab, and almost every poll finds nothing new. Each user has a
+# version stamp in process memory. It is bumped after a commit that changes
+# what the dashboard shows (a solve, a team join) and when the audit writer
+# has inserted Activity rows for the user. Computed payloads are memoised
+# against that stamp, so an unchanged poll is answered without a query.
+#
+# Responses carry an ETag derived from their content, which means a poll that
+# lands on another gunicorn worker still gets its 304. The activity feed also
+# takes ?since=<cursor> (the newest row the client holds) and then returns
+# only the newer rows. Other workers don't see this worker's bumps;
+# DASHBOARD_CACHE_TTL bounds how stale their memo can be.
+
+ACTIVITY_LIMIT = 15
+
+
+class UserVersions:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._versions = {}    # user_id -> stamp
+        self._epoch = 0        # bumped for "everyone" (admin deletes)
+
+    def get(self, user_id):
+        return (self._epoch, self._versions.get(user_id, 0))
+
+    def bump(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._epoch = next(self._counter)
+                self._versions.clear()
+            else:
+                self._versions[user_id] = next(self._counter)
+
+
+versions = UserVersions()
+_memo = TTLCache(maxsize=10000, ttl=15)
+
+
+def init_app(app):
+    global _memo
+    _memo = TTLCache(maxsize=app.config.get("DASHBOARD_CACHE_SIZE", 10000),
+                     ttl=app.config.get("DASHBOARD_CACHE_TTL", 15))
+    audit_writer.add_listener(_activity_written)
+
+
+def _memoised(kind, user_id, build):
+    version = versions.get(user_id)
+    cached = _memo.get((kind, user_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    value = build(user_id)
+    _memo.set((kind, user_id), (version, value))
+    return value
+
+
+def _etag(payload):
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def conditional_json(payload, etag=None):
+    response = jsonify(payload)
+    response.set_etag(etag or _etag(payload))
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    return response.make_conditional(request)
+
+
+# ---- bumping ----
+
+def bump_on_commit(user_id=None):
+    """Bump `user_id`'s stamp (everyone's if None) once the current transaction commits."""
+    db.session.info.setdefault("dashboard_bumps", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_bumps(db_session):
+    for user_id in db_session.info.pop("dashboard_bumps", ()):
+        versions.bump(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumps(db_session):
+    db_session.info.pop("dashboard_bumps", None)
+
+
+def _activity_written(model, rows):
+    if model is Activity:
+        for user_id in {row.get("user_id") for row in rows}:
+            versions.bump(user_id)
+
+
+# ---- stats ----
+
+def _rank(xp):
+    """Simple rank logic: (rank, XP needed for the next one)."""
+    if xp < 1000:
+        return "Beginner", 1000
+    if xp < 3000:
+        return "Intermediate", 3000
+    return "Advanced", 10000
+
+
+def _stats_counts(user_id):
+    return {
+        "solved": TaskSolve.query.filter_by(user_id=user_id).count(),
+        "teams": TeamMember.query.filter_by(user_id=user_id).count(),
+    }
+
+
+def stats_payload(user):
+    counts = _memoised("stats", user.id, _stats_counts)
+    xp = counters.value_of(User.__table__, user.id, "xp", user.xp)
+    rank, next_xp = _rank(xp)
+    return {
+        "username": user.username,
+        "player_id": user.id,
+        "active_challenges": counts["solved"],
+        "teams_count": counts["teams"],
+        "rank": rank,
+        "xp": xp,
+        "next_xp_threshold": next_xp,
+        "progress_percent": min(100, (xp / next_xp) * 100) if next_xp > 0 else 100
+    }
+
+
+# ---- activity ----
+
+def _activity_rows(user_id):
+    return tuple(
+        db.session.query(Activity.id, Activity.created_at, Activity.action, Activity.type)
+        .filter(Activity.user_id == user_id)
+        .order_by(Activity.created_at.desc(), Activity.id.desc())
+        .limit(ACTIVITY_LIMIT)
+        .all()
+    )
+
+
+def time_ago(created_at, now):
+    delta = now - created_at
+    if delta.days > 0:
+        return f"{delta.days} day{'s' if delta.days > 1 else ''} ago"
+    if delta.seconds // 3600 > 0:
+        return f"{delta.seconds // 3600} hours ago"
+    if delta.seconds // 60 > 0:
+        return f"{delta.seconds // 60} mins ago"
+    return "just now"
+
+
+def activity_payload(user_id, since=None, now=None):
+    """The newest activities, or only those after the `since` cursor when the client still has the rest.
+
+    Returns (payload, etag). Raises InvalidCursor for a malformed `since`.
+    """
+    now = now or datetime.utcnow()
+    rows = _memoised("activity", user_id, _activity_rows)
+    cursor = encode_cursor([rows[0].created_at, rows[0].id]) if rows else None
+
+    full, new_rows = True, rows
+    if since:
+        key = tuple(decode_cursor(since, (datetime, int)))
+        for index, row in enumerate(rows):
+            if (row.created_at, row.id) == key:
+                full, new_rows = False, rows[:index]
+                break
+
+    return {
+        "activities": [{
+            "action": row.action,
+            "type": row.type,
+            "created_at": row.created_at.isoformat() + "Z",
+            "time_ago": time_ago(row.created_at, now),
+        } for row in new_rows],
+        "cursor": cursor,
+        "full": full,
+    }, _etag([cursor, since, len(rows)])    # time_ago is left out: the client re-renders it from created_at
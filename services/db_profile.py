@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# ---------------- DATABASE ENGINE PROFILES ----------------
+# The engine is tuned according to the backend named in DATABASE_URL.
+#
+# postgresql: a QueuePool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW, with
+#   pre-ping and recycling so that connections dropped by the server or a
+#   proxy are replaced instead of failing a request.
+# sqlite: every connection is switched to WAL (readers no longer block the
+#   writer) with busy_timeout and synchronous=NORMAL. SQLite only allows one
+#   writer at a time, so the writers in this process also queue on a lock,
+#   taken at the first INSERT/UPDATE/DELETE of a transaction and released when
+#   it ends. Without it, concurrent submitters spin in SQLite's busy handler
+#   until one of them gives up with "database is locked".
+#
+# pool_stats() is what /admin/perf shows for the current worker.
+
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_write_locks = {}    # engine -> WriteLock
+
+
+def normalize_url(url):
+    """Heroku/Render still hand out postgres://, which SQLAlchemy no longer accepts."""
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(uri, env=os.environ):
+    """SQLALCHEMY_ENGINE_OPTIONS for the backend in `uri`."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+
+    if backend == "postgresql":
+        return {
+            "pool_size": int(env.get("DB_POOL_SIZE", "10")),
+            "max_overflow": int(env.get("DB_MAX_OVERFLOW", "20")),
+            "pool_timeout": int(env.get("DB_POOL_TIMEOUT", "30")),
+            "pool_recycle": int(env.get("DB_POOL_RECYCLE", "1800")),
+            "pool_pre_ping": True,
+        }
+
+    if backend == "sqlite":
+        busy_timeout = float(env.get("SQLITE_BUSY_TIMEOUT", "30"))
+        options = {"connect_args": {"timeout": busy_timeout, "check_same_thread": False}}
+        if not _is_memory_sqlite(url):
+            # Connections are cheap, but each waiting writer holds one; leave room for 50 submitters
+            options.update({
+                "pool_size": int(env.get("DB_POOL_SIZE", "10")),
+                "max_overflow": int(env.get("DB_MAX_OVERFLOW", "50")),
+                "pool_timeout": busy_timeout,
+            })
+        return options
+
+    return {}
+
+
+# ---- sqlite ----
+
+class WriteLock:
+    """Process-wide SQLite writer lock with wait statistics."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def acquire(self):
+        if self._lock.acquire(blocking=False):
+            self.acquired += 1
+            return True
+        start = time.perf_counter()
+        # On timeout go ahead anyway and let SQLite's own busy handling decide
+        got = self._lock.acquire(timeout=self.timeout)
+        self.waited += 1
+        self.wait_seconds += time.perf_counter() - start
+        if got:
+            self.acquired += 1
+        else:
+            self.timeouts += 1
+        return got
+
+    def release(self):
+        self._lock.release()
+
+    def stats(self):
+        return {
+            "write_transactions": self.acquired,
+            "writer_waits": self.waited,
+            "avg_writer_wait_ms": self.wait_seconds * 1000 / self.waited if self.waited else 0.0,
+            "writer_lock_timeouts": self.timeouts,
+        }
+
+
+def configure_sqlite(engine, env=os.environ):
+    busy_timeout = float(env.get("SQLITE_BUSY_TIMEOUT", "30"))
+    write_lock = WriteLock(busy_timeout)
+    _write_locks[engine] = write_lock
+    memory = _is_memory_sqlite(engine.url)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        cursor.close()
+
+    if memory:
+        return    # one shared connection; nothing to serialize
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _take_write_lock(conn, cursor, statement, parameters, context, executemany):
+        info = conn.connection.info
+        if "sqlite_write_lock" in info:
+            return
+        if statement.lstrip()[:7].upper().startswith(WRITE_VERBS):
+            info["sqlite_write_lock"] = write_lock.acquire()
+
+    def _release(info):
+        if info.pop("sqlite_write_lock", False):
+            write_lock.release()
+
+    # commit/rollback fire on the way out of the transaction; checkin covers
+    # connections returned without one (pool reset, invalidation)
+    @event.listens_for(engine, "commit")
+    def _release_on_commit(conn):
+        _release(conn.connection.info)
+
+    @event.listens_for(engine, "rollback")
+    def _release_on_rollback(conn):
+        _release(conn.connection.info)
+
+    @event.listens_for(engine.pool, "checkin")
+    def _release_on_checkin(dbapi_connection, connection_record):
+        if connection_record is not None:
+            _release(connection_record.info)
+
+
+# ---- stats ----
+
+def pool_stats(engine):
+    """Pool (and SQLite writer lock) statistics for this worker."""
+    pool = engine.pool
+    stats = {
+        "backend": engine.dialect.name,
+        "pool": type(pool).__name__,
+        "status": pool.status(),
+    }
+    if hasattr(pool, "checkedout"):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": getattr(pool, "_max_overflow", 0),
+        })
+    write_lock = _write_locks.get(engine)
+    if write_lock is not None:
+        stats.update(write_lock.stats())
+    return stats
+
+
+def init_app(app):
+    from extensions import db
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == "sqlite":
+        configure_sqlite(engine)
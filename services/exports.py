@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from flask import Response, stream_with_context
+
+from extensions import db
+from models import User, CTFTask, TaskSolve, TaskSubmission
+from ctf_battle_models import CTFChallenge, ActivityLog, Submission, BattleScore
+from services import battle_scores
+
+# ---------------- STREAMING EXPORTS ----------------
+# Admin downloads are generated while they are sent. Rows come off a
+# server-side cursor in EXPORT_BATCH_SIZE batches (Query.yield_per, with
+# stream_results on Postgres). Each batch is encoded and yielded, then
+# dropped, so a worker holds one batch no matter whether the export has a
+# hundred rows or a million.
+#
+# Formats: "csv", and "jsonl" (one JSON object per line, gzip-compressed on
+# the fly into a .jsonl.gz download).
+
+EXPORT_BATCH_SIZE = 1000
+FORMATS = ("csv", "jsonl")
+
+
+class ExportSpec:
+    def __init__(self, columns, query, filename):
+        self.columns = columns      # header names, in row order
+        self.query = query          # callable(**params) -> Query of plain column tuples
+        self.filename = filename    # format string over the same params
+
+
+def _battle_submissions(event_id):
+    return db.session.query(
+        Submission.id, Submission.created_at, Submission.user_id, User.username,
+        Submission.challenge_id, CTFChallenge.title, Submission.flag, Submission.is_correct,
+        Submission.ip_address, Submission.city, Submission.region, Submission.country
+    ).outerjoin(User, User.id == Submission.user_id)\
+     .outerjoin(CTFChallenge, CTFChallenge.id == Submission.challenge_id)\
+     .filter(Submission.event_id == event_id)\
+     .order_by(Submission.id)
+
+
+def _battle_activity(event_id):
+    return db.session.query(
+        ActivityLog.id, ActivityLog.created_at, ActivityLog.user_id, User.username, ActivityLog.action,
+        ActivityLog.ip_address, ActivityLog.user_agent, ActivityLog.city, ActivityLog.region, ActivityLog.country
+    ).outerjoin(User, User.id == ActivityLog.user_id)\
+     .filter(ActivityLog.event_id == event_id)\
+     .order_by(ActivityLog.id)
+
+
+def _battle_scoreboard(event_id):
+    return battle_scores.scoreboard_query(event_id).with_entities(
+        BattleScore.rank, User.username, User.email, BattleScore.total_points,
+        BattleScore.solve_count, BattleScore.last_solve_at
+    )
+
+
+def _battle_scoreboard_legacy(event_id):
+    return battle_scores.scoreboard_query(event_id).with_entities(
+        BattleScore.rank, User.username, User.email, BattleScore.total_points
+    )
+
+
+def _task_solves():
+    return db.session.query(
+        TaskSolve.id, TaskSolve.solved_at, TaskSolve.user_id, User.username,
+        TaskSolve.task_id, CTFTask.title, CTFTask.points
+    ).outerjoin(User, User.id == TaskSolve.user_id)\
+     .outerjoin(CTFTask, CTFTask.id == TaskSolve.task_id)\
+     .order_by(TaskSolve.id)
+
+
+def _task_submissions():
+    return db.session.query(
+        TaskSubmission.id, TaskSubmission.submitted_at, TaskSubmission.user_id, User.username,
+        TaskSubmission.task_id, CTFTask.title, TaskSubmission.submitted_flag, TaskSubmission.is_correct
+    ).outerjoin(User, User.id == TaskSubmission.user_id)\
+     .outerjoin(CTFTask, CTFTask.id == TaskSubmission.task_id)\
+     .order_by(TaskSubmission.id)
+
+
+BATTLE_EXPORTS = {
+    "scoreboard": ExportSpec(
+        ["rank", "username", "email", "total_points", "solve_count", "last_solve"],
+        _battle_scoreboard, "scoreboard_event_{event_id}"),
+    "submissions": ExportSpec(
+        ["id", "created_at", "user_id", "username", "challenge_id", "challenge", "flag", "is_correct",
+         "ip_address", "city", "region", "country"],
+        _battle_submissions, "submissions_event_{event_id}"),
+    "activity": ExportSpec(
+        ["id", "created_at", "user_id", "username", "action", "ip_address", "user_agent",
+         "city", "region", "country"],
+        _battle_activity, "activity_event_{event_id}"),
+}
+
+# The original "Export CSV" download; its header is kept for anyone parsing it
+LEGACY_SCOREBOARD_CSV = ExportSpec(
+    ["Rank", "Username", "Email", "Total Points"],
+    _battle_scoreboard_legacy, "scoreboard_event_{event_id}")
+
+PLATFORM_EXPORTS = {
+    "solves": ExportSpec(
+        ["id", "solved_at", "user_id", "username", "task_id", "task", "points"],
+        _task_solves, "task_solves"),
+    "submissions": ExportSpec(
+        ["id", "submitted_at", "user_id", "username", "task_id", "task", "submitted_flag", "is_correct"],
+        _task_submissions, "task_submissions"),
+}
+
+
+# ---- encoding ----
+
+def _batches(query, size=EXPORT_BATCH_SIZE):
+    batch = []
+    for row in query.yield_per(size):
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(columns, query):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield buf.getvalue()
+    for batch in _batches(query):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(batch)
+        yield buf.getvalue()
+
+
+def iter_jsonl_gz(columns, query):
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31)   # wbits 31 = gzip container
+    for batch in _batches(query):
+        lines = "".join(
+            json.dumps(dict(zip(columns, map(_json_value, row))), separators=(",", ":")) + "\n"
+            for row in batch
+        )
+        chunk = gzip.compress(lines.encode())
+        if chunk:
+            yield chunk
+    yield gzip.flush()
+
+
+def export_response(spec, fmt, **params):
+    """Streaming download of `spec` as "csv" or "jsonl" (gzip)."""
+    query = spec.query(**params)
+    filename = spec.filename.format(**params)
+    if fmt == "jsonl":
+        body, mimetype, filename = iter_jsonl_gz(spec.columns, query), "application/gzip", filename + ".jsonl.gz"
+    else:
+        body, mimetype, filename = iter_csv(spec.columns, query), "text/csv", filename + ".csv"
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={filename}",
+        "X-Accel-Buffering": "no",
+    })
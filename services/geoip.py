@@ -0,0 +1,205 @@
+import ipaddress
+import queue
+import threading
+
+import requests
+
+from extensions import db
+from services.cache import TTLCache
+
+# ---------------- GEOIP ENRICHMENT ----------------
+# Battle rows (ActivityLog, Submission) are written with just the IP address.
+# Rows whose IP is already cached are filled in before insert; everything else
+# is handed to a background worker once the audit writer has inserted it
+# (services/audit.py), which resolves the IP and back-fills
+# city/region/country/lat/lon.
+#
+# Answers are cached for GEOIP_CACHE_TTL. A failed lookup (rate limited,
+# timeout) is only remembered for GEOIP_FAILURE_TTL, so one bad response
+# doesn't blank an IP's location for a day.
+
+GEO_FIELDS = ("city", "region", "country", "lat", "lon")
+
+
+# ---- resolvers ----
+
+class StubResolver:
+    """Fixed IP -> geo mapping, for tests and offline development."""
+
+    def __init__(self, mapping=None, default=None):
+        self.mapping = mapping or {}
+        self.default = default or {}
+
+    def resolve(self, ip):
+        return dict(self.mapping.get(ip, self.default))
+
+
+class MMDBResolver:
+    """Local MaxMind-style database (GeoLite2-City.mmdb). Needs the `maxminddb` package."""
+
+    def __init__(self, path):
+        try:
+            import maxminddb
+        except ImportError:
+            raise RuntimeError("GEOIP_RESOLVER='mmdb' requires the 'maxminddb' package")
+        self.reader = maxminddb.open_database(path)
+
+    def resolve(self, ip):
+        record = self.reader.get(ip) or {}
+        subdivisions = record.get("subdivisions") or [{}]
+        location = record.get("location") or {}
+        return {
+            "city": (record.get("city") or {}).get("names", {}).get("en"),
+            "region": subdivisions[0].get("names", {}).get("en"),
+            "country": (record.get("country") or {}).get("names", {}).get("en"),
+            "lat": location.get("latitude"),
+            "lon": location.get("longitude"),
+        }
+
+
+class IpApiResolver:
+    """ip-api.com free endpoint (45 req/min). Only ever called from the worker thread."""
+
+    def __init__(self, timeout=2):
+        self.timeout = timeout
+
+    def resolve(self, ip):
+        response = requests.get(f"http://ip-api.com/json/{ip}", timeout=self.timeout)
+        response.raise_for_status()    # 429 etc.: a failure, not an empty answer
+        data = response.json()
+        return {
+            "city": data.get("city"),
+            "region": data.get("regionName"),
+            "country": data.get("country"),
+            "lat": data.get("lat"),
+            "lon": data.get("lon"),
+        }
+
+
+def build_resolver(config):
+    kind = config.get("GEOIP_RESOLVER", "ipapi")
+    if kind == "mmdb":
+        return MMDBResolver(config["GEOIP_DB_PATH"])
+    if kind == "stub":
+        return StubResolver()
+    if kind == "ipapi":
+        return IpApiResolver()
+    return None
+
+
+# ---- worker ----
+
+class GeoIPWorker:
+    def __init__(self):
+        self.cache = TTLCache()
+        self.failure_ttl = 300
+        self.resolver = None
+        self.app = None
+        self._queue = None
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.cache = TTLCache(
+            maxsize=app.config.get("GEOIP_CACHE_SIZE", 10000),
+            ttl=app.config.get("GEOIP_CACHE_TTL", 24 * 3600),
+        )
+        self.failure_ttl = app.config.get("GEOIP_FAILURE_TTL", 300)
+        self.resolver = build_resolver(app.config)
+        self._queue = queue.Queue(maxsize=app.config.get("GEOIP_QUEUE_SIZE", 10000))
+
+    def set_resolver(self, resolver):
+        self.resolver = resolver
+        self.cache.clear()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="geoip-worker", daemon=True)
+            self._thread.start()
+
+    def submit(self, jobs):
+        """Queue (model, row_id, ip) jobs. Drops jobs rather than block a request when full."""
+        if self.resolver is None or self._queue is None:
+            return
+        self._ensure_started()
+        for job in jobs:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                break
+
+    def flush(self):
+        """Block until every queued job has been written back (used by tests/scripts)."""
+        if self._queue is not None and self._thread is not None:
+            self._queue.join()
+
+    def lookup(self, ip):
+        geo = self.cache.get(ip)
+        if geo is not None:
+            return geo
+        try:
+            geo = self.resolver.resolve(ip) or {}
+        except Exception as e:
+            print(f"GeoIP error: {e}")
+            self.cache.set(ip, {}, ttl=self.failure_ttl)
+            return {}
+        self.cache.set(ip, geo)
+        return geo
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    self._apply(batch)
+            except Exception as e:
+                print(f"GeoIP worker error: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _apply(self, batch):
+        grouped = {}
+        for model, row_id, ip in batch:
+            grouped.setdefault((model, ip), []).append(row_id)
+
+        for (model, ip), row_ids in grouped.items():
+            geo = self.lookup(ip)
+            if not any(geo.get(f) is not None for f in GEO_FIELDS):
+                continue
+            db.session.query(model).filter(model.id.in_(row_ids)).update(
+                {f: geo.get(f) for f in GEO_FIELDS}, synchronize_session=False
+            )
+        db.session.commit()
+
+
+geoip_worker = GeoIPWorker()
+
+
+def is_public_ip(ip):
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except (TypeError, ValueError):
+        return False
+
+
+def enrich_values(values):
+    """Fill geo fields of a row dict from cache. True if the row still needs the worker once inserted."""
+    ip = values.get("ip_address")
+    if not is_public_ip(ip) or geoip_worker.resolver is None:
+        return False
+    geo = geoip_worker.cache.get(ip)
+    if geo is None:
+        return True
+    for field in GEO_FIELDS:
+        values[field] = geo.get(field)
+    return False
+
+
+def init_app(app):
+    geoip_worker.init_app(app)
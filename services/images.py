@@ -0,0 +1,286 @@
+import atexit
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+
+from flask import url_for
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User, Blog
+from services import assets, page_cache, storage, user_cache
+from services.storage import UploadRejected
+
+# ---------------- IMAGE DERIVATIVES ----------------
+# Avatars and blog thumbnails are uploaded at whatever size the browser
+# offers. They are kept as the original (content-addressed, services/storage.py)
+# and served as small WebP derivatives instead:
+#
+#   avatar     square centre crop at 64 / 192 / 512 px       -> User.avatar_variants
+#   thumbnail  scaled to 480 / 1200 px wide, never upscaled  -> Blog.thumbnail_variants
+#
+# save_image() checks that an upload really is an image of sane dimensions
+# before it is stored. queue_derivatives() clears the row's variants and, once
+# the request's transaction commits, hands the row to a small thread pool
+# (IMAGE_WORKERS). The pool renders each size to
+# uploads/derived/ab/<sha>_<size>.webp and writes the paths back, but only if
+# the row still points at the same original, so a newer upload always wins.
+# Until then, and whenever Pillow is missing, templates get the original
+# through avatar_url() / blog_thumbnail_url().
+
+AVATAR_SIZES = {"sm": 64, "md": 192, "lg": 512}
+THUMBNAIL_SIZES = {"sm": 480, "lg": 1200}
+
+# Pillow format -> stored extension; the client's filename never decides it
+ALLOWED_FORMATS = {"PNG": ".png", "JPEG": ".jpg", "GIF": ".gif", "WEBP": ".webp"}
+DEFAULT_MAX_PIXELS = 40_000_000
+
+ImageKind = namedtuple("ImageKind", "model source variants sizes crop path")
+
+KINDS = {
+    "avatar": ImageKind(User, "profile_image", "avatar_variants", AVATAR_SIZES, True,
+                        lambda user: user.profile_image),
+    "thumbnail": ImageKind(Blog, "thumbnail", "thumbnail_variants", THUMBNAIL_SIZES, False,
+                           lambda blog: blog.thumbnail_path),
+}
+
+
+def _pillow():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    return Image, ImageOps
+
+
+# ---- rendering ----
+
+def _derived_stem(source):
+    """Content-addressed sources already carry their hash; anything else is named after its path."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    if re.fullmatch(r"[0-9a-f]{64}", stem):
+        return stem
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def derived_key(source, size):
+    stem = _derived_stem(source)
+    return f"uploads/derived/{stem[:2]}/{stem}_{size}.webp"
+
+
+def _target_widths(image, sizes, crop):
+    """{size name: output width}. Never upscales, and a size within 10% of the next larger
+    one is rendered at that larger width (a 480 px copy of a 500 px image saves nothing)."""
+    limit = min(image.width, image.height) if crop else image.width
+    widths = {}
+    larger = None
+    for name, px in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        width = min(px, limit)
+        if larger is not None and width >= 0.9 * larger:
+            width = larger
+        widths[name] = larger = width
+    return widths
+
+
+def _resize(image, width, crop, Image, ImageOps):
+    if crop:
+        return ImageOps.fit(image, (width, width), Image.LANCZOS)
+    if image.width <= width:
+        return image.copy()
+    return image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+
+def render(backend, source, sizes, crop, key_for=derived_key, quality=80):
+    """Write a WebP of `source` for every size that doesn't exist yet. Returns {size: key}."""
+    Image, ImageOps = _pillow()
+    keys = {name: key_for(source, name) for name in sizes}
+    missing = [name for name, key in keys.items() if not backend.exists(key)]
+    if not missing:
+        return keys
+
+    with backend.open(source) as fh, Image.open(fh) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        widths = _target_widths(image, sizes, crop)
+        for name in missing:
+            fd, staged = tempfile.mkstemp(dir=backend.staging_dir(), suffix=".webp")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    _resize(image, widths[name], crop, Image, ImageOps).save(out, "WEBP", quality=quality, method=4)
+                backend.put(keys[name], staged)
+            except BaseException:
+                if os.path.exists(staged):
+                    os.remove(staged)
+                raise
+    return keys
+
+
+# ---- worker pool ----
+
+class ImagePipeline:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.quality = 80
+        self._workers = 2
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.quality = app.config.get("IMAGE_WEBP_QUALITY", 80)
+        self._workers = app.config.get("IMAGE_WORKERS", 2)
+        self.enabled = app.config.get("IMAGE_DERIVATIVES", True)
+        if self.enabled and _pillow() is None:
+            print("⚠️ Pillow is not installed; image derivatives are disabled and originals are served")
+            self.enabled = False
+        atexit.register(self.flush)
+
+    def submit(self, jobs):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="image-worker")
+            for job in jobs:
+                future = self._executor.submit(self._run, *job)
+                self._pending.add(future)
+                future.add_done_callback(self._pending.discard)
+
+    def _run(self, kind_name, row_id, source, path):
+        kind = KINDS[kind_name]
+        try:
+            with self.app.app_context():
+                variants = render(storage.get_backend(), path, kind.sizes, kind.crop, quality=self.quality)
+                model = kind.model
+                db.session.execute(
+                    update(model)
+                    .where(model.id == row_id, getattr(model, kind.source) == source)
+                    .values({kind.variants: variants})
+                )
+                if kind.model is Blog:
+                    page_cache.invalidate_on_commit()    # /blog shows the thumbnails
+                else:
+                    user_cache.invalidate_on_commit(row_id)    # the cached principal carries avatar_variants
+                db.session.commit()
+        except Exception as e:
+            print(f"Image derivatives for {kind_name} {row_id} ({path}) failed: {e}")
+
+    def flush(self):
+        """Block until every queued image has been processed (used by scripts/tests)."""
+        wait(list(self._pending))
+
+
+pipeline = ImagePipeline()
+
+
+# ---- uploads ----
+
+def validate(file):
+    """Reject uploads that aren't a decodable PNG/JPEG/GIF/WebP within IMAGE_MAX_PIXELS.
+
+    Returns (extension, MIME type) for the decoded format, or None without Pillow.
+    """
+    pil = _pillow()
+    if pil is None:
+        return None
+    Image, _ = pil
+    max_pixels = pipeline.app.config.get("IMAGE_MAX_PIXELS", DEFAULT_MAX_PIXELS) if pipeline.app else DEFAULT_MAX_PIXELS
+    try:
+        with Image.open(file.stream) as image:
+            fmt, (width, height) = image.format, image.size
+            if width * height > max_pixels:
+                raise UploadRejected(f"Image is too large ({width}x{height} pixels)")
+            image.verify()
+    except UploadRejected:
+        raise
+    except Exception:
+        raise UploadRejected("The file is not a valid image")
+    finally:
+        file.stream.seek(0)
+    if fmt not in ALLOWED_FORMATS:
+        raise UploadRejected(f"Unsupported image format ({fmt}); use PNG, JPEG, GIF or WebP")
+    return ALLOWED_FORMATS[fmt], Image.MIME[fmt]
+
+
+def save_image(file):
+    """Validate and store an uploaded image under its decoded format's extension; returns its StoredFile."""
+    return storage.save_upload(file, kind="image", image_type=validate(file))
+
+
+def queue_derivatives(instance, kind_name):
+    """Drop the row's old derivatives and render new ones once the current transaction commits."""
+    kind = KINDS[kind_name]
+    setattr(instance, kind.variants, None)
+    source = getattr(instance, kind.source)
+    if not source:
+        return
+    if instance.id is None:
+        db.session.flush()
+    db.session.info.setdefault("image_jobs", []).append((kind_name, instance.id, source, kind.path(instance)))
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_image_jobs(session):
+    jobs = session.info.pop("image_jobs", None)
+    if jobs:
+        pipeline.submit(jobs)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_image_jobs(session):
+    session.info.pop("image_jobs", None)
+
+
+# ---- template helpers ----
+
+def bundled_key(path, size):
+    """Derivative of a file shipped in static/: avatars/avatar1.png -> avatars/derived/avatar1_md.webp."""
+    folder, filename = path.rsplit("/", 1)
+    return f"{folder}/derived/{os.path.splitext(filename)[0]}_{size}.webp"
+
+
+@lru_cache(maxsize=256)
+def _bundled_exists(static_folder, key):
+    return os.path.exists(os.path.join(static_folder, *key.split("/")))
+
+
+def bundled_image_url(path, size):
+    """A static image's derivative if build_image_derivatives.py has made it, else the image itself."""
+    key = bundled_key(path, size)
+    if assets.has_asset(key) or _bundled_exists(pipeline.app.static_folder, key):
+        return assets.asset_url(key)
+    return assets.asset_url(path)
+
+
+def bundled_avatar_url(filename, size="md"):
+    return bundled_image_url(f"avatars/{os.path.basename(filename or 'avatar1.png')}", size)
+
+
+def avatar_url(user, size="md"):
+    if user.avatar_type == "custom" and user.profile_image:
+        path = (user.avatar_variants or {}).get(size) or user.profile_image
+        return url_for("static", filename=path)
+    return bundled_avatar_url(user.avatar_filename, size)
+
+
+def blog_thumbnail_url(blog, size="sm"):
+    path = (blog.thumbnail_variants or {}).get(size) or blog.thumbnail_path
+    return url_for("static", filename=path) if path else None
+
+
+def init_app(app):
+    pipeline.init_app(app)
+    app.add_template_global(avatar_url)
+    app.add_template_global(bundled_avatar_url)
+    app.add_template_global(bundled_image_url)
+    app.add_template_global(blog_thumbnail_url)
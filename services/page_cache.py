@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from services.cache import TTLCache, StampFile
+
+# ---------------- PUBLIC PAGE CACHE ----------------
+# The landing pages (home, about, features, resources, blog) look the same to
+# every visitor who isn't logged in. @cache_page stores the rendered bytes for
+# anonymous GETs, keyed by path and query string, together with a gzip copy,
+# an ETag and a Last-Modified time. Later anonymous hits are answered from
+# memory, with a 304 when the browser already has that version. Such a hit
+# never touches the database, the user loader or Jinja.
+#
+# A request is treated as anonymous when the session carries no user id and
+# there is no remember-me cookie. Requests with pending flash messages bypass
+# the cache.
+#
+# Invalidation: invalidate_on_commit() (called by the blog admin views) clears
+# the cache once the transaction commits. It also touches a stamp file in the
+# instance folder. Every worker compares that file's mtime on each hit and
+# drops its own copy when the stamp moves, so all gunicorn workers serve the
+# new page at once. PAGE_CACHE_TTL bounds how long a page lives otherwise.
+
+
+class CachedPage:
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class PageCache:
+    def __init__(self):
+        self.enabled = True
+        self._pages = TTLCache(maxsize=256, ttl=300)
+        self._stamp = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PAGE_CACHE_ENABLED", True)
+        self._pages = TTLCache(maxsize=app.config.get("PAGE_CACHE_SIZE", 256),
+                               ttl=app.config.get("PAGE_CACHE_TTL", 300))
+        self._stamp = StampFile(os.path.join(app.instance_path, "page_cache.stamp"))
+
+    def get(self, key):
+        if self._stamp is not None and self._stamp.changed():
+            self._pages.clear()
+        return self._pages.get(key)
+
+    def set(self, key, page):
+        self._pages.set(key, page)
+
+    def invalidate(self):
+        """Drop every cached page, in this worker and (via the stamp file) in the others."""
+        self._pages.clear()
+        if self._stamp is not None:
+            self._stamp.touch()
+
+
+page_cache = PageCache()
+
+
+def _anonymous():
+    remember_cookie = current_app.config.get("REMEMBER_COOKIE_NAME", "remember_token")
+    return "_user_id" not in session and "_flashes" not in session and remember_cookie not in request.cookies
+
+
+def _respond(page):
+    use_gzip = bool(request.accept_encodings["gzip"])
+    response = make_response(page.gzip_body if use_gzip else page.body)
+    response.mimetype = page.mimetype
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.set_etag(page.etag + ("-gzip" if use_gzip else ""))
+    response.last_modified = page.last_modified
+    response.cache_control.no_cache = True    # browsers revalidate, and get a 304 while unchanged
+    return response.make_conditional(request)
+
+
+def cache_page(view):
+    """Serve anonymous GETs of `view` from the page cache (place under @app.route)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not page_cache.enabled or request.method not in ("GET", "HEAD") or not _anonymous():
+            return view(*args, **kwargs)
+
+        key = (request.path, request.query_string)
+        page = page_cache.get(key)
+        if page is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough or session.modified \
+                    or response.mimetype != "text/html":
+                return response
+            page = CachedPage(response.get_data(), response.mimetype)
+            page_cache.set(key, page)
+        return _respond(page)
+    return wrapper
+
+
+def invalidate_on_commit():
+    """Clear the page cache once the current transaction commits."""
+    db.session.info["page_cache_invalidate"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_pages(db_session):
+    if db_session.info.pop("page_cache_invalidate", False):
+        page_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_pages(db_session):
+    db_session.info.pop("page_cache_invalidate", None)
+
+
+def init_app(app):
+    page_cache.init_app(app)
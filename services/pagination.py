@@ -0,0 +1,118 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# ---------------- KEYSET PAGINATION ----------------
+# Pages are addressed by an opaque cursor that holds the sort key of the last
+# row served, (sort key..., id), and not by an OFFSET. The next page is then
+# `WHERE key < :last ORDER BY key DESC LIMIT n`, which an index on the sort
+# key answers by seeking, so page 1000 costs the same as page 1. Rows
+# inserted while someone is paging don't shift later pages either.
+#
+# Cursors are urlsafe base64 JSON; datetimes survive the round trip. A cursor
+# that doesn't decode, or whose values don't have the types of the listing's
+# sort key, raises InvalidCursor (a ValueError), which the routes turn into a
+# 400.
+
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    def encode(value):
+        if isinstance(value, datetime):
+            return {"dt": value.isoformat()}
+        return value
+    raw = json.dumps([encode(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, types=None):
+    """Values of a cursor; with `types` (one Python type per value) they are checked too."""
+    def decode(value):
+        if isinstance(value, dict) and "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        return value
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list):
+            raise ValueError("not a list")
+        values = [decode(v) for v in values]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if types is not None:
+        if len(values) != len(types) or not all(
+                isinstance(v, t) and not isinstance(v, bool) for v, t in zip(values, types)):
+            raise InvalidCursor("Cursor does not match this listing")
+    return values
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return object
+
+
+def page_args(request, default=50):
+    """(cursor or None, per_page) from the query string."""
+    per_page = min(MAX_PER_PAGE, max(1, request.args.get("per_page", default, type=int)))
+    return request.args.get("cursor") or None, per_page
+
+
+def _after(columns, values, descending):
+    """WHERE clause for rows strictly after `values` in (columns) order.
+
+    Written as `k1 <= v1 AND (k1 < v1 OR (k1 = v1 AND k2 < v2) ...)` rather
+    than a row-value comparison so that every backend can seek on k1.
+    """
+    def beyond(column, value):
+        return column < value if descending else column > value
+
+    def up_to(column, value):
+        return column <= value if descending else column >= value
+
+    alternatives = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        alternatives.append(and_(*equal_prefix, beyond(column, value)))
+    return and_(up_to(columns[0], values[0]), or_(*alternatives))
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+
+def keyset_query(query, columns, cursor=None, descending=True):
+    """`query` ordered by `columns` and restricted to the rows after `cursor`."""
+    if cursor:
+        values = decode_cursor(cursor, [_python_type(c) for c in columns])
+        query = query.filter(_after(columns, values, descending))
+    return query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+
+
+def keyset_page(query, columns, cursor=None, per_page=50, descending=True):
+    """Fetch one page of `query` ordered by `columns` (the last must be unique, e.g. the id).
+
+    Returns a KeysetPage; pass its next_cursor back to get the following page.
+    """
+    rows = keyset_query(query, columns, cursor, descending).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return KeysetPage(rows, next_cursor)
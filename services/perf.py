@@ -0,0 +1,220 @@
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ---------------- SQL TRACING ----------------
+# Every statement executed while handling a request is counted and timed on
+# `g`, grouped by statement shape (the SQL with whitespace and IN-lists
+# collapsed; parameters are already bound, so literals never reach it). When
+# the request ends, the trace is folded into per-endpoint aggregates. Any shape
+# executed more than PERF_NPLUSONE_THRESHOLD times in one request is flagged
+# as an N+1. The numbers are per process and are shown on /admin/perf.
+# Requests that match no route (404 scans) share one UNMATCHED entry, so
+# made-up URLs can't grow the table.
+#
+# query_budget(n) pins a view to at most n statements. The budget is only
+# enforced when TESTING or PERF_ENFORCE_BUDGETS is set. assert_max_queries(n)
+# does the same around any block of code in scripts.
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+)\s*\)")
+_SPACE = re.compile(r"\s+")
+
+UNMATCHED = "<unmatched>"
+
+
+def statement_shape(statement):
+    shape = _SPACE.sub(" ", statement).strip()
+    return _IN_LIST.sub("(?)", shape)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.db_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > threshold]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.nplusone = Counter()     # shape -> requests where it repeated
+        self.worst_repeat = {}        # shape -> highest repeat count seen
+
+    def add(self, trace, wall_seconds, repeated):
+        self.requests += 1
+        self.queries += trace.count
+        self.max_queries = max(self.max_queries, trace.count)
+        self.db_seconds += trace.db_seconds
+        self.wall_seconds += wall_seconds
+        self.slowest_seconds = max(self.slowest_seconds, wall_seconds)
+        for shape, n in repeated:
+            self.nplusone[shape] += 1
+            self.worst_repeat[shape] = max(self.worst_repeat.get(shape, 0), n)
+
+
+class PerfStats:
+    def __init__(self, recent=50):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.recent = deque(maxlen=recent)
+        self.since = time.time()
+
+    def add(self, endpoint, trace, wall_seconds, repeated):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.add(trace, wall_seconds, repeated)
+            for shape, n in repeated:
+                self.recent.appendleft((time.time(), endpoint, shape, n))
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.recent.clear()
+            self.since = time.time()
+
+    def report(self):
+        """Rows for the admin page, worst endpoints (by DB time per request) first."""
+        with self._lock:
+            rows = []
+            for endpoint, s in self.endpoints.items():
+                rows.append({
+                    "endpoint": endpoint,
+                    "requests": s.requests,
+                    "avg_queries": s.queries / s.requests,
+                    "max_queries": s.max_queries,
+                    "avg_db_ms": s.db_seconds * 1000 / s.requests,
+                    "avg_ms": s.wall_seconds * 1000 / s.requests,
+                    "slowest_ms": s.slowest_seconds * 1000,
+                    "nplusone": [
+                        {"shape": shape, "requests": hits, "worst": s.worst_repeat[shape]}
+                        for shape, hits in s.nplusone.most_common(5)
+                    ],
+                })
+            rows.sort(key=lambda r: r["avg_db_ms"], reverse=True)
+            return rows, list(self.recent)
+
+
+perf_stats = PerfStats()
+
+
+def current_trace(create=False):
+    if not has_request_context():
+        return None
+    trace = g.get("sql_trace")
+    if trace is None and create:
+        trace = g.sql_trace = RequestTrace()
+    return trace
+
+
+# ---- engine hooks ----
+# Registered on the Engine class so every engine Flask-SQLAlchemy creates is covered.
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("perf_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("perf_started")
+    seconds = time.perf_counter() - started.pop() if started else 0.0
+    for counter in getattr(_local, "counters", ()):
+        counter.record(statement, seconds)
+    if has_request_context() and current_app.config.get("PERF_TRACING", True):
+        current_trace(create=True).record(statement, seconds)
+
+
+# ---- request hooks ----
+
+def _begin_request():
+    current_trace(create=True)
+
+
+def _end_request(response):
+    trace = current_trace()
+    if trace is None or not current_app.config.get("PERF_TRACING", True):
+        return response
+    threshold = current_app.config.get("PERF_NPLUSONE_THRESHOLD", 5)
+    repeated = trace.repeated(threshold)
+    perf_stats.add(request.endpoint or UNMATCHED, trace, time.perf_counter() - trace.started, repeated)
+    if repeated and current_app.config.get("PERF_LOG_NPLUSONE", current_app.debug):
+        for shape, n in repeated:
+            print(f"N+1 in {request.endpoint}: {n}x {shape[:200]}")
+    return response
+
+
+def init_app(app):
+    app.before_request(_begin_request)
+    app.after_request(_end_request)
+
+
+# ---- budgets ----
+
+def _budget_enforced():
+    return current_app.config.get("TESTING") or current_app.config.get("PERF_ENFORCE_BUDGETS")
+
+
+def _budget_message(label, limit, count, shapes):
+    lines = [f"{label} ran {count} queries (budget {limit}):"]
+    lines += [f"  {n}x {shape[:200]}" for shape, n in shapes.most_common(10)]
+    return "\n".join(lines)
+
+
+def query_budget(limit):
+    """Fail a view that runs more than `limit` statements (TESTING/PERF_ENFORCE_BUDGETS only)."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            result = f(*args, **kwargs)
+            trace = current_trace()
+            if trace is not None and trace.count > limit and _budget_enforced():
+                raise QueryBudgetExceeded(_budget_message(request.endpoint, limit, trace.count, trace.shapes))
+            return result
+        return decorated_function
+    return decorator
+
+
+@contextmanager
+def assert_max_queries(limit, label="block"):
+    """Count statements run in this thread inside the block; raise if there are more than `limit`."""
+    counter = RequestTrace()
+    counters = getattr(_local, "counters", None)
+    if counters is None:
+        counters = _local.counters = []
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+    if counter.count > limit:
+        raise QueryBudgetExceeded(_budget_message(label, limit, counter.count, counter.shapes))
@@ -0,0 +1,97 @@
+import json
+import queue
+import threading
+
+# ---------------- PUB/SUB BUS ----------------
+# In-process fan-out used to push battle updates to SSE connections. Every
+# subscriber gets its own bounded queue; publish() never blocks the caller and a
+# subscriber that falls behind loses its oldest messages instead of stalling the
+# submit path. Works with threaded and gevent (monkey-patched) gunicorn workers.
+#
+# The bus is per process: with several gunicorn workers each one only fans out
+# what it published itself. The battle stream (routes/ctf_battle.py) therefore
+# also re-reads the solve counts every SSE_RESYNC_SECONDS and pushes whatever
+# changed, so solves handled by other workers still reach the arena, a few
+# seconds late and without the first-blood notice. A shared backend (e.g. Redis
+# pub/sub) can be dropped in by implementing the same subscribe()/publish()
+# interface and calling set_bus() at startup.
+
+
+class Subscription:
+    def __init__(self, bus, channel, maxsize):
+        self.bus = bus
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, message):
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next message, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class LocalBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, channel, maxsize=100):
+        sub = Subscription(self, channel, maxsize)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._channels.get(sub.channel)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._channels[sub.channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subs = list(self._channels.get(channel, ()))
+        for sub in subs:
+            sub.put(message)
+        return len(subs)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._channels.get(channel, ()))
+
+
+bus = LocalBus()
+
+
+def set_bus(new_bus):
+    global bus
+    bus = new_bus
+
+
+def get_bus():
+    return bus
+
+
+def battle_channel(event_id):
+    return f"battle:{event_id}"
+
+
+def format_sse(event, data):
+    """Serialize one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,213 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request, session
+
+# ---------------- RATE LIMITING ----------------
+# Token buckets per (limit, endpoint, user), and optionally per (limit,
+# endpoint, IP). Every endpoint has its own buckets, so polling the dashboard
+# doesn't eat into the scoreboard's budget. The exception is flag_submit
+# (SHARED_LIMITS): one bucket covers all four submit endpoints, so a user
+# can't multiply the flag-guessing budget by switching URLs.
+#
+# A view opts in with @rate_limit("flag_submit"). The check runs in an
+# app-level before_request hook registered ahead of the login hooks, so a
+# rejected request is answered from the session cookie and the bucket store
+# alone. It never loads the user or opens a DB transaction.
+#
+# Limits are "<count>/<second|minute|hour>" strings per scope, overridable
+# through RATELIMITS. A bucket holds `count` tokens and refills at
+# count/period, so short bursts are allowed. The first rejection per bucket
+# in each RATELIMIT_LOG_INTERVAL is written to ctf_battle_activity through
+# the audit queue.
+#
+# IP buckets are opt-in, e.g. RATELIMITS = {"flag_submit": {"user": "20/minute",
+# "ip": "300/minute"}}. A whole classroom or office behind one NAT shares an
+# address, and behind a reverse proxy request.remote_addr is the proxy's
+# address unless TRUSTED_PROXY_COUNT is set (app.py applies ProxyFix).
+
+DEFAULT_LIMITS = {
+    "flag_submit": {"user": "20/minute"},
+    "poll": {"user": "30/minute"},
+}
+
+# limits whose buckets are shared by every endpoint that uses them
+SHARED_LIMITS = ("flag_submit",)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+def parse_limit(spec):
+    """'20/minute' -> (capacity, tokens per second)."""
+    count, _, period = spec.partition("/")
+    count = int(count)
+    return count, count / PERIODS[period.strip().rstrip("s")]
+
+
+# ---- stores ----
+
+class MemoryStore:
+    """Per-process buckets; bounded so a flood of distinct IPs can't grow it forever."""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now=None):
+        """Take one token. Returns seconds to wait (0 if allowed)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._data.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            self._data[key] = (tokens, now)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStore:
+    """Buckets shared by every worker in Redis. Needs the `redis` package."""
+
+    SCRIPT = """
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATELIMIT_STORAGE='redis://...' requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        return float(self._take(keys=[f"ratelimit:{key}"], args=[capacity, rate, now]))
+
+    def clear(self):
+        for key in self.client.scan_iter("ratelimit:*"):
+            self.client.delete(key)
+
+
+def build_store(config):
+    url = config.get("RATELIMIT_STORAGE", "memory")
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisStore(url)
+    return MemoryStore()
+
+
+# ---- limiter ----
+
+class RateLimiter:
+    def __init__(self):
+        self.store = MemoryStore()
+        self.limits = {}
+        self._logged = {}    # bucket key -> last time a rejection was logged
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.store = build_store(app.config)
+        self.limits = {}
+        for name, scopes in {**DEFAULT_LIMITS, **app.config.get("RATELIMITS", {})}.items():
+            self.limits[name] = {scope: parse_limit(spec) for scope, spec in scopes.items()}
+        app.before_request(self._check_request)
+
+    def check(self, name, endpoint, user_id, ip):
+        """Take a token from every bucket of `name` for `endpoint`. Returns (scope, key, retry_after) of the first empty one."""
+        identities = {"user": user_id, "ip": ip}
+        prefix = name if name in SHARED_LIMITS else f"{name}:{endpoint}"
+        for scope, (capacity, rate) in self.limits.get(name, {}).items():
+            identity = identities.get(scope)
+            if identity is None:
+                continue
+            key = f"{prefix}:{scope}:{identity}"
+            wait = self.store.take(key, capacity, rate)
+            if wait:
+                return scope, key, wait
+        return None
+
+    def _check_request(self):
+        if not current_app.config.get("RATELIMIT_ENABLED", True):
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        name, methods = getattr(view, "rate_limit", (None, None))
+        if name is None or (methods and request.method not in methods):
+            return None
+
+        # Flask-Login's session key: the user id without loading the user
+        user_id = session.get("_user_id")
+        rejected = self.check(name, request.endpoint, user_id, request.remote_addr)
+        if rejected is None:
+            return None
+
+        scope, key, wait = rejected
+        self._log(name, scope, key, user_id)
+        return too_many_requests(wait)
+
+    def _log(self, name, scope, key, user_id):
+        if user_id is None:
+            return
+        now = time.monotonic()
+        interval = current_app.config.get("RATELIMIT_LOG_INTERVAL", 60)
+        with self._lock:
+            if now - self._logged.get(key, -interval) < interval:
+                return
+            self._logged[key] = now
+            if len(self._logged) > 10000:
+                self._logged.clear()
+
+        from ctf_battle_models import ActivityLog
+        from services.audit import audit_writer
+        audit_writer.submit([audit_writer.build(ActivityLog, {
+            "user_id": int(user_id),
+            "action": f"RATE LIMITED: {request.method} {request.path} ({name} per {scope})",
+            "ip_address": request.remote_addr,
+            "user_agent": request.headers.get("User-Agent"),
+        })])
+
+
+def too_many_requests(wait):
+    retry_after = max(1, math.ceil(wait))
+    message = f"Too many requests. Try again in {retry_after} seconds."
+    if request.is_json or "/api/" in request.path:
+        body, mimetype = json.dumps({"success": False, "message": message, "retry_after": retry_after}), "application/json"
+    else:
+        body, mimetype = message, "text/plain"
+    return current_app.response_class(body, status=429, mimetype=mimetype, headers={"Retry-After": str(retry_after)})
+
+
+limiter = RateLimiter()
+
+
+def rate_limit(name, methods=None):
+    """Mark a view as limited by the `name` buckets (enforced before login is resolved)."""
+    def decorator(f):
+        f.rate_limit = (name, methods)
+        return f
+    return decorator
+
+
+def init_app(app):
+    limiter.init_app(app)
@@ -0,0 +1,56 @@
+from flask import g, has_app_context
+
+from extensions import db
+from models import TaskSolve
+from services.cache import TTLCache
+
+# ---------------- SOLVED-TASK SETS ----------------
+# One query loads every task id a user has solved. The frozenset is memoised
+# on `g` for the rest of the request and in a short-lived process cache shared
+# by requests. The solve paths invalidate it after commit; the TTL bounds
+# staleness across gunicorn workers.
+#
+# A cached "solved" is always trusted (solves are never undone except by
+# deleting the task). A cached "not solved" is re-checked against the DB with
+# verify=True before anything is awarded.
+
+_cache = TTLCache(maxsize=5000, ttl=30)
+
+
+def _request_sets():
+    if not has_app_context():
+        return {}
+    if "solved_tasks" not in g:
+        g.solved_tasks = {}
+    return g.solved_tasks
+
+
+def solved_task_ids(user_id):
+    per_request = _request_sets()
+    ids = per_request.get(user_id)
+    if ids is None:
+        ids = _cache.get(user_id)
+        if ids is None:
+            ids = frozenset(task_id for (task_id,) in
+                            db.session.query(TaskSolve.task_id).filter(TaskSolve.user_id == user_id))
+            _cache.set(user_id, ids)
+        per_request[user_id] = ids
+    return ids
+
+
+def is_solved(user_id, task_id, verify=False):
+    if task_id in solved_task_ids(user_id):
+        return True
+    if not verify:
+        return False
+    return db.session.query(TaskSolve.id).filter_by(user_id=user_id, task_id=task_id).first() is not None
+
+
+def invalidate(user_id=None):
+    """Drop one user's set (after a solve) or every set (after tasks are deleted)."""
+    if user_id is None:
+        _cache.clear()
+        _request_sets().clear()
+    else:
+        _cache.pop(user_id)
+        _request_sets().pop(user_id, None)
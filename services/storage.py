@@ -0,0 +1,179 @@
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import StoredFile
+
+# ---------------- CONTENT-ADDRESSED STORAGE ----------------
+# Uploads are copied to a staging file in 1 MB chunks and
+# hashed with SHA-256 as they go, and the per-kind size cap is enforced
+# during the copy. The content is stored once under its hash
+# (uploads/files/ab/abcdef....ext) and described by one stored_file row per
+# (hash, kind). A second upload of the same bytes and kind finds that row and
+# simply drops its staging copy, however large the file is. Challenge files and
+# images never share a row: the same bytes uploaded as both get one row each,
+# each with its own extension, so neither can change the other's path.
+#
+# Images (kind="image") are identified by their leading bytes, not by the
+# client's filename or Content-Type. Only PNG, JPEG, GIF and WebP are
+# accepted, and the stored extension is the one matching the content. An
+# upload named x.html or x.svg can therefore never be served from the app's
+# origin as markup.
+#
+# The backend decides where the bytes live. LocalBackend writes below the
+# static folder, so a stored path works directly with url_for('static'). Any
+# other backend needs the same small interface: staging_dir / exists / open /
+# put / delete.
+
+CHUNK_SIZE = 1024 * 1024
+
+# Upload caps per kind, in MB; override with STORAGE_MAX_MB = {"challenge": 2048, ...}
+DEFAULT_MAX_MB = {"challenge": 1024, "image": 10}
+
+# Accepted image types: leading bytes -> (extension, MIME type). WebP is matched in sniff_image().
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"GIF87a", ".gif", "image/gif"),
+    (b"GIF89a", ".gif", "image/gif"),
+)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".gif", ".webp")
+
+
+class UploadRejected(ValueError):
+    """The upload is too large or not acceptable for its kind."""
+
+
+class LocalBackend:
+    """Files under `root` (the static folder), keyed by their path relative to it."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def staging_dir(self):
+        # Same filesystem as the final location, so put() is an atomic rename
+        path = os.path.join(self.root, "uploads", ".staging")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def put(self, key, staged_path):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(staged_path, 0o644)    # mkstemp creates 0600; the web server must be able to read it
+        os.replace(staged_path, target)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def get_backend():
+    backend = current_app.extensions.get("storage_backend")
+    if backend is None:
+        name = current_app.config.get("STORAGE_BACKEND", "local")
+        if name != "local":
+            raise RuntimeError(f"Unknown STORAGE_BACKEND '{name}'")
+        backend = current_app.extensions["storage_backend"] = LocalBackend(current_app.static_folder)
+    return backend
+
+
+def max_size(kind):
+    limits = {**DEFAULT_MAX_MB, **current_app.config.get("STORAGE_MAX_MB", {})}
+    return int(limits.get(kind, DEFAULT_MAX_MB["challenge"]) * 1024 * 1024)
+
+
+def _extension(filename):
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if re.fullmatch(r"\.[a-z0-9]{1,10}", ext) else ""
+
+
+def sniff_image(stream):
+    """(extension, MIME type) of an accepted image format from the stream's first bytes, or None."""
+    head = stream.read(12)
+    stream.seek(0)
+    for signature, ext, mime_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext, mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    return None
+
+
+def _stage(stream, backend, limit):
+    """Copy `stream` to a staging file while hashing. Returns (staged path, sha256 hex, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, staged = tempfile.mkstemp(dir=backend.staging_dir())
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadRejected(f"File is larger than {limit // (1024 * 1024)} MB")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(staged)
+        raise
+    return staged, digest.hexdigest(), size
+
+
+def save_upload(file, kind="challenge", mime_type=None, image_type=None):
+    """Store a werkzeug FileStorage and return its StoredFile (existing one if the content is known).
+
+    For images, `image_type` is the (extension, MIME type) a decoder already
+    established (services/images.py); without it the leading bytes decide.
+    The row is added to the current session inside a savepoint; the caller commits.
+    """
+    if kind == "image":
+        sniffed = image_type or sniff_image(file.stream)
+        if sniffed is None or sniffed[0] not in IMAGE_EXTENSIONS:
+            raise UploadRejected("Only PNG, JPEG, GIF or WebP images are accepted")
+        ext, mime_type = sniffed
+    else:
+        ext = _extension(file.filename)
+        mime_type = mime_type or mimetypes.guess_type(file.filename or "")[0] \
+            or file.mimetype or "application/octet-stream"
+
+    backend = get_backend()
+    staged, sha256, size = _stage(file.stream, backend, max_size(kind))
+
+    stored = StoredFile.query.filter_by(sha256=sha256, kind=kind).first()
+    if stored is not None and backend.exists(stored.path):
+        os.remove(staged)
+        return stored
+
+    key = stored.path if stored is not None else f"uploads/files/{sha256[:2]}/{sha256}{ext}"
+    backend.put(key, staged)
+    if stored is not None:
+        return stored    # row existed but the file had gone missing; it is restored now
+
+    stored = StoredFile(sha256=sha256, kind=kind, size=size, mime_type=mime_type[:100], path=key,
+                        original_name=(file.filename or "")[:255])
+    try:
+        with db.session.begin_nested():
+            db.session.add(stored)
+    except IntegrityError:
+        # Same content uploaded concurrently; both wrote identical bytes to the same key
+        stored = StoredFile.query.filter_by(sha256=sha256, kind=kind).one()
+    return stored
@@ -0,0 +1,150 @@
+import os
+
+from flask import g, has_app_context
+from flask_login import UserMixin, user_logged_in, user_logged_out
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User
+from services.cache import TTLCache, StampFile
+from services.counters import counter_buffer
+
+# ---------------- AUTHENTICATED USER CACHE ----------------
+# Flask-Login calls the user loader on every request that touches
+# current_user: console pages, every dashboard poll, every flag submit.
+# Instead of loading the whole (wide) User row each time, the loader returns
+# a Principal, a read-only object with the few fields that navigation,
+# permission checks and the XP displays need. It is built from one narrow
+# query and kept in a TTL/LRU cache, so a warm request does no user query at
+# all. That includes the profile fields the console layout renders on every
+# page. Any other attribute loads the full row once per request (kept on `g`,
+# since the session's identity map only holds it weakly). Code that changes
+# the user works on `current_user.row`.
+#
+# Invalidation:
+#   - profile edits and admin changes call invalidate_on_commit(), which drops
+#     the entry after commit and touches instance/user_cache.stamp so every
+#     worker (and promote_admin.py, a separate process) clears its cache
+#   - XP written back by the counter buffer drops those users locally; until
+#     then Principal.xp plus the pending delta (counters.value) is exact
+#   - logging in or out drops the user locally
+# USER_CACHE_TTL bounds anything else, e.g. XP flushed by another worker.
+
+PRINCIPAL_FIELDS = ("id", "username", "is_admin", "xp",
+                    "avatar_type", "avatar_filename", "profile_image", "avatar_variants",
+                    "email", "mobile", "mobile_number", "bio",
+                    "linkedin_url", "github_url", "discord_handle")
+
+
+class Principal(UserMixin):
+    """Read-only stand-in for the logged-in User; other attributes come from the full row."""
+
+    def __init__(self, values):
+        object.__setattr__(self, "_values", values)
+
+    def __getattr__(self, name):
+        values = object.__getattribute__(self, "_values")
+        if name in values:
+            return values[name]
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.row, name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"current_user is read-only; set '{name}' on current_user.row")
+
+    @property
+    def row(self):
+        """The full User row, loaded at most once per request."""
+        user_id = self._values["id"]
+        if not has_app_context():
+            return db.session.get(User, user_id)
+        rows = g.setdefault("_user_rows", {})
+        if user_id not in rows:
+            rows[user_id] = db.session.get(User, user_id)
+        return rows[user_id]
+
+    def __repr__(self):
+        return f"<Principal {self._values['id']} {self._values['username']}>"
+
+
+class UserCache:
+    def __init__(self):
+        self._principals = TTLCache(maxsize=10000, ttl=60)
+        self._stamp = None
+
+    def init_app(self, app):
+        self._principals = TTLCache(maxsize=app.config.get("USER_CACHE_SIZE", 10000),
+                                    ttl=app.config.get("USER_CACHE_TTL", 60))
+        self._stamp = StampFile(os.path.join(app.instance_path, "user_cache.stamp"))
+        counter_buffer.add_listener(self._counters_written)
+        user_logged_in.connect(self._logged_in_or_out, app)
+        user_logged_out.connect(self._logged_in_or_out, app)
+
+    def load(self, user_id):
+        if self._stamp is not None and self._stamp.changed():
+            self._principals.clear()
+        principal = self._principals.get(user_id)
+        if principal is None:
+            columns = [getattr(User, name) for name in PRINCIPAL_FIELDS]
+            row = db.session.query(*columns).filter(User.id == user_id).first()
+            if row is None:
+                return None
+            principal = Principal(dict(row._mapping))
+            self._principals.set(user_id, principal)
+        return principal
+
+    def invalidate(self, user_id=None, everywhere=True):
+        """Drop one user (or everyone) here and, with `everywhere`, in every other process too."""
+        if user_id is None:
+            self._principals.clear()
+        else:
+            self._principals.pop(user_id)
+        if everywhere:
+            self.broadcast()
+
+    def broadcast(self):
+        """Make every process drop its cached principals."""
+        if self._stamp is not None:
+            self._stamp.touch()
+
+    def _counters_written(self, keys):
+        for table, column, row_id in keys:
+            if table == User.__tablename__ and column == "xp":
+                self.invalidate(row_id, everywhere=False)
+
+    def _logged_in_or_out(self, sender, user=None, **extra):
+        if user is not None and user.get_id() is not None:
+            self.invalidate(int(user.get_id()), everywhere=False)
+
+
+user_cache = UserCache()
+
+
+def load_user(user_id):
+    """Flask-Login user_loader."""
+    return user_cache.load(int(user_id))
+
+
+def invalidate_on_commit(user_id=None):
+    """Refresh `user_id` (everyone if None) in every worker once the current transaction commits."""
+    db.session.info.setdefault("user_cache_invalidate", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users(db_session):
+    user_ids = db_session.info.pop("user_cache_invalidate", None)
+    if user_ids:
+        for user_id in user_ids:
+            user_cache.invalidate(user_id, everywhere=False)
+        user_cache.broadcast()
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_users(db_session):
+    db_session.info.pop("user_cache_invalidate", None)
+
+
+def init_app(app):
+    user_cache.init_app(app)
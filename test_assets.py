@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from services import assets
+
+
+@pytest.fixture
+def dist(app, tmp_path, monkeypatch):
+    """A hand-written static/dist with br and gzip variants of one stylesheet."""
+    folder = tmp_path / "dist" / "css"
+    folder.mkdir(parents=True)
+    (folder / "style.abc123.css").write_bytes(b"body{color:red}")
+    (folder / "style.abc123.css.br").write_bytes(b"BR")
+    (folder / "style.abc123.css.gz").write_bytes(b"GZ")
+    (folder / "logo.def456.png").write_bytes(b"PNG")
+    entries = {
+        "css/style.css": {"path": "css/style.abc123.css", "etag": "abc123", "encodings": ["br", "gzip"]},
+        "css/logo.png": {"path": "css/logo.def456.png", "etag": "def456", "encodings": []},
+    }
+    (tmp_path / "dist" / assets.MANIFEST).write_text(json.dumps(entries))
+
+    monkeypatch.setattr(assets, "manifest", assets.AssetManifest())
+    assets.manifest.load(str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("accept, encoding, body", [
+    ("br, gzip", "br", b"BR"),
+    ("gzip, deflate", "gzip", b"GZ"),
+    ("br;q=0, gzip", "gzip", b"GZ"),
+    ("", None, b"body{color:red}"),
+    ("identity", None, b"body{color:red}"),
+])
+def test_serve_asset_picks_the_best_accepted_encoding(client, dist, accept, encoding, body):
+    response = client.get("/assets/css/style.abc123.css", headers={"Accept-Encoding": accept})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == encoding
+    assert response.data == body
+    assert response.mimetype == "text/css"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_serve_asset_etag_differs_per_encoding_and_revalidates(client, dist):
+    br = client.get("/assets/css/style.abc123.css", headers={"Accept-Encoding": "br"})
+    plain = client.get("/assets/css/style.abc123.css")
+    assert br.headers["ETag"] != plain.headers["ETag"]
+
+    again = client.get("/assets/css/style.abc123.css",
+                       headers={"Accept-Encoding": "br", "If-None-Match": br.headers["ETag"]})
+    assert again.status_code == 304
+    assert "Content-Encoding" not in again.headers
+
+
+def test_serve_asset_ignores_encoding_for_uncompressed_files(client, dist):
+    response = client.get("/assets/css/logo.def456.png", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers.get("Content-Encoding") is None
+    assert response.data == b"PNG"
+
+
+def test_serve_asset_only_serves_manifest_entries(client, dist):
+    assert client.get("/assets/css/style.abc123.css.br").status_code == 404
+    assert client.get("/assets/manifest.json").status_code == 404
+
+
+def test_asset_url_uses_the_hashed_name(app, dist):
+    with app.test_request_context():
+        assert assets.asset_url("css/style.css") == "/assets/css/style.abc123.css"
+        assert assets.asset_url("css/missing.css") == "/static/css/missing.css"
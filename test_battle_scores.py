@@ -0,0 +1,56 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import battle_scores
+
+
+@pytest.fixture
+def event(db):
+    from ctf_battle_models import CTFEvent
+
+    now = datetime.utcnow()
+    event = CTFEvent(name="Battle", start_time=now, end_time=now + timedelta(hours=2))
+    db.session.add(event)
+    db.session.commit()
+    return event
+
+
+def ranks(db, event_id):
+    from ctf_battle_models import BattleScore
+
+    return {row.user_id: row.rank for row in BattleScore.query.filter_by(event_id=event_id)}
+
+
+def expected_ranks(totals):
+    order = sorted(totals, key=lambda user_id: (-totals[user_id][0], totals[user_id][1], user_id))
+    return {user_id: rank for rank, user_id in enumerate(order, start=1)}
+
+
+def test_zero_point_solve_moves_the_user_below_its_ties(db, event, make_user):
+    users = [make_user(f"u{i}").id for i in range(3)]
+    start = datetime(2026, 1, 1)
+    for i, user_id in enumerate(users):
+        battle_scores.apply_solve(event.id, user_id, 100, start + timedelta(minutes=i))
+    db.session.commit()
+    assert ranks(db, event.id) == {users[0]: 1, users[1]: 2, users[2]: 3}
+
+    battle_scores.apply_solve(event.id, users[0], 0, start + timedelta(minutes=10))
+    db.session.commit()
+    assert ranks(db, event.id) == {users[1]: 1, users[2]: 2, users[0]: 3}
+
+
+def test_ranks_match_a_full_sort_after_every_solve(db, event, make_user):
+    rng = random.Random(6)
+    users = [make_user(f"u{i}").id for i in range(8)]
+    totals = {}
+    solved_at = datetime(2026, 1, 1)
+    for _ in range(60):
+        user_id = rng.choice(users)
+        points = rng.choice([0, 0, 50, 100])
+        solved_at += timedelta(seconds=rng.choice([0, 1, 30]))    # equal timestamps exercise the user_id tie-break
+        battle_scores.apply_solve(event.id, user_id, points, solved_at)
+        db.session.commit()
+        totals[user_id] = ((totals.get(user_id) or (0, None))[0] + points, solved_at)
+        assert ranks(db, event.id) == expected_ranks(totals)
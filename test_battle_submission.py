@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.battle_arena import arena_cache
+from services.battle_submission import submit_flag
+from services.pubsub import get_bus, battle_channel
+
+
+@pytest.fixture
+def challenge(db):
+    from ctf_battle_models import CTFEvent, CTFCategory, CTFChallenge
+
+    now = datetime.utcnow()
+    event = CTFEvent(name="Battle", start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1),
+                     status="Live")
+    db.session.add(event)
+    db.session.flush()
+    category = CTFCategory(event_id=event.id, name="Web")
+    db.session.add(category)
+    db.session.flush()
+    challenge = CTFChallenge(category_id=category.id, title="Login Bypass", flag="CT8{sqli}", points=100)
+    db.session.add(challenge)
+    db.session.commit()
+    arena_cache.invalidate(event.id)
+    return challenge
+
+
+@pytest.fixture
+def stream(challenge):
+    sub = get_bus().subscribe(battle_channel(challenge.category_rel.event_id))
+    yield sub
+    sub.close()
+
+
+def solve_messages(sub):
+    messages = []
+    while (message := sub.get(timeout=0)) is not None:
+        if message["type"] == "solve":
+            messages.append(message)
+    return messages
+
+
+def test_first_solve_is_first_blood(challenge, stream, make_user):
+    user = make_user()
+    assert submit_flag(user.id, challenge.id, "CT8{sqli}").is_correct
+    assert [m["first_blood"] for m in solve_messages(stream)] == [True]
+
+
+def test_first_blood_ignores_this_workers_stale_counts(db, challenge, stream, make_user):
+    from ctf_battle_models import CTFEventSolve
+
+    event_id = challenge.category_rel.event_id
+    arena_cache.solve_counts(event_id)    # this worker caches "no solves yet"
+    first, second = make_user("first"), make_user("second")
+    # the first solve lands on another worker
+    db.session.add(CTFEventSolve(event_id=event_id, challenge_id=challenge.id, user_id=first.id, points=100))
+    db.session.commit()
+
+    assert submit_flag(second.id, challenge.id, "CT8{sqli}").is_correct
+    assert [m["first_blood"] for m in solve_messages(stream)] == [False]
+
+
+def test_wrong_flag_publishes_nothing(challenge, stream, make_user):
+    user = make_user()
+    assert not submit_flag(user.id, challenge.id, "CT8{nope}").is_correct
+    assert solve_messages(stream) == []
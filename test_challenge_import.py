@@ -0,0 +1,137 @@
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.challenge_import import PackError, import_pack, iter_items
+
+
+PACK = [
+    {"category": "Web", "challenges": [
+        {"title": "Login Bypass", "flag": "CT8{sqli}", "points": 100},
+        {"title": "Cookie Jar", "flag": "CT8{cookie}", "points": 150, "files": ["a.txt", "b.txt"]},
+    ]},
+    {"category": "Crypto", "challenges": [{"title": "Rot", "flag": "CT8{rot13}"}]},
+]
+
+
+def items(data, **kwargs):
+    return list(iter_items(io.BytesIO(data), **kwargs))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_iter_items_matches_json_loads_at_any_chunk_size(chunk_size):
+    data = json.dumps(PACK, indent=2).encode()
+    assert items(data, chunk_size=chunk_size) == PACK
+
+
+def test_iter_items_reads_json_lines_text_and_bom():
+    lines = "\n".join(json.dumps(item) for item in PACK)
+    assert list(iter_items(io.StringIO(lines))) == PACK
+    assert items(b"\xef\xbb\xbf" + json.dumps(PACK).encode(), chunk_size=3) == PACK
+
+
+def test_iter_items_does_not_split_numbers_across_chunks():
+    assert items(b"[12345, 678]", chunk_size=2) == [12345, 678]
+
+
+def test_iter_items_keeps_multibyte_characters_whole():
+    data = json.dumps([{"title": "Ünïcødé ✓"}], ensure_ascii=False).encode()
+    assert items(data, chunk_size=1) == [{"title": "Ünïcødé ✓"}]
+
+
+@pytest.mark.parametrize("data, message", [
+    (b'[{"category": "Web"}', "not closed"),
+    (b'[{"category": "Web"}] {}', "after the closing"),
+    (b'[{"category": }]', "Invalid JSON"),
+])
+def test_iter_items_reports_broken_packs(data, message):
+    with pytest.raises(PackError, match=message):
+        items(data, chunk_size=4)
+
+
+# ---- validation ----
+
+@pytest.fixture
+def event(db):
+    from ctf_battle_models import CTFEvent
+
+    now = datetime.utcnow()
+    event = CTFEvent(name="Import Test", start_time=now, end_time=now + timedelta(hours=2))
+    db.session.add(event)
+    db.session.commit()
+    return event
+
+
+def pack(data):
+    return io.BytesIO(json.dumps(data).encode())
+
+
+def test_import_pack_writes_categories_and_challenges(db, event):
+    from ctf_battle_models import CTFCategory, CTFChallenge
+
+    report = import_pack(event.id, pack(PACK))
+    assert report.ok, report.errors
+    assert (report.categories_created, report.challenges_created) == (2, 3)
+    assert {c.name for c in CTFCategory.query.filter_by(event_id=event.id)} == {"Web", "Crypto"}
+    assert CTFChallenge.query.filter_by(title="Cookie Jar").one().files == "a.txt,b.txt"
+
+
+def test_import_pack_collects_every_error_and_writes_nothing(db, event):
+    from ctf_battle_models import CTFChallenge
+
+    report = import_pack(event.id, pack([
+        {"category": "Web", "challenges": [
+            {"title": "", "flag": "x"},
+            {"title": "Ok", "flag": "x", "points": -5},
+            {"title": "Twice", "flag": "x"},
+            {"title": "Twice", "flag": "y"},
+            {"title": "Long", "flag": "x" * 300},
+        ]},
+        {"challenges": []},
+        "not an object",
+    ]))
+    assert not report.ok
+    messages = "\n".join(report.errors)
+    for expected in ("'title' is required", "'points' must be a non-negative integer",
+                     "duplicate title 'Twice'", "'flag' is longer than 255", "'category' is required",
+                     "item 3: must be an object"):
+        assert expected in messages
+    assert CTFChallenge.query.count() == 0
+
+
+def test_import_pack_insert_rejects_existing_titles_and_upsert_updates_them(db, event):
+    from ctf_battle_models import CTFChallenge
+
+    assert import_pack(event.id, pack(PACK)).ok
+    edited = [{"category": "Crypto", "challenges": [{"title": "Rot", "flag": "CT8{rot47}", "points": 300}]}]
+
+    report = import_pack(event.id, pack(edited))
+    assert not report.ok and "already exists in Crypto" in report.errors[0]
+
+    report = import_pack(event.id, pack(edited), mode="upsert")
+    assert report.ok and report.challenges_updated == 1
+    rot = CTFChallenge.query.filter_by(title="Rot").one()
+    assert (rot.flag, rot.points) == ("CT8{rot47}", 300)
+
+
+def test_upsert_only_sets_the_fields_a_record_contains(db, event):
+    from ctf_battle_models import CTFChallenge
+
+    assert import_pack(event.id, pack(PACK)).ok
+    partial = [{"category": "Web", "challenges": [
+        {"title": "Cookie Jar", "flag": "CT8{cookie2}"},
+        {"title": "Login Bypass", "flag": "CT8{sqli}", "points": 120, "hint": "quotes"},
+    ]}]
+    report = import_pack(event.id, pack(partial), mode="upsert")
+    assert report.ok and report.challenges_updated == 2
+
+    cookie = CTFChallenge.query.filter_by(title="Cookie Jar").one()
+    assert (cookie.flag, cookie.points, cookie.files) == ("CT8{cookie2}", 150, "a.txt,b.txt")
+    login = CTFChallenge.query.filter_by(title="Login Bypass").one()
+    assert (login.points, login.hint) == (120, "quotes")
+
+
+def test_import_pack_rejects_unknown_mode(db, event):
+    assert not import_pack(event.id, pack(PACK), mode="replace").ok
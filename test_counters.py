@@ -0,0 +1,54 @@
+import threading
+
+from sqlalchemy import event
+
+from services import counters
+from services.counters import counter_buffer
+
+
+def test_flush_waits_for_a_running_flush_instead_of_skipping(app, db, make_user, monkeypatch):
+    from models import User
+
+    user = make_user()
+    monkeypatch.setattr(counter_buffer, "interval", 0)    # no background thread: add() flushes inline
+    first_write_started, release_first_write = threading.Event(), threading.Event()
+
+    def slow_update(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE user") and not first_write_started.is_set():
+            first_write_started.set()
+            release_first_write.wait(5)
+    event.listen(db.engine, "before_cursor_execute", slow_update)
+
+    def add_from_request():
+        with app.app_context():
+            counter_buffer.add([(User.__tablename__, "xp", user.id, 10)])
+
+    try:
+        first = threading.Thread(target=add_from_request)
+        first.start()
+        assert first_write_started.wait(5)
+        second = threading.Thread(target=add_from_request)    # lands while the first batch is being written
+        second.start()
+        second.join(0.2)
+        release_first_write.set()
+        first.join(5)
+        second.join(5)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", slow_update)
+
+    assert counter_buffer.pending(User.__tablename__, "xp", user.id) == 0
+    db.session.expire_all()
+    assert db.session.get(User, user.id).xp == 20
+
+
+def test_value_includes_pending_deltas(db, make_user, monkeypatch):
+    from models import User
+
+    user = make_user()
+    monkeypatch.setattr(counter_buffer, "_pending", {})
+    monkeypatch.setattr(counter_buffer, "flush", lambda: 0)    # keep the delta buffered
+    monkeypatch.setattr(counter_buffer, "interval", 0)
+    counters.incr_row(User.__table__, user.id, "xp", 25)
+    db.session.commit()
+    assert counters.value(user, "xp") == 25
+    assert counters.value_of(User.__table__, user.id, "xp", user.xp) == 25
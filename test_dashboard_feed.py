@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import dashboard_feed
+from services.pagination import InvalidCursor, encode_cursor
+
+START = datetime(2026, 5, 1, 9, 0)
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+def add_activities(db, user, *actions, start=START):
+    from models import Activity
+
+    rows = [Activity(user_id=user.id, action=action, type="solve", created_at=start + timedelta(minutes=i))
+            for i, action in enumerate(actions)]
+    db.session.add_all(rows)
+    dashboard_feed.bump_on_commit(user.id)
+    db.session.commit()
+    return rows
+
+
+def actions(payload):
+    return [item["action"] for item in payload["activities"]]
+
+
+def test_first_poll_gets_the_full_feed_newest_first(db, user):
+    add_activities(db, user, "one", "two", "three")
+    payload, _ = dashboard_feed.activity_payload(user.id)
+    assert actions(payload) == ["three", "two", "one"]
+    assert payload["full"] is True
+    assert payload["cursor"]
+
+
+def test_poll_with_the_current_cursor_gets_nothing_and_the_same_etag(db, user):
+    add_activities(db, user, "one", "two")
+    first, _ = dashboard_feed.activity_payload(user.id)
+    payload, etag = dashboard_feed.activity_payload(user.id, since=first["cursor"])
+    again, etag_again = dashboard_feed.activity_payload(user.id, since=first["cursor"])
+    assert actions(payload) == [] and payload["full"] is False
+    assert payload["cursor"] == first["cursor"]
+    assert etag == etag_again
+
+
+def test_poll_gets_only_the_rows_after_its_cursor(db, user):
+    add_activities(db, user, "one", "two")
+    first, _ = dashboard_feed.activity_payload(user.id)
+    add_activities(db, user, "three", "four", start=START + timedelta(hours=1))
+
+    payload, _ = dashboard_feed.activity_payload(user.id, since=first["cursor"])
+    assert actions(payload) == ["four", "three"]
+    assert payload["full"] is False
+    assert payload["cursor"] != first["cursor"]
+
+
+def test_cursor_outside_the_window_gets_the_full_feed(db, user):
+    add_activities(db, user, "one", "two")
+    stale = encode_cursor([START - timedelta(days=1), 999])
+    payload, _ = dashboard_feed.activity_payload(user.id, since=stale)
+    assert payload["full"] is True
+    assert actions(payload) == ["two", "one"]
+
+
+def test_feed_is_memoised_until_the_user_is_bumped(db, user):
+    from models import Activity
+
+    add_activities(db, user, "one")
+    dashboard_feed.activity_payload(user.id)
+    db.session.add(Activity(user_id=user.id, action="two", created_at=START + timedelta(hours=1)))
+    db.session.commit()    # written without a bump
+    assert actions(dashboard_feed.activity_payload(user.id)[0]) == ["one"]
+
+    dashboard_feed._activity_written(Activity, [{"user_id": user.id}])    # what the audit writer reports
+    assert actions(dashboard_feed.activity_payload(user.id)[0]) == ["two", "one"]
+
+
+def test_rolled_back_bumps_are_discarded(db, user):
+    before = dashboard_feed.versions.get(user.id)
+    dashboard_feed.bump_on_commit(user.id)
+    db.session.rollback()
+    assert dashboard_feed.versions.get(user.id) == before
+
+
+def test_malformed_since_is_rejected(db, user):
+    with pytest.raises(InvalidCursor):
+        dashboard_feed.activity_payload(user.id, since=encode_cursor(["yesterday", 1]))
+
+
+def test_activity_endpoint_answers_unchanged_polls_with_304(client, db, user):
+    add_activities(db, user, "one")
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+
+    first = client.get("/api/dashboard/activity")
+    assert first.status_code == 200
+    cursor = first.get_json()["cursor"]
+
+    delta = client.get(f"/api/dashboard/activity?since={cursor}")
+    assert delta.get_json()["activities"] == []
+    repeat = client.get(f"/api/dashboard/activity?since={cursor}",
+                        headers={"If-None-Match": delta.headers["ETag"]})
+    assert repeat.status_code == 304
+
+    assert client.get("/api/dashboard/activity?since=garbage").status_code == 400
@@ -0,0 +1,42 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from services.exports import PLATFORM_EXPORTS, iter_csv, iter_jsonl_gz
+
+
+@pytest.fixture
+def orphans(db, make_user):
+    """One solve and one submission by a live user, and one each whose user was deleted."""
+    from models import CTFTask, TaskSolve, TaskSubmission
+
+    user = make_user("alice")
+    task = CTFTask(title="Warmup", category="Web", flag="CT8{x}", points=50, level="Easy")
+    db.session.add(task)
+    db.session.flush()
+    db.session.add_all([
+        TaskSolve(user_id=user.id, task_id=task.id),
+        TaskSolve(user_id=999, task_id=task.id),
+        TaskSubmission(user_id=user.id, task_id=task.id, submitted_flag="CT8{x}", is_correct=True),
+        TaskSubmission(user_id=999, task_id=task.id, submitted_flag="guess", is_correct=False),
+    ])
+    db.session.commit()
+
+
+@pytest.mark.parametrize("name", ["solves", "submissions"])
+def test_platform_exports_keep_rows_of_deleted_users(orphans, name):
+    spec = PLATFORM_EXPORTS[name]
+    rows = list(csv.DictReader(io.StringIO("".join(iter_csv(spec.columns, spec.query())))))
+    assert [(row["user_id"], row["username"]) for row in rows] == [("1", "alice"), ("999", "")]
+    assert {row["task"] for row in rows} == {"Warmup"}
+
+
+def test_jsonl_export_matches_the_csv_columns(orphans):
+    spec = PLATFORM_EXPORTS["solves"]
+    lines = gzip.decompress(b"".join(iter_jsonl_gz(spec.columns, spec.query()))).decode().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [list(record) for record in records] == [spec.columns, spec.columns]
+    assert records[1]["username"] is None
@@ -0,0 +1,75 @@
+import pytest
+
+from services.page_cache import cache_page, page_cache, _anonymous
+
+
+@pytest.fixture
+def cached_view(app):
+    page_cache.invalidate()
+    calls = []
+
+    @cache_page
+    def view():
+        calls.append(1)
+        return f"<p>render {len(calls)}</p>"
+    view.calls = calls
+    return view
+
+
+def test_anonymous_request(app):
+    with app.test_request_context("/about"):
+        assert _anonymous()
+
+
+@pytest.mark.parametrize("key, value", [("_user_id", "1"), ("_flashes", [("message", "Saved")])])
+def test_logged_in_or_flashed_requests_are_not_anonymous(app, key, value):
+    from flask import session
+
+    with app.test_request_context("/about"):
+        session[key] = value
+        assert not _anonymous()
+
+
+def test_remember_cookie_is_not_anonymous(app):
+    with app.test_request_context("/about", headers={"Cookie": "remember_token=1|abc"}):
+        assert not _anonymous()
+
+
+def test_anonymous_hits_are_served_from_memory(app, cached_view):
+    for _ in range(3):
+        with app.test_request_context("/cached-page"):
+            response = cached_view()
+    assert len(cached_view.calls) == 1
+    assert response.status_code == 200
+    assert b"render 1" in response.get_data()
+
+
+def test_logged_in_users_always_get_a_fresh_render(app, cached_view):
+    from flask import session
+
+    with app.test_request_context("/cached-page"):
+        cached_view()
+    for _ in range(2):
+        with app.test_request_context("/cached-page"):
+            session["_user_id"] = "1"
+            body = cached_view()
+    assert len(cached_view.calls) == 3
+    assert body == "<p>render 3</p>"
+
+
+def test_cached_page_is_gzipped_and_revalidated(app, cached_view):
+    with app.test_request_context("/cached-page", headers={"Accept-Encoding": "gzip"}):
+        first = cached_view()
+    assert first.headers["Content-Encoding"] == "gzip"
+    with app.test_request_context("/cached-page", headers={"Accept-Encoding": "gzip",
+                                                           "If-None-Match": first.headers["ETag"]}):
+        assert cached_view().status_code == 304
+
+
+def test_invalidate_drops_cached_pages(app, cached_view):
+    with app.test_request_context("/cached-page"):
+        cached_view()
+    page_cache.invalidate()
+    with app.test_request_context("/cached-page"):
+        cached_view()
+    assert len(cached_view.calls) == 2
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.pagination import (
+    InvalidCursor, decode_cursor, encode_cursor, keyset_page, _after,
+)
+
+
+def test_cursor_round_trips_datetimes_and_ints():
+    values = [datetime(2026, 3, 1, 12, 30, 5, 123456), 42]
+    assert decode_cursor(encode_cursor(values)) == values
+    assert decode_cursor(encode_cursor(values), (datetime, int)) == values
+
+
+@pytest.mark.parametrize("token", [
+    "",              # empty
+    "not base64!",
+    "e30",           # {} -- valid JSON, but not a list
+])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+@pytest.mark.parametrize("values", [
+    ["12", 3],       # string where an int belongs
+    [True, 3],       # bools are ints to isinstance, but not to the sort key
+    [1],             # too short
+    [1, 2, 3],       # too long
+])
+def test_cursor_of_wrong_types_is_rejected(values):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor(values), (int, int))
+
+
+def test_invalid_cursor_is_a_value_error():
+    assert issubclass(InvalidCursor, ValueError)
+
+
+def test_after_sql_seeks_on_the_leading_column(db):
+    from models import Activity
+
+    clause = _after([Activity.created_at, Activity.id], [datetime(2026, 1, 1), 5], descending=True)
+    sql = str(clause.compile(compile_kwargs={"literal_binds": True}))
+    assert sql.startswith("activity.created_at <=")
+    assert "activity.id < 5" in sql
+
+
+def test_keyset_pages_cover_every_row_once(db, make_user):
+    from models import Activity
+
+    user = make_user()
+    start = datetime(2026, 1, 1)
+    # several rows share a timestamp, so the id has to break the ties
+    db.session.add_all([
+        Activity(user_id=user.id, action=f"a{i}", type="solve", created_at=start + timedelta(minutes=i // 3))
+        for i in range(20)
+    ])
+    db.session.commit()
+
+    columns = [Activity.created_at, Activity.id]
+    expected = [a.id for a in Activity.query.order_by(Activity.created_at.desc(), Activity.id.desc())]
+
+    seen, cursor = [], None
+    while True:
+        page = keyset_page(Activity.query, columns, cursor=cursor, per_page=7)
+        seen.extend(a.id for a in page.items)
+        if not page.has_more:
+            break
+        cursor = page.next_cursor
+    assert seen == expected
+
+
+def test_keyset_page_ascending(db, make_user):
+    from models import Activity
+
+    user = make_user()
+    db.session.add_all([Activity(user_id=user.id, action=f"a{i}", created_at=datetime(2026, 1, 1))
+                        for i in range(5)])
+    db.session.commit()
+
+    first = keyset_page(Activity.query, [Activity.created_at, Activity.id], per_page=2, descending=False)
+    second = keyset_page(Activity.query, [Activity.created_at, Activity.id], cursor=first.next_cursor,
+                         per_page=2, descending=False)
+    assert [a.action for a in first.items + second.items] == ["a0", "a1", "a2", "a3"]
+
+
+def test_keyset_page_rejects_a_cursor_of_another_listing(db):
+    from models import Activity
+
+    with pytest.raises(InvalidCursor):
+        keyset_page(Activity.query, [Activity.created_at, Activity.id], cursor=encode_cursor([1, 2]))
@@ -0,0 +1,16 @@
+from services.perf import UNMATCHED, perf_stats
+
+
+def test_unmatched_requests_share_one_entry(client):
+    perf_stats.reset()
+    for n in range(5):
+        client.get(f"/no-such-page-{n}")
+    assert list(perf_stats.endpoints) == [UNMATCHED]
+    assert perf_stats.endpoints[UNMATCHED].requests == 5
+
+
+def test_matched_requests_are_keyed_by_endpoint(client):
+    perf_stats.reset()
+    client.get("/about")
+    client.get("/about?ref=1")
+    assert list(perf_stats.endpoints) == ["about"]
@@ -0,0 +1,94 @@
+import pytest
+
+from services.ratelimit import MemoryStore, RateLimiter, parse_limit
+
+
+def test_parse_limit():
+    assert parse_limit("20/minute") == (20, 20 / 60)
+    assert parse_limit("5/seconds") == (5, 5)
+    assert parse_limit("3600 / hour") == (3600, 1)
+
+
+def test_bucket_allows_a_burst_then_waits_for_a_refill():
+    store = MemoryStore()
+    capacity, rate = 3, 1.0    # 3 tokens, one back per second
+    assert [store.take("k", capacity, rate, now=100) for _ in range(3)] == [0, 0, 0]
+    assert store.take("k", capacity, rate, now=100) == pytest.approx(1.0)
+    assert store.take("k", capacity, rate, now=100.5) == pytest.approx(0.5)
+    assert store.take("k", capacity, rate, now=101) == 0
+
+
+def test_bucket_refill_is_capped_at_capacity():
+    store = MemoryStore()
+    store.take("k", 2, 1.0, now=0)
+    # an hour idle still only buys `capacity` requests
+    assert [store.take("k", 2, 1.0, now=3600) for _ in range(3)][-1] > 0
+
+
+def test_buckets_are_independent():
+    store = MemoryStore()
+    assert store.take("a", 1, 0.1, now=0) == 0
+    assert store.take("a", 1, 0.1, now=0) > 0
+    assert store.take("b", 1, 0.1, now=0) == 0
+
+
+def test_store_is_bounded():
+    store = MemoryStore(maxsize=2)
+    for key in ("a", "b", "c"):
+        store.take(key, 1, 1.0, now=0)
+    assert list(store._data) == ["b", "c"]
+
+
+@pytest.fixture
+def limiter():
+    limiter = RateLimiter()
+    limiter.limits = {
+        "flag_submit": {"user": parse_limit("2/minute"), "ip": parse_limit("3/minute")},
+        "poll": {"user": parse_limit("1/minute")},
+    }
+    return limiter
+
+
+def test_poll_buckets_are_per_endpoint_and_user(limiter):
+    assert limiter.check("poll", "participant.api_dashboard_stats", 1, "10.0.0.1") is None
+    scope, key, wait = limiter.check("poll", "participant.api_dashboard_stats", 1, "10.0.0.1")
+    assert (scope, key) == ("user", "poll:participant.api_dashboard_stats:user:1")
+    assert wait > 0
+    # another endpoint, or another user, has its own bucket
+    assert limiter.check("poll", "participant.api_dashboard_activity", 1, "10.0.0.1") is None
+    assert limiter.check("poll", "participant.api_dashboard_stats", 2, "10.0.0.1") is None
+
+
+def test_flag_submit_bucket_is_shared_by_every_submit_endpoint(limiter):
+    assert limiter.check("flag_submit", "ctf_battle.submit_flag", 1, "10.0.0.1") is None
+    assert limiter.check("flag_submit", "participant.api_submit_flag", 1, "10.0.0.1") is None
+    scope, key, _ = limiter.check("flag_submit", "participant.view_task", 1, "10.0.0.1")
+    assert (scope, key) == ("user", "flag_submit:user:1")
+
+
+def test_check_ip_bucket_is_shared_by_users_behind_one_address(limiter):
+    assert limiter.check("flag_submit", "battle.submit", 1, "10.0.0.1") is None
+    assert limiter.check("flag_submit", "battle.submit", 2, "10.0.0.1") is None
+    assert limiter.check("flag_submit", "battle.submit", 3, "10.0.0.1") is None
+    scope, key, _ = limiter.check("flag_submit", "battle.submit", 4, "10.0.0.1")
+    assert (scope, key) == ("ip", "flag_submit:ip:10.0.0.1")
+
+
+def test_check_skips_scopes_without_an_identity(limiter):
+    # anonymous: only the IP bucket applies
+    for _ in range(3):
+        assert limiter.check("flag_submit", "battle.submit", None, "10.0.0.2") is None
+    assert limiter.check("flag_submit", "battle.submit", None, "10.0.0.2")[0] == "ip"
+    assert limiter.check("flag_submit", "battle.submit", None, None) is None
+    assert limiter.check("unknown", "battle.submit", 1, "10.0.0.2") is None
+
+
+def test_default_limits_have_no_ip_scope(app):
+    from services.ratelimit import limiter
+
+    assert all("ip" not in scopes for scopes in limiter.limits.values())
+
+
+def test_both_dashboard_polls_are_limited(app):
+    for endpoint in ("participant.api_dashboard_stats", "participant.api_dashboard_activity"):
+        assert app.view_functions[endpoint].rate_limit == ("poll", None)
@@ -0,0 +1,43 @@
+from services.perf import assert_max_queries
+from services.scoreboard import ScoreboardIndex
+
+
+def test_index_orders_by_xp_then_solves_then_id(db, make_user):
+    a, b, c = make_user("a"), make_user("b"), make_user("c")
+    index = ScoreboardIndex()
+    index.rebuild()
+
+    index.record_solve(b.id, "b", 100)
+    index.record_solve(c.id, "c", 100)
+    index.record_solve(c.id, "c", 0)
+    total, rows = index.page(1, 10)
+    assert total == 3
+    assert [row["username"] for row in rows] == ["c", "b", "a"]    # c has more solves at equal XP
+    assert [index.rank_of(user.id) for user in (a, b, c)] == [3, 2, 1]
+
+    _, after = index.page_after(rows[0]["key"], 10)
+    assert [row["username"] for row in after] == ["b", "a"]
+
+    index.remove_user(b.id)
+    assert index.total() == 2 and index.rank_of(b.id) is None
+
+
+def test_reads_never_query_once_loaded(app, db, make_user, monkeypatch):
+    make_user()
+    index = ScoreboardIndex()
+    index.init_app(app)
+    monkeypatch.setattr(index, "interval", 0)    # no refresh thread in this test
+    index.rebuild()
+    index._loaded_at -= 10 ** 6                  # however old the index is
+
+    with assert_max_queries(0, "scoreboard reads"):
+        index.total()
+        index.page(1, 50)
+        index.page_after(None, 50)
+        index.rank_of(1)
+
+
+def test_first_read_builds_a_missing_index(db, make_user):
+    user = make_user()
+    index = ScoreboardIndex()
+    assert index.rank_of(user.id) == 1
@@ -0,0 +1,47 @@
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from services import storage
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+@pytest.fixture
+def backend(app, tmp_path, monkeypatch):
+    backend = storage.LocalBackend(str(tmp_path))
+    monkeypatch.setitem(app.extensions, "storage_backend", backend)
+    return backend
+
+
+def upload(data, filename):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+def test_same_content_is_stored_once(db, backend):
+    first = storage.save_upload(upload(b"payload", "a.zip"))
+    db.session.commit()
+    second = storage.save_upload(upload(b"payload", "b.zip"))
+    assert second.id == first.id
+    assert first.path.endswith(".zip") and backend.exists(first.path)
+
+
+def test_image_with_the_bytes_of_a_challenge_file_gets_its_own_row(db, backend):
+    challenge = storage.save_upload(upload(PNG, "stage2.bin"))
+    db.session.commit()
+    image = storage.save_upload(upload(PNG, "avatar.html"), kind="image")
+    db.session.commit()
+
+    assert image.id != challenge.id
+    assert (image.kind, image.mime_type) == ("image", "image/png") and image.path.endswith(".png")
+    db.session.refresh(challenge)
+    assert challenge.path.endswith(".bin")    # the challenge's link is untouched
+    assert storage.save_upload(upload(PNG, "again.bin")).id == challenge.id
+    assert storage.save_upload(upload(PNG, "again.png"), kind="image").id == image.id
+
+
+@pytest.mark.parametrize("data", [b"<svg onload=alert(1)>", b"<html><script>", b"GIF8"])
+def test_non_images_are_rejected(db, backend, data):
+    with pytest.raises(storage.UploadRejected):
+        storage.save_upload(upload(data, "x.png"), kind="image")